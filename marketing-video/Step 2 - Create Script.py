@@ -42,10 +42,12 @@ def main():
         sys.exit(1)
     
     # Step 1: Extract Audio and Chapters
+    # --no-split: chapter files are not needed when Step 5 runs with --single-pass
+    # --smart-cut: stream-copy chapters instead of transcoding them to ProRes
     success = run_command([
         "python3", "processing-steps/1_extract_audio_chapters.py", 
         screencast_file
-    ], "Extract Audio and Chapters")
+    ] + [arg for arg in sys.argv[1:] if arg in ('--no-split', '--smart-cut')], "Extract Audio and Chapters")
     
     if not success:
         print("❌ Failed to extract audio and chapters. Stopping.")
@@ -62,10 +64,12 @@ def main():
         sys.exit(1)
     
     # Step 3: Generate Master Script
+    # --per-chapter: one concurrent GPT request per chapter instead of one for the whole video
+    # --no-llm-cache: ask GPT again even if the transcript is unchanged
     success = run_command([
         "python3", "processing-steps/3_generate_master_script.py", 
         "current-project/"
-    ], "Generate Master Script")
+    ] + [arg for arg in sys.argv[1:] if arg in ('--per-chapter', '--no-llm-cache')], "Generate Master Script")
     
     if not success:
         print("❌ Failed to generate master script. Stopping.")
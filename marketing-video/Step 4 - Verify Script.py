@@ -8,13 +8,17 @@ import subprocess
 import sys
 from pathlib import Path
 
+# Flags passed through to processing-steps/4_verify_script.py
+VERIFY_FLAGS = ('--metrics-only', '--no-llm-cache')
+
 def main():
-    if len(sys.argv) != 2:
-        print("Usage: python 'Step 4 - Verify Script.py' <project_directory>")
+    args = [arg for arg in sys.argv[1:] if arg not in VERIFY_FLAGS]
+    if len(args) != 1:
+        print("Usage: python 'Step 4 - Verify Script.py' <project_directory> [--metrics-only] [--no-llm-cache]")
         print("Example: python 'Step 4 - Verify Script.py' current-project/")
         sys.exit(1)
     
-    project_dir = sys.argv[1]
+    project_dir = args[0]
     project_path = Path(project_dir)
     
     print("Step 4: Verify Script")
@@ -37,7 +41,7 @@ def main():
         print("Running script verification...")
         result = subprocess.run([
             'python3', 'processing-steps/4_verify_script.py', project_dir
-        ], check=True, capture_output=False)
+        ] + [arg for arg in sys.argv[1:] if arg in VERIFY_FLAGS], check=True, capture_output=False)
         
         print("\n" + "=" * 50)
         print("STEP 4 COMPLETED!")
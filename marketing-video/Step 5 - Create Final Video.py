@@ -3,107 +3,173 @@
 STEP 4: CREATE FINAL VIDEO
 Automated processing to create final marketing video.
 Runs processing steps 4-9.
+
+Pass several project directories to build them as a batch; all projects share
+one worker pool (--jobs, default: number of CPU cores) and each keeps its own temp/.
+
+With --watch the script keeps running after the build and re-runs only the steps
+affected by edits to human-provided-content/ (script, chapter voice files, config).
+
+With --single-pass step 9 renders straight from orig_screencast.mp4 in one encode,
+skipping step 6's timed chapter files.
 """
 
+import os
 import sys
-import subprocess
+import argparse
 from pathlib import Path
 
-def run_step(step_file, project_dir, description, skip_on_fail=False):
-    """Run a processing step."""
-    print(f"\n🚀 {description}")
-    print("-" * 60)
-    
-    step_path = Path("processing-steps") / step_file
-    cmd = ["python3", str(step_path), project_dir]
-    result = subprocess.run(cmd)
-    
-    if result.returncode == 0:
-        print(f"✅ {description} - COMPLETED!")
-        return True
-    else:
-        print(f"❌ {description} - FAILED!")
-        if skip_on_fail:
-            print("⚠️  Continuing anyway...")
-            return True
-        return False
+sys.path.insert(0, str(Path(__file__).resolve().parent / "processing-steps"))
+from pipeline_graph import PIPELINE_TASKS, SINGLE_PASS_TASKS, resolve_dependencies, topological_order, run_projects
+from pipeline_trace import TRACE_FILE_NAME, reset_trace
+from pipeline_watch import watch_projects
+
+def print_final_video_details(final_video):
+    """Print details and next steps for a finished video."""
+    # Get file size
+    size_mb = final_video.stat().st_size / (1024 * 1024)
+    print("✅ FINAL VIDEO CREATED:")
+    print(f"   📹 {final_video}")
+    print(f"   📊 Size: {size_mb:.1f} MB")
+    print(f"   🎨 Format: ProRes 422 (high quality)")
+    print(f"   ⏱️  Duration: ~114 seconds")
+    print()
+    print("🎯 WHAT'S INCLUDED:")
+    print("   • B-roll intro (10+ seconds)")
+    print("   • Your demo content with voice-over")
+    print("   • Professional background music")
+    print("   • Title and logo overlays") 
+    print("   • B-roll outro (10+ seconds)")
+    print()
+    print("🚀 READY FOR:")
+    print("   • Upload to YouTube/social media")
+    print("   • Final Cut Pro editing (if needed)")
+    print("   • Distribution and marketing")
+    print()
+    print("💡 TIPS:")
+    print("   • The ProRes format ensures highest quality")
+    print("   • You can compress to MP4 for web if needed")
+    print("   • Consider adding captions for accessibility")
+    print()
+    print("📖 NEXT STEP:")
+    print("   Read 'Step 6 - Add Annotations.md' for Final Cut Pro instructions")
 
 def main():
-    if len(sys.argv) != 2:
-        print("Usage: python3 'Step 5 - Create Final Video.py' <project_dir>")
-        print("Example: python3 'Step 5 - Create Final Video.py' current-project/")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(
+        description="Create the final marketing video for one or more projects.",
+        epilog="Example: python3 'Step 5 - Create Final Video.py' current-project/"
+    )
+    parser.add_argument('project_dirs', nargs='+', help="Project directory (several for a batch build)")
+    parser.add_argument('--jobs', type=int, default=None,
+                        help="Maximum concurrent steps across all projects (default: CPU cores for a batch)")
+    parser.add_argument('--watch', action='store_true',
+                        help="After building, watch human-provided-content/ and rebuild what changed")
+    parser.add_argument('--single-pass', action='store_true',
+                        help="Render the final video from orig_screencast.mp4 in one ffmpeg pass (skips step 6)")
+    parser.add_argument('--no-llm-cache', action='store_true',
+                        help="Re-run step 4's GPT verification even if the script is unchanged")
+    args = parser.parse_args()
     
-    project_dir = sys.argv[1]
+    if args.no_llm_cache:
+        # Inherited by every step subprocess
+        os.environ['LLM_CACHE_BYPASS'] = '1'
+    
+    project_dirs = [project_dir.rstrip('/') for project_dir in args.project_dirs]
+    
+    for project_dir in project_dirs:
+        if not Path(project_dir).exists():
+            print(f"✗ Project directory not found: {project_dir}")
+            sys.exit(1)
     
-    if not Path(project_dir).exists():
-        print(f"✗ Project directory not found: {project_dir}")
+    # Each project must have its own temp/ so concurrent builds never share intermediates
+    resolved = [Path(project_dir).resolve() for project_dir in project_dirs]
+    if len(set(resolved)) != len(resolved):
+        print("✗ The same project directory was given more than once")
         sys.exit(1)
     
+    batch = len(project_dirs) > 1
+    tasks = SINGLE_PASS_TASKS if args.single_pass else PIPELINE_TASKS
+    max_workers = args.jobs or ((os.cpu_count() or 1) if batch else None)
+    
     print("=" * 60)
     print("STEP 5: CREATE FINAL MARKETING VIDEO")
     print("=" * 60)
     print("This will run automated processing steps 4,6-9:")
     print("  4. Verify script quality (optional)")
-    print("  6. Combine video chapters with audio")
+    if not args.single_pass:
+        print("  6. Combine video chapters with audio")
     print("  7. Create professional background music")
     print("  8. Process voice with Resemble AI")
-    print("  9. Final assembly + title/logo overlays")
+    if args.single_pass:
+        print("  9. Single-pass render from the screencast + title/logo overlays")
+    else:
+        print("  9. Final assembly + title/logo overlays")
     print()
+    if batch:
+        # Concurrent projects share the cores, so per-chapter workers in steps 1 and 6 don't oversubscribe them
+        concurrent_projects = min(len(project_dirs), max_workers)
+        os.environ.setdefault('PIPELINE_CPU_BUDGET', str(max(1, (os.cpu_count() or 1) // concurrent_projects)))
+        print(f"Batch build: {len(project_dirs)} projects, up to {max_workers} concurrent steps")
+        for project_dir in project_dirs:
+            print(f"  • {project_dir}")
+        print()
     
-    # Run steps 4,6-9 (step 5 was removed - timing calculated dynamically)
-    steps = [
-        ("4_verify_script.py", "Step 4: Verify script quality", True),  # Skip on fail
-        ("6_match_video_timing.py", "Step 6: Combine video chapters with audio", False),
-        ("7_create_background_music.py", "Step 7: Create professional background music", False),
-        ("8_process_voice.py", "Step 8: Process voice with Resemble AI", False),
-        ("9_final_assembly_with_overlays.py", "Step 9: Final assembly + overlays", False)
-    ]
+    # Steps run in data-dependency order; independent steps run concurrently
+    dependencies = resolve_dependencies(tasks)
+    print("Execution order (from step inputs/outputs):")
+    for name in topological_order(tasks, dependencies):
+        task = next(task for task in tasks if task['name'] == name)
+        after = ', '.join(sorted(dependencies[name])) or 'nothing'
+        print(f"  {task['label']}: after {after}")
     
-    for step_file, description, skip_on_fail in steps:
-        if not run_step(step_file, project_dir, description, skip_on_fail):
-            print(f"\n❌ STEP 5 FAILED at: {description}")
-            sys.exit(1)
+    # Every ffmpeg/ffprobe call of this build is recorded in temp/pipeline-trace.json
+    for project_dir in project_dirs:
+        reset_trace(Path(project_dir) / "temp")
+    failed = run_projects(project_dirs, tasks, max_workers)
+    for project_dir in project_dirs:
+        print(f"\n📈 Trace: {Path(project_dir) / 'temp' / TRACE_FILE_NAME} (open in chrome://tracing or ui.perfetto.dev)")
     
-    # Get final video info
-    final_video = Path(project_dir) / "final-output" / "final_video.mov"
+    if not batch:
+        project_dir = project_dirs[0]
+        if failed[project_dir]:
+            print(f"\n❌ STEP 5 FAILED at: {', '.join(failed[project_dir])}")
+            if args.watch:
+                watch_projects(project_dirs, tasks, max_workers)
+            sys.exit(1)
+        
+        # Get final video info
+        final_video = Path(project_dir) / "final-output" / "final_video.mov"
+        
+        print("\n" + "=" * 60)
+        print("🎉 MARKETING VIDEO PIPELINE COMPLETED!")
+        print("=" * 60)
+        
+        if final_video.exists():
+            print_final_video_details(final_video)
+        else:
+            print("❌ Final video file not found!")
+            print("Check the processing steps for errors.")
+        if args.watch:
+            watch_projects(project_dirs, tasks, max_workers)
+        return
     
     print("\n" + "=" * 60)
-    print("🎉 MARKETING VIDEO PIPELINE COMPLETED!")
+    print("🎉 BATCH BUILD FINISHED")
     print("=" * 60)
+    for project_dir in project_dirs:
+        final_video = Path(project_dir) / "final-output" / "final_video.mov"
+        if failed[project_dir]:
+            print(f"❌ {project_dir}: failed at {', '.join(failed[project_dir])}")
+        elif final_video.exists():
+            size_mb = final_video.stat().st_size / (1024 * 1024)
+            print(f"✅ {project_dir}: {final_video} ({size_mb:.1f} MB)")
+        else:
+            print(f"❌ {project_dir}: final video file not found")
     
-    if final_video.exists():
-        # Get file size
-        size_mb = final_video.stat().st_size / (1024 * 1024)
-        print("✅ FINAL VIDEO CREATED:")
-        print(f"   📹 {final_video}")
-        print(f"   📊 Size: {size_mb:.1f} MB")
-        print(f"   🎨 Format: ProRes 422 (high quality)")
-        print(f"   ⏱️  Duration: ~114 seconds")
-        print()
-        print("🎯 WHAT'S INCLUDED:")
-        print("   • B-roll intro (10+ seconds)")
-        print("   • Your demo content with voice-over")
-        print("   • Professional background music")
-        print("   • Title and logo overlays") 
-        print("   • B-roll outro (10+ seconds)")
-        print()
-        print("🚀 READY FOR:")
-        print("   • Upload to YouTube/social media")
-        print("   • Final Cut Pro editing (if needed)")
-        print("   • Distribution and marketing")
-        print()
-        print("💡 TIPS:")
-        print("   • The ProRes format ensures highest quality")
-        print("   • You can compress to MP4 for web if needed")
-        print("   • Consider adding captions for accessibility")
-        print()
-        print("📖 NEXT STEP:")
-        print("   Read 'Step 6 - Add Annotations.md' for Final Cut Pro instructions")
-        
-    else:
-        print("❌ Final video file not found!")
-        print("Check the processing steps for errors.")
+    if args.watch:
+        watch_projects(project_dirs, tasks, max_workers)
+    if any(failed.values()):
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -9,7 +9,9 @@ Archives the current video project by:
 4. Zipping the human-provided-content folder
 5. Moving the archive to ~/MyGoogleDrive/video campaigns
 
-Usage: python "Step 8 - Archive Project.py" current-project/
+The GPT summary is cached on disk (processing-steps/llm_cache.py); pass --no-llm-cache to regenerate it.
+
+Usage: python "Step 8 - Archive Project.py" current-project/ [other-project/ ...]
 """
 
 import os
@@ -22,6 +24,9 @@ from pathlib import Path
 import openai
 from dotenv import load_dotenv
 
+sys.path.insert(0, str(Path(__file__).resolve().parent / "processing-steps"))
+from llm_cache import chat_completion, apply_bypass_flag
+
 # Load environment variables
 load_dotenv()
 
@@ -47,6 +52,16 @@ def read_video_content(project_dir):
     with open(content_path, 'r') as f:
         return f.read().strip()
 
+def unique_path(directory, filename):
+    """Return a path in directory that does not collide with an existing archive from the same day."""
+    stem, ext = os.path.splitext(filename)
+    candidate = os.path.join(directory, filename)
+    counter = 2
+    while os.path.exists(candidate):
+        candidate = os.path.join(directory, f"{stem}_{counter}{ext}")
+        counter += 1
+    return candidate
+
 def generate_summary_with_gpt(video_content, video_title):
     """Use GPT to generate a professional summary of the video content"""
     client = openai.OpenAI()
@@ -66,7 +81,8 @@ Please create a concise, professional summary (2-3 paragraphs) that describes:
 Write this as documentation for future reference, focusing on what the video teaches viewers about TrainerDay's capabilities."""
 
     try:
-        response = client.chat.completions.create(
+        content = chat_completion(
+            client,
             model="gpt-4",
             messages=[
                 {"role": "system", "content": "You are a professional video content analyst creating archive documentation."},
@@ -76,7 +92,7 @@ Write this as documentation for future reference, focusing on what the video tea
             temperature=0.7
         )
         
-        return response.choices[0].message.content.strip()
+        return content.strip()
     
     except Exception as e:
         print(f"Error generating summary with GPT: {e}")
@@ -95,9 +111,9 @@ def create_summary_file(project_dir, video_title, summary_content):
     campaigns_dir = os.path.join(os.path.dirname(project_dir), "campaigns")
     os.makedirs(campaigns_dir, exist_ok=True)
     
-    # Create filename
-    filename = f"{today}_{clean_title}.txt"
-    filepath = os.path.join(campaigns_dir, filename)
+    # Create filename (several projects archived the same day may share a title)
+    filepath = unique_path(campaigns_dir, f"{today}_{clean_title}.txt")
+    filename = os.path.basename(filepath)
     
     # Write summary file
     with open(filepath, 'w') as f:
@@ -112,14 +128,14 @@ def create_summary_file(project_dir, video_title, summary_content):
 def create_zip_archive(project_dir, clean_title):
     """Create ZIP archive of human-provided-content folder"""
     today = datetime.now().strftime("%Y-%m-%d")
-    zip_filename = f"{today}_{clean_title}.zip"
-    zip_path = os.path.join(project_dir, zip_filename)
+    zip_path = unique_path(project_dir, f"{today}_{clean_title}.zip")
+    zip_filename = os.path.basename(zip_path)
     
     human_content_dir = os.path.join(project_dir, "human-provided-content")
     
     if not os.path.exists(human_content_dir):
         print(f"Error: human-provided-content directory not found")
-        return None
+        return None, None
     
     # Create ZIP file
     with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
@@ -140,32 +156,23 @@ def move_to_campaigns_folder(zip_path, zip_filename):
     # Create campaigns directory if it doesn't exist
     os.makedirs(campaigns_dir, exist_ok=True)
     
-    # Move ZIP file
-    destination = os.path.join(campaigns_dir, zip_filename)
+    # Move ZIP file without overwriting another project's archive
+    destination = unique_path(campaigns_dir, zip_filename)
     shutil.move(zip_path, destination)
     
     print(f"✓ Moved archive to: {destination}")
     return destination
 
-def main():
-    if len(sys.argv) != 2:
-        print("Usage: python 'Step 8 - Archive Project.py' current-project/")
-        sys.exit(1)
-    
-    project_dir = sys.argv[1].rstrip('/')
-    
-    if not os.path.exists(project_dir):
-        print(f"Error: Project directory '{project_dir}' not found")
-        sys.exit(1)
-    
-    print("Step 8 - Archive Project")
-    print("=" * 50)
+def archive_project(project_dir):
+    """Archive one project; returns True on success."""
+    print(f"\nArchiving: {project_dir}")
+    print("-" * 50)
     
     # Step 1: Load project configuration
     print("1. Loading project configuration...")
     config = load_project_config(project_dir)
     if not config:
-        sys.exit(1)
+        return False
     
     video_title = config.get("youtube_title", "TrainerDay Video")
     print(f"   Video Title: {video_title}")
@@ -174,7 +181,7 @@ def main():
     print("2. Reading video content...")
     video_content = read_video_content(project_dir)
     if not video_content:
-        sys.exit(1)
+        return False
     
     print(f"   Content length: {len(video_content)} characters")
     
@@ -190,16 +197,39 @@ def main():
     print("5. Creating ZIP archive...")
     zip_path, zip_filename = create_zip_archive(project_dir, clean_title)
     if not zip_path:
-        sys.exit(1)
+        return False
     
     # Step 6: Move to campaigns folder
     print("6. Moving to campaigns folder...")
     final_destination = move_to_campaigns_folder(zip_path, zip_filename)
     
-    print("\n" + "=" * 50)
-    print("✓ Project archiving completed successfully!")
     print(f"✓ Summary file: {summary_filename}")
     print(f"✓ Archive location: {final_destination}")
+    return True
+
+def main():
+    args = apply_bypass_flag(sys.argv[1:])
+    if not args:
+        print("Usage: python 'Step 8 - Archive Project.py' current-project/ [other-project/ ...] [--no-llm-cache]")
+        sys.exit(1)
+    
+    project_dirs = [arg.rstrip('/') for arg in args]
+    
+    for project_dir in project_dirs:
+        if not os.path.exists(project_dir):
+            print(f"Error: Project directory '{project_dir}' not found")
+            sys.exit(1)
+    
+    print("Step 8 - Archive Project")
+    print("=" * 50)
+    
+    failed = [project_dir for project_dir in project_dirs if not archive_project(project_dir)]
+    
+    print("\n" + "=" * 50)
+    if failed:
+        print(f"✗ Archiving failed for: {', '.join(failed)}")
+        sys.exit(1)
+    print("✓ Project archiving completed successfully!")
     print("\nProject is now archived and ready for future reference.")
 
 if __name__ == "__main__":
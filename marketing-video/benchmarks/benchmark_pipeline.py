@@ -0,0 +1,471 @@
+#!/usr/bin/env python3
+"""
+Pipeline Benchmark
+- Generate deterministic synthetic fixtures with ffmpeg lavfi sources
+  (chaptered MP4 screencast, chapter voice WAVs, music beds, intro/outro clips, b-roll)
+- Time processing steps 1, 8, 6, 7 and 9 across several durations and chapter counts
+- Save results as JSON in benchmarks/results/ and compare against the previous run
+- --intermediate-profiles: encode one screencast with every intermediate codec profile from
+  the assembly template and report bytes written and encode speed (no pipeline steps run)
+- --check-smart-cut: run step 1 --smart-cut on an x264 screencast whose chapters start and end
+  mid-GOP, and fail unless every chapter took the smart-cut path and decodes with the
+  expected frame count
+
+Usage: python3 benchmarks/benchmark_pipeline.py [--durations 30 120] [--chapters 2 6] [--repeat 1]
+       python3 benchmarks/benchmark_pipeline.py --intermediate-profiles [--durations 120]
+       python3 benchmarks/benchmark_pipeline.py --check-smart-cut [--durations 30]
+"""
+
+import os
+import re
+import sys
+import json
+import shutil
+import argparse
+import platform
+import time
+import statistics
+import subprocess
+from datetime import datetime
+from pathlib import Path
+
+MARKETING_VIDEO_DIR = Path(__file__).resolve().parent.parent
+STEPS_DIR = MARKETING_VIDEO_DIR / "processing-steps"
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+DEFAULT_WORKSPACE = Path(__file__).resolve().parent / "workspace"
+
+sys.path.insert(0, str(STEPS_DIR))
+from pipeline_trace import TRACE_FILE_NAME, run_process
+from media_backend import load_intermediate_profiles, video_codec_args
+
+# Steps in data-dependency order; step 1 takes the screencast, the rest take the project dir
+BENCHMARK_STEPS = [
+    ('1_extract_audio_chapters', 'screencast', []),
+    ('8_process_voice', 'project', []),
+    ('6_match_video_timing', 'project', []),
+    ('7_create_background_music', 'project', []),
+    ('9_final_assembly_with_overlays', 'project', [])
+]
+
+# --single-pass: no chapter files, step 9 renders straight from the screencast
+SINGLE_PASS_BENCHMARK_STEPS = [
+    ('1_extract_audio_chapters', 'screencast', ['--no-split']),
+    ('8_process_voice', 'project', []),
+    ('7_create_background_music', 'project', []),
+    ('9_final_assembly_with_overlays', 'project', ['--single-pass'])
+]
+
+# Real assets the steps expect next to the project (copied into the workspace as-is)
+STATIC_ASSETS = [
+    'assets/logos/td.png',
+    'assets/logos/td_full_white_red.png',
+    'assets/other/subscribe.png',
+    'assets/overlays/video_title1.svg'
+]
+
+# --check-smart-cut: with keyframes every 2s (-g 60 at 30 fps), 4 chapters of a 30s screencast
+# start and end mid-GOP at 7.5s, 15s and 22.5s
+SMART_CUT_CHECK_CHAPTERS = 4
+SOURCE_FRAME_RATE = 30
+
+INTRO_DURATION = 4.0
+OUTRO_DURATION = 3.0
+BROLL_DURATION = 20.0
+
+def generate(cmd, output_file):
+    """Run an ffmpeg fixture command unless the fixture already exists."""
+    if output_file.exists():
+        return True
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    result = subprocess.run(['ffmpeg', '-hide_banner', '-v', 'error'] + cmd + ['-y', str(output_file)],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        print(f"  ✗ Could not generate {output_file.name}: {result.stderr}")
+        return False
+    return True
+
+def chapter_layout(duration, chapter_count):
+    """Split the screencast into equal chapters."""
+    length = duration / chapter_count
+    return [(i * length, (i + 1) * length) for i in range(chapter_count)]
+
+def voice_duration(chapter_index, chapter_length):
+    """Alternate longer and shorter voice so both freeze-frame and trim paths run."""
+    return round(chapter_length * (1.15 if chapter_index % 2 else 0.9), 3)
+
+def create_shared_assets(workspace, max_duration):
+    """Create the intro/outro clips, b-roll, music beds and templates shared by every case."""
+    assets = workspace / "assets"
+    music_duration = max_duration * 1.5 + 60
+
+    fixtures = [
+        (['-f', 'lavfi', '-i', f'testsrc2=size=1920x1080:rate=30:duration={INTRO_DURATION}',
+          '-c:v', 'libx264', '-preset', 'ultrafast', '-pix_fmt', 'yuv420p'],
+         assets / "intros-and-outros" / "intro1.mov"),
+        (['-f', 'lavfi', '-i', f'sine=frequency=330:sample_rate=48000:duration={INTRO_DURATION - 0.5}'],
+         assets / "intros-and-outros" / "intro1.wav"),
+        (['-f', 'lavfi', '-i', f'testsrc2=size=1920x1080:rate=30:duration={OUTRO_DURATION}',
+          '-c:v', 'libx264', '-preset', 'ultrafast', '-pix_fmt', 'yuv420p'],
+         assets / "intros-and-outros" / "outro1.mov"),
+        (['-f', 'lavfi', '-i', f'sine=frequency=370:sample_rate=48000:duration={OUTRO_DURATION - 0.5}'],
+         assets / "intros-and-outros" / "outro1.wav"),
+        (['-f', 'lavfi', '-i', f'smptehdbars=size=1920x1080:rate=30:duration={BROLL_DURATION}',
+          '-c:v', 'libx264', '-preset', 'ultrafast', '-pix_fmt', 'yuv420p'],
+         assets / "b-roll" / "bench-broll.mp4"),
+        (['-f', 'lavfi', '-i', f'sine=frequency=196:sample_rate=44100:duration={music_duration}', '-ac', '2'],
+         assets / "music" / "bench-a-roll.wav"),
+        (['-f', 'lavfi', '-i', f'sine=frequency=262:sample_rate=44100:duration={music_duration}', '-ac', '2'],
+         assets / "music" / "bench-b-roll.wav")
+    ]
+    for cmd, output_file in fixtures:
+        if not generate(cmd, output_file):
+            return False
+
+    for asset in STATIC_ASSETS:
+        target = workspace / asset
+        if not target.exists():
+            target.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(MARKETING_VIDEO_DIR / asset, target)
+
+    templates_dir = workspace / "video-templates"
+    templates_dir.mkdir(exist_ok=True)
+    shutil.copy2(MARKETING_VIDEO_DIR / "video-templates" / "assembly-template1.json", templates_dir)
+    return True
+
+def create_case_project(workspace, duration, chapter_count):
+    """Create a project with a chaptered screencast and per-chapter voice files."""
+    project_dir = workspace / f"bench-{duration}s-{chapter_count}ch"
+    content_dir = project_dir / "human-provided-content"
+    content_dir.mkdir(parents=True, exist_ok=True)
+
+    # ScreenFlow-style chapter markers via an FFMETADATA file
+    metadata_file = content_dir / "chapters.ffmeta"
+    lines = [";FFMETADATA1"]
+    for i, (start, end) in enumerate(chapter_layout(duration, chapter_count)):
+        lines += ["[CHAPTER]", "TIMEBASE=1/1000", f"START={int(start * 1000)}", f"END={int(end * 1000)}",
+                  f"title=Chapter {i + 1}"]
+    metadata_file.write_text('\n'.join(lines) + '\n')
+
+    screencast = content_dir / "orig_screencast.mp4"
+    if not generate([
+        '-f', 'lavfi', '-i', f'testsrc2=size=1920x1080:rate=30:duration={duration}',
+        '-f', 'lavfi', '-i', f'sine=frequency=440:sample_rate=44100:duration={duration}',
+        '-i', str(metadata_file), '-map', '0:v', '-map', '1:a', '-map_chapters', '2',
+        '-c:v', 'libx264', '-preset', 'veryfast', '-g', '60', '-pix_fmt', 'yuv420p',
+        '-c:a', 'aac', '-b:a', '128k'
+    ], screencast):
+        return None
+
+    for i, (start, end) in enumerate(chapter_layout(duration, chapter_count)):
+        voice_file = content_dir / "resemble-chapters" / f"{i + 1}.wav"
+        if not generate(['-f', 'lavfi', '-i',
+                         f'sine=frequency={220 + 20 * i}:sample_rate=44100:duration={voice_duration(i, end - start)}'],
+                        voice_file):
+            return None
+
+    config = {
+        "music": {
+            "a_roll_background": "assets/music/bench-a-roll.wav",
+            "b_roll_background": "assets/music/bench-b-roll.wav"
+        },
+        "audio_levels": {"background_music_volume": 0.3, "b_roll_music_volume": 0.5},
+        "branding": {"title_line1": "BENCHMARK", "title_line2": f"{duration}S {chapter_count} CHAPTERS"},
+        "intro_outro": {
+            "intro_video": "assets/intros-and-outros/intro1.mov",
+            "intro_audio": "assets/intros-and-outros/intro1.wav",
+            "outro_video": "assets/intros-and-outros/outro1.mov",
+            "outro_audio": "assets/intros-and-outros/outro1.wav"
+        },
+        "b_roll_video": "assets/b-roll/bench-broll.mp4",
+        "assembly_template": "assembly-template1.json"
+    }
+    with open(content_dir / "project-config.json", 'w') as f:
+        json.dump(config, f, indent=2)
+
+    return project_dir
+
+def summarize_trace(project_dir):
+    """Total subprocess wall time per tool from the step's pipeline trace."""
+    trace_file = project_dir / "temp" / TRACE_FILE_NAME
+    if not trace_file.exists():
+        return {}
+    try:
+        events = json.loads(trace_file.read_text().rstrip().rstrip(',') + ']')
+    except json.JSONDecodeError:
+        return {}
+    totals = {}
+    for event in events:
+        if event.get('ph') == 'X' and event.get('cat') in ('ffmpeg', 'ffprobe'):
+            totals.setdefault(event['cat'], {'calls': 0, 'wall_s': 0.0})
+            totals[event['cat']]['calls'] += 1
+            totals[event['cat']]['wall_s'] = round(totals[event['cat']]['wall_s'] + event['dur'] / 1_000_000, 3)
+    return totals
+
+def run_step(step_name, argument, project_dir, step_args=()):
+    """Run one processing step and measure it."""
+    trace_file = project_dir / "temp" / TRACE_FILE_NAME
+    if trace_file.exists():
+        trace_file.unlink()
+
+    cmd = [sys.executable, str(STEPS_DIR / f"{step_name}.py"), str(argument)] + list(step_args)
+    result = run_process(cmd, description=step_name)
+    measurement = {'returncode': result.returncode, 'subprocesses': summarize_trace(project_dir)}
+    if result.returncode != 0:
+        measurement['error_tail'] = result.stdout[-2000:]
+    return measurement, result
+
+def benchmark_case(workspace, duration, chapter_count, repeat, single_pass=False):
+    """Run every step for one (duration, chapter count) case."""
+    project_dir = create_case_project(workspace, duration, chapter_count)
+    if not project_dir:
+        return None
+
+    # Start every case from a clean temp/ so earlier runs cannot skip work
+    for scratch_dir in (project_dir / "temp", project_dir / "final-output"):
+        if scratch_dir.exists():
+            shutil.rmtree(scratch_dir)
+
+    case = {'duration': duration, 'chapters': chapter_count, 'mode': 'single-pass' if single_pass else 'multi-pass', 'steps': {}}
+    for step_name, argument_kind, step_args in (SINGLE_PASS_BENCHMARK_STEPS if single_pass else BENCHMARK_STEPS):
+        argument = (project_dir / "human-provided-content" / "orig_screencast.mp4"
+                    if argument_kind == 'screencast' else project_dir)
+        runs = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            measurement, _ = run_step(step_name, argument, project_dir, step_args)
+            measurement['wall_s'] = round(time.perf_counter() - start, 3)
+            runs.append(measurement)
+            if measurement['returncode'] != 0:
+                break
+
+        wall_times = [run['wall_s'] for run in runs]
+        case['steps'][step_name] = {
+            'wall_s': round(statistics.median(wall_times), 3),
+            'runs': wall_times,
+            'returncode': runs[-1]['returncode'],
+            'subprocesses': runs[-1]['subprocesses']
+        }
+        if runs[-1]['returncode'] != 0:
+            case['steps'][step_name]['error_tail'] = runs[-1].get('error_tail', '')
+
+        status = "✓" if runs[-1]['returncode'] == 0 else "✗"
+        print(f"  {status} {step_name}: {case['steps'][step_name]['wall_s']:.2f}s")
+    return case
+
+def measure_intermediate_profiles(workspace, duration):
+    """Encode the same screencast with every intermediate profile; report size and speed."""
+    project_dir = create_case_project(workspace, duration, 1)
+    if not project_dir:
+        return None
+    source = project_dir / "human-provided-content" / "orig_screencast.mp4"
+    output_dir = workspace / "intermediate-profiles"
+    output_dir.mkdir(exist_ok=True)
+
+    selected, profiles = load_intermediate_profiles(MARKETING_VIDEO_DIR / "video-templates" / "assembly-template1.json")
+    measurements = {}
+    for name, settings in profiles.items():
+        output_file = output_dir / f"{name}-{duration}s.mov"
+        cmd = ['ffmpeg', '-i', str(source)] + video_codec_args(settings) + ['-an', '-y', str(output_file)]
+        start = time.perf_counter()
+        result = run_process(cmd, description=f"Encoding {name}", expected_duration=duration)
+        wall = time.perf_counter() - start
+        if result.returncode != 0:
+            print(f"  ✗ {name}: {result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'failed'}")
+            measurements[name] = {'returncode': result.returncode}
+            continue
+        size = output_file.stat().st_size
+        measurements[name] = {
+            'returncode': 0,
+            'bytes': size,
+            'mb_per_minute': round(size / (1024 * 1024) / duration * 60, 1),
+            'wall_s': round(wall, 3),
+            'speed': round(duration / wall, 2)
+        }
+        output_file.unlink()
+
+    print(f"\n  {'profile':<16}{'MB':>10}{'MB/min':>10}{'encode':>10}{'speed':>9}")
+    for name, measurement in measurements.items():
+        if measurement['returncode'] != 0:
+            print(f"  {name:<16}{'failed':>10}")
+            continue
+        marker = "  (selected)" if name == selected else ""
+        print(f"  {name:<16}{measurement['bytes'] / (1024 * 1024):>10.1f}{measurement['mb_per_minute']:>10.1f}"
+              f"{measurement['wall_s']:>9.2f}s{measurement['speed']:>8.2f}x{marker}")
+    return {'duration': duration, 'selected': selected, 'profiles': measurements}
+
+def check_smart_cut(workspace, duration):
+    """Run step 1 --smart-cut on a mid-GOP chaptered x264 screencast; return the list of failures."""
+    project_dir = create_case_project(workspace, duration, SMART_CUT_CHECK_CHAPTERS)
+    if not project_dir:
+        return ["could not create the test project"]
+    temp_dir = project_dir / "temp"
+    if temp_dir.exists():
+        shutil.rmtree(temp_dir)
+
+    screencast = project_dir / "human-provided-content" / "orig_screencast.mp4"
+    measurement, result = run_step('1_extract_audio_chapters', screencast, project_dir, ['--smart-cut'])
+    if measurement['returncode'] != 0:
+        return [f"step 1 failed: {measurement.get('error_tail', '')[-500:]}"]
+
+    failures = []
+    methods = dict(re.findall(r'chapter (\d+): (smart-cut|transcode) \(', result.stdout))
+    for i, (start, end) in enumerate(chapter_layout(duration, SMART_CUT_CHECK_CHAPTERS)):
+        chapter = str(i + 1)
+        if methods.get(chapter) != 'smart-cut':
+            failures.append(f"chapter {chapter} took the {methods.get(chapter, 'unknown')} path")
+            continue
+        # The joined chapter must decode cleanly, frame-exact
+        chapter_file = temp_dir / "original-chapters" / f"chapter_{chapter}.mov"
+        decode = subprocess.run(['ffmpeg', '-v', 'error', '-i', str(chapter_file), '-map', '0:v:0', '-f', 'null', '-'],
+                                capture_output=True, text=True)
+        if decode.returncode != 0 or decode.stderr.strip():
+            failures.append(f"chapter {chapter} does not decode cleanly: {decode.stderr.strip()[:300]}")
+            continue
+        count = subprocess.run(['ffprobe', '-v', 'error', '-select_streams', 'v:0', '-count_frames',
+                                '-show_entries', 'stream=nb_read_frames', '-of', 'csv=p=0', str(chapter_file)],
+                               capture_output=True, text=True)
+        expected = round((end - start) * SOURCE_FRAME_RATE)
+        frames = int(count.stdout.strip() or 0)
+        if abs(frames - expected) > 1:
+            failures.append(f"chapter {chapter} has {frames} frames, expected {expected}")
+    return failures
+
+def environment_info():
+    """Describe the machine and commit the results belong to."""
+    def first_line(cmd):
+        try:
+            return subprocess.run(cmd, capture_output=True, text=True, cwd=MARKETING_VIDEO_DIR).stdout.splitlines()[0]
+        except (OSError, IndexError):
+            return None
+    return {
+        'commit': first_line(['git', 'rev-parse', '--short', 'HEAD']),
+        'ffmpeg': first_line(['ffmpeg', '-version']),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'cpu_count': os.cpu_count()
+    }
+
+def compare_results(current, previous, threshold):
+    """Print per-step changes against a previous results file and flag regressions."""
+    def case_key(case):
+        return case['duration'], case['chapters'], case.get('mode', 'multi-pass')
+    previous_cases = {case_key(case): case for case in previous.get('cases', [])}
+    regressions = 0
+    print(f"\nComparison with {previous['environment'].get('commit')} ({previous['timestamp']}):")
+    for case in current['cases']:
+        before = previous_cases.get(case_key(case))
+        if not before:
+            continue
+        print(f"  {case['duration']}s / {case['chapters']} chapters ({case_key(case)[2]}):")
+        for step_name, step in case['steps'].items():
+            old_step = before['steps'].get(step_name)
+            if not old_step or not old_step['wall_s'] or step['returncode'] != 0:
+                continue
+            change = (step['wall_s'] - old_step['wall_s']) / old_step['wall_s']
+            marker = "⚠ REGRESSION" if change > threshold else ""
+            regressions += change > threshold
+            print(f"    {step_name}: {old_step['wall_s']:.2f}s → {step['wall_s']:.2f}s ({change:+.0%}) {marker}")
+    return regressions
+
+def latest_results_file():
+    # Step timing runs only (intermediate profile measurements are saved as profiles-*.json)
+    files = sorted(RESULTS_DIR.glob("[0-9]*.json"))
+    return files[-1] if files else None
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the video processing steps on synthetic media.")
+    parser.add_argument('--durations', type=int, nargs='+', default=[30, 120], help="Screencast durations in seconds")
+    parser.add_argument('--chapters', type=int, nargs='+', default=[2, 6], help="Chapter counts")
+    parser.add_argument('--repeat', type=int, default=1, help="Runs per step (median is reported)")
+    parser.add_argument('--workspace', type=Path, default=DEFAULT_WORKSPACE, help="Where fixtures and projects are created")
+    parser.add_argument('--compare', type=Path, default=None, help="Results file to compare with (default: latest)")
+    parser.add_argument('--threshold', type=float, default=0.10, help="Slowdown fraction reported as a regression")
+    parser.add_argument('--single-pass', action='store_true', help="Also benchmark the single-pass render (steps 1, 8, 7, 9)")
+    parser.add_argument('--intermediate-profiles', action='store_true',
+                        help="Only measure size and encode speed of each intermediate codec profile")
+    parser.add_argument('--check-smart-cut', action='store_true',
+                        help="Only check that mid-GOP chapters of an x264 screencast take the smart-cut path")
+    args = parser.parse_args()
+
+    if not shutil.which('ffmpeg') or not shutil.which('ffprobe'):
+        print("✗ ffmpeg and ffprobe are required")
+        sys.exit(1)
+
+    print("Pipeline Benchmark")
+    print("=" * 50)
+    print(f"Workspace: {args.workspace}")
+
+    args.workspace.mkdir(parents=True, exist_ok=True)
+    if not create_shared_assets(args.workspace, max(args.durations)):
+        sys.exit(1)
+
+    if args.check_smart_cut:
+        failures = []
+        for duration in args.durations:
+            print(f"\nSmart-cut check: {duration}s screencast, {SMART_CUT_CHECK_CHAPTERS} mid-GOP chapters")
+            failures += check_smart_cut(args.workspace, duration)
+        for failure in failures:
+            print(f"  ✗ {failure}")
+        if failures:
+            sys.exit(1)
+        print("  ✓ Every chapter was smart-cut and decodes frame-exact")
+        return
+
+    if args.intermediate_profiles:
+        results = {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'environment': environment_info(),
+            'intermediate_profiles': []
+        }
+        for duration in args.durations:
+            print(f"\nIntermediate profiles: {duration}s screencast")
+            measurement = measure_intermediate_profiles(args.workspace, duration)
+            if measurement:
+                results['intermediate_profiles'].append(measurement)
+        RESULTS_DIR.mkdir(exist_ok=True)
+        results_file = RESULTS_DIR / f"profiles-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{results['environment']['commit'] or 'unknown'}.json"
+        with open(results_file, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults: {results_file}")
+        return
+
+    previous_file = args.compare or latest_results_file()
+
+    # Measure real work, not artifact cache hits
+    os.environ['PIPELINE_NO_CACHE'] = '1'
+
+    results = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'environment': environment_info(),
+        'cases': []
+    }
+    for duration in args.durations:
+        for chapter_count in args.chapters:
+            print(f"\nCase: {duration}s screencast, {chapter_count} chapters")
+            case = benchmark_case(args.workspace, duration, chapter_count, args.repeat)
+            if case:
+                results['cases'].append(case)
+            if args.single_pass:
+                print(f"\nCase: {duration}s screencast, {chapter_count} chapters, single-pass")
+                case = benchmark_case(args.workspace, duration, chapter_count, args.repeat, single_pass=True)
+                if case:
+                    results['cases'].append(case)
+
+    RESULTS_DIR.mkdir(exist_ok=True)
+    results_file = RESULTS_DIR / f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{results['environment']['commit'] or 'unknown'}.json"
+    with open(results_file, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print("\n" + "=" * 50)
+    print("BENCHMARK COMPLETED!")
+    print("=" * 50)
+    print(f"Results: {results_file}")
+
+    if previous_file and previous_file.exists():
+        with open(previous_file, 'r') as f:
+            previous = json.load(f)
+        if compare_results(results, previous, args.threshold):
+            sys.exit(2)
+
+if __name__ == "__main__":
+    main()
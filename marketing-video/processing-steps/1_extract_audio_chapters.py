@@ -4,79 +4,47 @@ Step 1: Extract Audio & Chapters
 - Extract audio track from MP4 video files (MP4 required for chapter markers)
 - Get chapter markers from ScreenFlow recordings  
 - Split MP4 into individual chapter video files
+- Chapters are encoded by parallel workers, each decoding only its own span of the screencast
+- --no-split skips the chapter files when the final video is rendered single-pass from the screencast
+- --smart-cut stream-copies whole GOPs and re-encodes only chapter edges (falls back to ProRes per chapter,
+  e.g. when the screencast is not already at the template's resolution and frame rate)
+- Chapter files are conformed here, once, to the template's resolution and frame rate, so
+  steps 6 and 9 do not scale them again
 """
 
-import subprocess
 import json
 import sys
+from functools import partial
 from pathlib import Path
 
-def run_command(cmd, description):
-    """Run command with error handling."""
-    try:
-        print(f"  {description}...")
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
-        if result.returncode == 0:
-            print(f"  ✓ {description} completed")
-            return result.stdout.strip() if result.stdout else True
-        else:
-            print(f"  ✗ {description} failed: {result.stderr}")
-            return False
-    except Exception as e:
-        print(f"  ✗ Error in {description}: {e}")
-        return False
+from artifact_cache import cache_key, is_cached, record
+from pipeline_trace import configure_trace
+from media_probe import probe, keyframe_index
+from media_backend import INTERMEDIATE_SETTINGS, intermediate_settings, get_backend
+from media_format import target_format
+from chapter_pool import plan_workers, run_jobs
 
-def extract_audio(video_file, temp_dir):
-    """Extract audio from video file."""
-    audio_file = temp_dir / "audio.wav"
-    
-    # Clean up existing audio file
-    if audio_file.exists():
-        audio_file.unlink()
-        print(f"  Removed existing {audio_file.name}")
-    
-    cmd = [
-        'ffmpeg', '-i', str(video_file),
-        '-vn', '-acodec', 'pcm_s16le', '-ar', '44100', '-ac', '2',
-        '-y', str(audio_file)
-    ]
-    
-    if run_command(cmd, "Extracting audio"):
-        return audio_file
-    return None
+# audio.wav format for transcription
+AUDIO_SAMPLE_RATE = 44100
+AUDIO_CHANNELS = 2
 
 def extract_chapters(video_file, temp_dir):
     """Extract chapter markers from video file."""
     chapters_file = temp_dir / "chapters.json"
     
-    # Clean up existing chapters file
-    if chapters_file.exists():
-        chapters_file.unlink()
-        print(f"  Removed existing {chapters_file.name}")
-    
-    # Get chapters using ffprobe
-    cmd = [
-        'ffprobe', '-v', 'quiet', '-print_format', 'json',
-        '-show_chapters', str(video_file)
-    ]
-    
-    result = run_command(cmd, "Extracting chapter markers")
-    if not result:
+    # Get chapters using the shared (cached) ffprobe service
+    print("  Extracting chapter markers...")
+    metadata = probe(video_file)
+    if not metadata:
+        print(f"  ✗ Could not probe {video_file}")
         return None
     
     try:
-        probe_data = json.loads(result)
-        chapters = probe_data.get('chapters', [])
+        chapters = metadata['chapters']
         
         if not chapters:
             print("  ⚠ No chapters found, creating single chapter")
-            # Get video duration
-            duration_cmd = [
-                'ffprobe', '-v', 'quiet', '-show_entries', 'format=duration',
-                '-of', 'csv=p=0', str(video_file)
-            ]
-            duration_result = subprocess.run(duration_cmd, capture_output=True, text=True)
-            duration = float(duration_result.stdout.strip()) if duration_result.returncode == 0 else 60.0
+            duration = metadata['duration'] or 60.0
             
             chapters = [{
                 'id': 0,
@@ -99,9 +67,11 @@ def extract_chapters(video_file, temp_dir):
                 'title': chapter.get('tags', {}).get('title', f'Chapter {i + 1}')
             })
         
-        # Save chapters
-        with open(chapters_file, 'w') as f:
-            json.dump({'chapters': simple_chapters}, f, indent=2)
+        # Save chapters (only rewrite when they changed so downstream caches stay valid)
+        chapters_json = json.dumps({'chapters': simple_chapters}, indent=2)
+        if not chapters_file.exists() or chapters_file.read_text() != chapters_json:
+            with open(chapters_file, 'w') as f:
+                f.write(chapters_json)
         
         print(f"  Found {len(simple_chapters)} chapters")
         return chapters_file
@@ -110,52 +80,150 @@ def extract_chapters(video_file, temp_dir):
         print(f"  ✗ Error processing chapters: {e}")
         return None
 
-def split_video_by_chapters(video_file, chapters_file, temp_dir):
-    """Split video into chapter files."""
+def group_segments(segments, group_count):
+    """Split segments into up to group_count runs of consecutive chapters with similar total duration.
+
+    Consecutive chapters keep each worker's decode to one contiguous span of the source.
+    """
+    total = sum(duration for _, duration, _ in segments)
+    groups = [[]]
+    done = 0.0
+    for segment in segments:
+        # Start the next run once this chapter's midpoint falls past the current run's share
+        if groups[-1] and len(groups) < group_count and done + segment[1] / 2 > total * len(groups) / group_count:
+            groups.append([])
+        groups[-1].append(segment)
+        done += segment[1]
+    return groups
+
+def extract_audio_and_chapters(video_file, chapters_file, temp_dir, split_chapters=True, smart_cut=False,
+                               settings=INTERMEDIATE_SETTINGS):
+    """Extract audio and split video into chapter files.
+    
+    Chapters are spread over parallel workers, each encoding a run of consecutive chapters
+    from one decode; with a single worker, audio and all chapters share one decode pass.
+    With smart_cut, chapters are first cut by stream copy; only chapters that cannot be
+    cut that way join the transcode pass. Chapters are encoded with the given intermediate
+    settings. Returns (audio file, chapter files), or (None, None).
+    """
     with open(chapters_file, 'r') as f:
         data = json.load(f)
     
-    chapters = data['chapters']
+    chapters = data['chapters'] if split_chapters else []
+    audio_file = temp_dir / "audio.wav"
     chapter_videos = []
     
-    # Create chapters directory and clean up existing files
+    # Create chapters directory and clean up chapters that no longer exist
     chapters_dir = temp_dir / "original-chapters"
-    if chapters_dir.exists():
-        # Remove all existing chapter files
-        for existing_file in chapters_dir.glob("chapter_*.mp4"):
-            existing_file.unlink()
-            print(f"  Removed existing {existing_file.name}")
-    else:
+    if split_chapters:
         chapters_dir.mkdir(exist_ok=True)
+        current_files = {f"chapter_{chapter['index']}.mov" for chapter in chapters}
+        for existing_file in chapters_dir.glob("chapter_*.*"):
+            if existing_file.name not in current_files:
+                existing_file.unlink()
+                print(f"  Removed stale {existing_file.name}")
+    
+    # Only outputs whose source or timing changed are produced; the rest come from the cache
+    backend = get_backend()
+    audio_output = None
+    audio_key = cache_key([video_file], [backend.name, 'extract_audio', AUDIO_SAMPLE_RATE, AUDIO_CHANNELS])
+    if is_cached(temp_dir, audio_key, [audio_file]):
+        print("  ✓ Extracting audio (cached, inputs unchanged)")
+    else:
+        audio_output = (audio_file, AUDIO_SAMPLE_RATE, AUDIO_CHANNELS)
     
+    segments = []
+    keys = {}
+    smart_cut_jobs = []
+    cut_report = []
+    operation = 'smart_cut' if smart_cut else 'split_video'
     for chapter in chapters:
         chapter_num = chapter['index']
         start_time = chapter['start_time']
         duration = chapter['duration']
         
         chapter_file = chapters_dir / f"chapter_{chapter_num}.mov"
+        chapter_videos.append(chapter_file)
         
-        cmd = [
-            'ffmpeg', '-i', str(video_file),
-            '-ss', str(start_time), '-t', str(duration),
-            '-c:v', 'prores_ks', '-profile:v', '2', '-pix_fmt', 'yuv422p10le', '-an',
-            '-y', str(chapter_file)
-        ]
+        key = cache_key([video_file], [backend.name, operation, start_time, duration, settings])
+        if is_cached(temp_dir, key, [chapter_file]):
+            print(f"  ✓ Creating chapter {chapter_num} ({duration:.1f}s) (cached, inputs unchanged)")
+            continue
         
-        if run_command(cmd, f"Creating chapter {chapter_num} ({duration:.1f}s)"):
-            chapter_videos.append(chapter_file)
+        keys[chapter_file] = key
+        if smart_cut and hasattr(backend, 'smart_cut'):
+            smart_cut_jobs.append((chapter_num, start_time, duration, chapter_file))
+        elif smart_cut:
+            cut_report.append((chapter_num, "transcode", f"{backend.name} backend has no smart cut"))
+            segments.append((start_time, duration, chapter_file))
         else:
-            return None
+            segments.append((start_time, duration, chapter_file))
+    
+    if smart_cut_jobs:
+        # Read the keyframe index once before the workers need it
+        keyframe_index(video_file)
+        workers, threads = plan_workers(len(smart_cut_jobs))
+        print(f"  Smart-cutting {len(smart_cut_jobs)} chapter(s) with {workers} worker(s), {threads} thread(s) each...")
+        results = run_jobs([
+            partial(backend.smart_cut, video_file, start_time, duration, chapter_file, threads=threads, target=settings)
+            for _, start_time, duration, chapter_file in smart_cut_jobs
+        ], workers)
+        for (chapter_num, start_time, duration, chapter_file), result in zip(smart_cut_jobs, results):
+            cut, details = result or (False, "smart cut failed")
+            cut_report.append((chapter_num, "smart-cut" if cut else "transcode", details))
+            if cut:
+                record(temp_dir, keys[chapter_file], [chapter_file])
+            else:
+                segments.append((start_time, duration, chapter_file))
+        segments.sort(key=lambda segment: segment[0])
+        cut_report.sort()
     
-    return chapter_videos
+    if segments or audio_output:
+        workers, threads = plan_workers(len(segments))
+        if workers == 1:
+            # One worker: audio and every chapter come from a single decode of the screencast
+            jobs = [partial(backend.split_video, video_file, segments, settings, audio_output, threads=threads)]
+            groups = [segments]
+        else:
+            print(f"  Encoding {len(segments)} chapter(s) with {workers} workers, {threads} thread(s) each...")
+            groups = group_segments(segments, workers)
+            jobs = [
+                partial(backend.split_video, video_file, group, settings, threads=threads)
+                for group in groups
+            ]
+            if audio_output:
+                # Audio is stream-selected, so this job never decodes video
+                jobs.append(partial(backend.split_video, video_file, [], settings, audio_output))
+                groups.append([])
+        
+        results = run_jobs(jobs, workers + (1 if audio_output and workers > 1 else 0))
+        # Record what succeeded, so a re-run only redoes the failed chapters
+        for group, result in zip(groups, results):
+            if result:
+                for _, _, chapter_file in group:
+                    record(temp_dir, keys[chapter_file], [chapter_file])
+        if audio_output and results[-1]:
+            record(temp_dir, audio_key, [audio_file])
+        if not all(results):
+            return None, None
+    
+    if cut_report:
+        print("  Chapter cut report:")
+        for chapter_num, method, details in cut_report:
+            print(f"    chapter {chapter_num}: {method} ({details})")
+    
+    return audio_file, chapter_videos
 
 def main():
-    if len(sys.argv) != 2:
-        print("Usage: python 1_extract_audio_chapters.py <video_file>")
+    args = [arg for arg in sys.argv[1:] if arg not in ('--no-split', '--smart-cut')]
+    split_chapters = '--no-split' not in sys.argv
+    smart_cut = '--smart-cut' in sys.argv
+    if len(args) != 1:
+        print("Usage: python 1_extract_audio_chapters.py <video_file> [--no-split] [--smart-cut]")
         print("Example: python 1_extract_audio_chapters.py current-project/human-provided-content/orig_screencast.mp4")
         sys.exit(1)
     
-    video_file = Path(sys.argv[1])
+    video_file = Path(args[0])
     if not video_file.exists():
         print(f"✗ Video file not found: {video_file}")
         sys.exit(1)
@@ -167,25 +235,29 @@ def main():
         project_dir = video_file.parent
     temp_dir = project_dir / "temp"
     temp_dir.mkdir(exist_ok=True)
+    configure_trace(temp_dir, "step 1")
     
     print("Step 1: Extract Audio & Chapters")
     print("=" * 50)
     print(f"Processing: {video_file.name}")
     print(f"Temp files in: {temp_dir}")
     
-    # Extract audio
-    audio_file = extract_audio(video_file, temp_dir)
-    if not audio_file:
-        sys.exit(1)
-    
-    # Extract chapters
+    # Extract chapters (metadata only, no decoding)
     chapters_file = extract_chapters(video_file, temp_dir)
     if not chapters_file:
         sys.exit(1)
     
-    # Split video by chapters
-    chapter_videos = split_video_by_chapters(video_file, chapters_file, temp_dir)
-    if not chapter_videos:
+    # Extract audio and split video by chapters (parallel workers, one decode per run of chapters)
+    if not split_chapters:
+        print("  Skipping chapter files (--no-split, single-pass render reads the screencast)")
+    # Ingest: conform chapters to the assembly format (resolution, frame rate) in the same encode
+    settings = {**intermediate_settings(project_dir), **target_format(project_dir)}
+    print(f"  Intermediate codec: {settings['video_codec']} ({settings['pixel_format']}, "
+          f"{settings['resolution']} @ {settings['frame_rate']} fps)")
+    audio_file, chapter_videos = extract_audio_and_chapters(
+        video_file, chapters_file, temp_dir, split_chapters, smart_cut, settings
+    )
+    if not audio_file:
         sys.exit(1)
     
     print("\n" + "=" * 50)
@@ -1,67 +1,193 @@
 #!/usr/bin/env python3
 """
 Step 2: Transcribe Audio
-- Simple speech-to-text of original recording using OpenAI Whisper
+- Simple speech-to-text of original recording using OpenAI Whisper, or a local CPU model (TRANSCRIBER=local)
+- Uploads 16 kHz mono Opus instead of the 44.1 kHz stereo WAV (a fraction of the size)
+- Long recordings are split at silences and the chunks are transcribed concurrently
+- Chunk segments are stitched back into one transcript.json, shifted by where each chunk really starts
+- Several project directories can be given; the local model is loaded once for all of them
 """
 
-import os
+import re
 import sys
 import json
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from openai import OpenAI
 from dotenv import load_dotenv
 
+from artifact_cache import run_cached
+from pipeline_trace import configure_trace, run_command, run_process
+from media_probe import get_duration, probe
+from transcribers import get_transcriber
+
 # Load environment variables from .env file
 load_dotenv()
 
-def transcribe_audio(audio_file):
-    """Transcribe audio using OpenAI Whisper."""
+# Whisper works at 16 kHz mono internally; speech-tuned Opus keeps the upload small
+TRANSCRIPTION_AUDIO_ARGS = ['-ac', '1', '-ar', '16000', '-c:a', 'libopus', '-b:a', '24k', '-application', 'voip']
+
+# Chunking: aim for chunks of about this length, cut at the longest silence near the boundary
+CHUNK_TARGET_SECONDS = 600
+SILENCE_NOISE = '-35dB'
+SILENCE_MIN_SECONDS = 0.4
+TRANSCRIBE_WORKERS = 4
+
+# Whisper API upload limit
+MAX_UPLOAD_BYTES = 25 * 1024 * 1024
+
+def prepare_transcription_audio(audio_file, temp_dir):
+    """Convert audio.wav to the compact upload format (cached while audio.wav is unchanged)."""
+    upload_file = temp_dir / "transcription-audio.ogg"
+    cmd = ['ffmpeg', '-i', str(audio_file)] + TRANSCRIPTION_AUDIO_ARGS + ['-vn', '-y', str(upload_file)]
+    if not run_cached(cmd, "Preparing 16 kHz mono audio for upload", [audio_file], [upload_file], temp_dir, run_command):
+        return None
+    return upload_file
+
+def find_silences(audio_file):
+    """Return (start, end) of every silence in the audio, using ffmpeg silencedetect."""
+    cmd = [
+        'ffmpeg', '-i', str(audio_file),
+        '-af', f'silencedetect=noise={SILENCE_NOISE}:d={SILENCE_MIN_SECONDS}', '-f', 'null', '-'
+    ]
+    # silencedetect reports on stderr, so keep all of it
+    result = run_process(cmd, description="Detecting silences", stderr_lines=None)
+    if result.returncode != 0:
+        return []
+    
+    silences = []
+    start = None
+    for line in result.stderr.splitlines():
+        match = re.search(r'silence_(start|end): (-?[\d.]+)', line)
+        if not match:
+            continue
+        if match.group(1) == 'start':
+            start = max(0.0, float(match.group(2)))
+        elif start is not None:
+            silences.append((start, float(match.group(2))))
+            start = None
+    return silences
+
+def plan_chunks(duration, silences, target=CHUNK_TARGET_SECONDS):
+    """Split [0, duration) into (start, end) chunks of at most target seconds.
+    
+    Each cut is placed in the middle of the longest silence in the second half of the
+    chunk, so words are not split; without a silence there, the cut falls at target.
+    """
+    chunks = []
+    position = 0.0
+    while duration - position > target:
+        window_start, window_end = position + target / 2, position + target
+        candidates = [(end - start, (start + end) / 2) for start, end in silences
+                      if window_start < (start + end) / 2 < window_end]
+        cut = max(candidates)[1] if candidates else window_end
+        chunks.append((position, cut))
+        position = cut
+    chunks.append((position, duration))
+    return chunks
+
+def extract_chunk(upload_file, start, end, chunk_file):
+    """Copy one time range of the upload audio into its own file (no re-encode).
+
+    A stream copy can only start on a packet boundary at or before start, so the chunk
+    keeps the upload file's timestamps (-copyts) for chunk_start to read back.
+    """
+    cmd = ['ffmpeg', '-ss', str(start), '-i', str(upload_file), '-t', str(end - start),
+           '-c', 'copy', '-copyts', '-y', str(chunk_file)]
+    return run_command(cmd, f"Cutting {chunk_file.name} ({start:.1f}s-{end:.1f}s)")
+
+def chunk_start(chunk_file, planned_start):
+    """Return where chunk_file's first packet sits in the upload audio, in seconds."""
+    metadata = probe(chunk_file)
+    start_time = metadata.get('start_time') if metadata else None
+    if start_time is None:
+        print(f"  ⚠ Could not read the start of {chunk_file.name}; assuming {planned_start:.1f}s")
+        return planned_start
+    return start_time
+
+def transcribe_audio(audio_file, transcriber):
+    """Transcribe one audio file; returns {'text', 'segments', 'duration'} or None."""
     try:
-        print("  Connecting to OpenAI...")
-        client = OpenAI()
-        
-        print("  Uploading audio for transcription...")
-        with open(audio_file, 'rb') as f:
-            response = client.audio.transcriptions.create(
-                model="whisper-1",
-                file=f,
-                response_format="verbose_json"
-            )
+        print(f"  Transcribing {Path(audio_file).name} ({transcriber.name})...")
+        transcript = transcriber.transcribe(audio_file)
         
-        print("  ✓ Transcription completed")
-        return response
+        print(f"  ✓ Transcription of {Path(audio_file).name} completed")
+        return transcript
         
     except Exception as e:
-        print(f"  ✗ Transcription failed: {e}")
+        print(f"  ✗ Transcription of {Path(audio_file).name} failed: {e}")
         return None
 
-def main():
-    if len(sys.argv) != 2:
-        print("Usage: python 2_transcribe_audio.py <directory>")
-        print("Example: python 2_transcribe_audio.py current-project/")
-        sys.exit(1)
+def stitch_transcripts(chunks, transcripts):
+    """Merge per-chunk transcripts into one, shifting segment times by each chunk's actual start."""
+    texts = []
+    segments = []
+    for (start, end), transcript in zip(chunks, transcripts):
+        texts.append(transcript['text'].strip())
+        for segment in transcript['segments']:
+            segment = dict(segment)
+            segment['id'] = len(segments)
+            segment['start'] = round(segment['start'] + start, 3)
+            segment['end'] = round(segment['end'] + start, 3)
+            if 'seek' in segment:
+                # seek counts 10 ms mel frames from the start of the uploaded file
+                segment['seek'] += int(round(start * 100))
+            segments.append(segment)
     
-    # Check for OpenAI API key
-    if not os.getenv('OPENAI_API_KEY'):
-        print("✗ OPENAI_API_KEY environment variable not set")
-        sys.exit(1)
+    last_start, last_end = chunks[-1]
+    return {
+        'text': ' '.join(text for text in texts if text),
+        'segments': segments,
+        'duration': last_start + (transcripts[-1]['duration'] or (last_end - last_start))
+    }
+
+def transcribe_chunked(upload_file, temp_dir, transcriber):
+    """Transcribe the upload audio, splitting long recordings at silences; returns transcript data or None."""
+    duration = get_duration(upload_file)
+    if not duration:
+        print(f"  ✗ Could not read duration of {upload_file}")
+        return None
     
-    directory = Path(sys.argv[1])
-    if not directory.exists():
-        print(f"✗ Directory not found: {directory}")
-        sys.exit(1)
+    if duration > CHUNK_TARGET_SECONDS or upload_file.stat().st_size > MAX_UPLOAD_BYTES:
+        chunks = plan_chunks(duration, find_silences(upload_file))
+    else:
+        chunks = [(0.0, duration)]
+    
+    if len(chunks) == 1:
+        chunk_files = [upload_file]
+    else:
+        print(f"  Splitting {duration:.0f}s of audio into {len(chunks)} chunks at silences")
+        chunks_dir = temp_dir / "transcription-chunks"
+        chunks_dir.mkdir(exist_ok=True)
+        for stale_chunk in chunks_dir.glob("chunk_*.ogg"):
+            stale_chunk.unlink()
+        chunk_files = [chunks_dir / f"chunk_{index + 1}.ogg" for index in range(len(chunks))]
+        for (start, end), chunk_file in zip(chunks, chunk_files):
+            if not extract_chunk(upload_file, start, end, chunk_file):
+                return None
+        # Segment times count from each chunk's first packet, which can precede the planned cut
+        chunks = [(chunk_start(chunk_file, start), end) for (start, end), chunk_file in zip(chunks, chunk_files)]
     
+    with ThreadPoolExecutor(max_workers=min(TRANSCRIBE_WORKERS, len(chunk_files))) as executor:
+        transcripts = list(executor.map(lambda chunk_file: transcribe_audio(chunk_file, transcriber), chunk_files))
+    if not all(transcripts):
+        return None
+    
+    print("  ✓ Transcription completed")
+    return stitch_transcripts(chunks, transcripts)
+
+def transcribe_project(directory, transcriber):
+    """Write directory/temp/transcript.json from temp/audio.wav; returns the transcript data or None."""
     temp_dir = directory / "temp"
     if not temp_dir.exists():
         print(f"✗ Temp directory not found: {temp_dir}")
         print("Run step 1 first: python 1_extract_audio_chapters.py current-project/human-provided-content/orig_screencast.mov")
-        sys.exit(1)
+        return None
     
     audio_file = temp_dir / "audio.wav"
     if not audio_file.exists():
         print(f"✗ Audio file not found: {audio_file}")
         print("Run step 1 first: python 1_extract_audio_chapters.py current-project/human-provided-content/orig_screencast.mov")
-        sys.exit(1)
+        return None
     
     transcript_file = temp_dir / "transcript.json"
     
@@ -70,34 +196,65 @@ def main():
         transcript_file.unlink()
         print(f"  Removed existing {transcript_file.name}")
     
-    print("Step 2: Transcribe Audio")
-    print("=" * 50)
-    print(f"Transcribing: {audio_file.name}")
+    configure_trace(temp_dir, "step 2")
+    print(f"Transcribing: {audio_file}")
     
-    # Transcribe audio
-    transcript = transcribe_audio(audio_file)
-    if not transcript:
-        sys.exit(1)
+    if transcriber.uploads:
+        # Compress for upload, then transcribe (in chunks for long recordings)
+        upload_file = prepare_transcription_audio(audio_file, temp_dir)
+        if not upload_file:
+            return None
+        print(f"  Upload size: {upload_file.stat().st_size / (1024 * 1024):.1f} MB "
+              f"(was {audio_file.stat().st_size / (1024 * 1024):.1f} MB WAV)")
+        transcript_data = transcribe_chunked(upload_file, temp_dir, transcriber)
+    else:
+        transcript_data = transcribe_audio(audio_file, transcriber)
+    if not transcript_data:
+        return None
     
     # Save transcript
-    transcript_data = {
-        'text': transcript.text,
-        'segments': transcript.segments,
-        'duration': transcript.duration
-    }
-    
     with open(transcript_file, 'w') as f:
         json.dump(transcript_data, f, indent=2)
+    print(f"  ✓ {transcript_file}")
+    return transcript_data
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python 2_transcribe_audio.py <directory> [<directory> ...]")
+        print("Example: python 2_transcribe_audio.py current-project/")
+        sys.exit(1)
+    
+    directories = [Path(arg) for arg in sys.argv[1:]]
+    for directory in directories:
+        if not directory.exists():
+            print(f"✗ Directory not found: {directory}")
+            sys.exit(1)
+    
+    transcriber = get_transcriber()
+    if not transcriber:
+        sys.exit(1)
+    
+    print("Step 2: Transcribe Audio")
+    print("=" * 50)
+    print(f"Transcriber: {transcriber.name}")
+    
+    # One transcriber (and local model) serves every project
+    transcripts = []
+    for directory in directories:
+        transcript_data = transcribe_project(directory, transcriber)
+        if not transcript_data:
+            sys.exit(1)
+        transcripts.append(transcript_data)
     
     print("\n" + "=" * 50)
     print("STEP 2 COMPLETED!")
     print("=" * 50)
     print("Created files:")
-    print(f"  ✓ {transcript_file.name}")
-    print(f"\nTranscription preview:")
-    print(f"  Duration: {transcript.duration:.1f} seconds")
-    print(f"  Text: {transcript.text[:100]}...")
+    for directory, transcript_data in zip(directories, transcripts):
+        print(f"  ✓ {directory / 'temp' / 'transcript.json'}")
+        print(f"    Duration: {transcript_data['duration']:.1f} seconds, {len(transcript_data['segments'])} segments")
+        print(f"    Text: {transcript_data['text'][:100]}...")
     print("\nNext: python 3_generate_master_script.py temp-assets/")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,58 +1,131 @@
 #!/usr/bin/env python3
 """
 Step 3: Generate Master Script
-- Break transcript into chapters
+- Break transcript into chapters (Whisper segments aligned to chapter start times)
 - Send to GPT for polishing and enhancement
+- --per-chapter: one concurrent request per chapter (asyncio), streaming each finished
+  chapter into script-generated.txt
+- Transcripts too long for one request (counted locally) are map-reduced: contiguous chapter
+  groups are polished independently within a token budget, then a reduce pass unifies
+  product terminology across the groups
+- A chapter too long for one request on its own (e.g. a webinar without chapter markers) is
+  split at segment boundaries into parts that are polished separately and joined
+- Responses are cached on disk (llm_cache); --no-llm-cache asks GPT again
 """
 
 import os
+import re
 import sys
 import json
 import glob
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from bisect import bisect_left
 from pathlib import Path
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 from dotenv import load_dotenv
 
+from llm_cache import chat_completion, async_chat_completion, apply_bypass_flag
+from token_budget import count_tokens, count_message_tokens, context_tokens
+
 # Load environment variables from .env file
 load_dotenv()
 
-def generate_script(transcript_data, chapters_data):
-    """Generate polished script using GPT."""
-    try:
-        print("  Connecting to OpenAI...")
-        client = OpenAI()
-        
-        # Create chapter breakdown
-        chapters = chapters_data['chapters']
-        transcript_text = transcript_data['text']
-        duration = transcript_data['duration']
-        
-        # Calculate rough chapter segments from transcript
-        chapter_segments = []
-        words_per_second = len(transcript_text.split()) / duration
-        
-        for i, chapter in enumerate(chapters):
-            start_time = chapter['start_time']
-            chapter_duration = chapter['duration']
-            
-            # Estimate word positions
-            start_word_pos = int(start_time * words_per_second)
-            end_word_pos = int((start_time + chapter_duration) * words_per_second)
-            
-            words = transcript_text.split()
-            chapter_text = ' '.join(words[start_word_pos:end_word_pos])
-            
-            chapter_segments.append({
-                'chapter': i + 1,
-                'title': chapter['title'],
-                'duration': chapter_duration,
-                'original_text': chapter_text.strip()
-            })
-        
-        print("  Generating enhanced script with GPT...")
-        
-        # Create prompt for script enhancement
-        prompt = f"""You are creating polished video scripts from rough transcripts of software demonstrations.
+SYSTEM_PROMPT = "You are a professional scriptwriter specializing in software demonstration videos. You excel at polishing rough transcripts while preserving technical accuracy."
+
+MODEL = "gpt-4"
+
+# --per-chapter: chapter requests in flight at once (also used for map-reduce chapter groups)
+CHAPTER_CONCURRENCY = 4
+
+# Map-reduce: prompt + expected response of one request must fit here, with headroom for the
+# character-based estimate when tiktoken is not installed
+REQUEST_TOKEN_BUDGET = context_tokens(MODEL) * 3 // 4
+# Expected response size per chapter: a ~80-word script plus JSON framing and terms
+RESPONSE_TOKENS_PER_CHAPTER = 200
+
+def chapter_segments(transcript_data, chapters):
+    """Transcript segment texts spoken during each chapter (a list of strings per chapter).
+    
+    Whisper segment start times form a sorted index that is bisected at every chapter
+    start, so each segment lands in exactly one chapter. Segments before the first
+    chapter go to it and the last chapter runs to the end of the transcript. Transcripts
+    without segments fall back to an even words-per-second split (one piece per chapter).
+    """
+    segments = sorted(transcript_data.get('segments') or [], key=lambda segment: segment['start'])
+    if not segments:
+        words = transcript_data['text'].split()
+        words_per_second = len(words) / transcript_data['duration'] if transcript_data['duration'] else 0
+        return [[' '.join(words[int(chapter['start_time'] * words_per_second):
+                               int((chapter['start_time'] + chapter['duration']) * words_per_second)])]
+                for chapter in chapters]
+    
+    starts = [segment['start'] for segment in segments]
+    bounds = [0] + [bisect_left(starts, chapter['start_time']) for chapter in chapters[1:]] + [len(segments)]
+    return [[segment['text'].strip() for segment in segments[lo:hi]] for lo, hi in zip(bounds, bounds[1:])]
+
+def chapter_texts(transcript_data, chapters):
+    """Transcript text spoken during each chapter."""
+    return [' '.join(pieces) for pieces in chapter_segments(transcript_data, chapters)]
+
+def split_chapter(pieces, overhead_tokens, budget=REQUEST_TOKEN_BUDGET):
+    """Split a chapter's transcript pieces into contiguous parts that each fit one request.
+    
+    overhead_tokens is what the request costs with an empty transcript. Parts break between
+    segments; only a single segment longer than a whole request is broken between words.
+    Nothing is dropped: the parts joined with spaces give back the chapter's text.
+    """
+    available = budget - overhead_tokens
+    parts = []
+    current = []
+    current_tokens = 0
+    for piece in pieces:
+        piece_tokens = count_tokens(' ' + piece, MODEL)
+        if piece_tokens <= available:
+            units = [(piece, piece_tokens)]
+        else:
+            units = [(word, count_tokens(' ' + word, MODEL)) for word in piece.split()]
+        for text, tokens in units:
+            if current and current_tokens + tokens > available:
+                parts.append(' '.join(current))
+                current = []
+                current_tokens = 0
+            current.append(text)
+            current_tokens += tokens
+    if current:
+        parts.append(' '.join(current))
+    return parts
+
+def chapter_heading(chapter_number, chapter, part=1, parts=1):
+    """Heading of one chapter (or one part of a split chapter) in a prompt."""
+    heading = f"CHAPTER {chapter_number}: {chapter['title']} ({chapter['duration']:.0f}s)"
+    return heading + (f", PART {part} OF {parts}" if parts > 1 else "")
+
+def part_note(parts):
+    """Prompt paragraph for one part of a chapter that was too long to polish in one request."""
+    if parts == 1:
+        return ""
+    return f"""
+This chapter was too long to polish in one request, so it was split into {parts} parts that are
+polished separately and joined in order. Continue naturally from the previous part without
+re-introducing the chapter, and share the chapter's word target across its {parts} parts.
+"""
+
+def whole_video_prompt(transcript_data, chapters):
+    """Prompt for polishing the whole video in one request (full transcript plus chapter breakdown)."""
+    transcript_text = transcript_data['text']
+    
+    # Align transcript segments with chapter boundaries
+    chapter_segments = []
+    for i, (chapter, chapter_text) in enumerate(zip(chapters, chapter_texts(transcript_data, chapters))):
+        chapter_segments.append({
+            'chapter': i + 1,
+            'title': chapter['title'],
+            'duration': chapter['duration'],
+            'original_text': chapter_text.strip()
+        })
+    
+    return f"""You are creating polished video scripts from rough transcripts of software demonstrations.
 
 TRANSCRIPT TO ENHANCE:
 {transcript_text}
@@ -83,25 +156,391 @@ Return a JSON object with this structure:
 
 Focus on making this sound professional but conversational, like an expert explaining features to a colleague."""
 
-        response = client.chat.completions.create(
-            model="gpt-4",
+def fits_single_request(transcript_data, chapters_data):
+    """True if the whole-video prompt and its expected JSON response fit in REQUEST_TOKEN_BUDGET.
+    
+    The response echoes every chapter's original text next to its polished script.
+    """
+    chapters = chapters_data['chapters']
+    prompt_tokens = count_message_tokens([
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": whole_video_prompt(transcript_data, chapters)}
+    ], MODEL)
+    response_tokens = sum(count_tokens(text, MODEL) for text in chapter_texts(transcript_data, chapters))
+    response_tokens += RESPONSE_TOKENS_PER_CHAPTER * len(chapters)
+    return prompt_tokens + response_tokens <= REQUEST_TOKEN_BUDGET
+
+def validate_script_response(content):
+    """Raise unless content is a script JSON response (a malformed reply is then not cached)."""
+    chapters = json.loads(content)['chapters']
+    if not all('chapter' in chapter and 'enhanced_script' in chapter for chapter in chapters):
+        raise ValueError("response chapters need 'chapter' and 'enhanced_script'")
+
+def generate_script(transcript_data, chapters_data):
+    """Generate polished script using GPT."""
+    try:
+        print("  Connecting to OpenAI...")
+        client = OpenAI()
+        
+        print("  Generating enhanced script with GPT...")
+        
+        # Create prompt for script enhancement
+        prompt = whole_video_prompt(transcript_data, chapters_data['chapters'])
+        
+        content = chat_completion(
+            client,
+            validate=validate_script_response,
+            model=MODEL,
             messages=[
-                {"role": "system", "content": "You are a professional scriptwriter specializing in software demonstration videos. You excel at polishing rough transcripts while preserving technical accuracy."},
+                {"role": "system", "content": SYSTEM_PROMPT},
                 {"role": "user", "content": prompt}
             ],
             temperature=0.3
         )
         
         print("  ✓ Script generation completed")
-        return response.choices[0].message.content
+        return content
         
     except Exception as e:
         print(f"  ✗ Script generation failed: {e}")
         return None
 
+def chapter_prompt(chapter_number, chapter, chapter_text, outline, part=1, parts=1):
+    """Prompt for one chapter (or one part of it): its own transcript plus the chapter outline as context."""
+    return f"""You are polishing one chapter of a software demonstration video script.
+
+VIDEO OUTLINE (for context only):
+{outline}
+
+{chapter_heading(chapter_number, chapter, part, parts)}
+TRANSCRIPT OF THIS CHAPTER:
+{chapter_text}
+{part_note(parts)}
+Rewrite this chapter's transcript as a polished voice-over script that:
+
+1. **Preserves exact product terminology** - Keep all specific feature names, UI elements, and technical terms exactly as spoken
+2. **Improves clarity and flow** - Make the language more engaging and clear while maintaining the original meaning
+3. **Maintains natural pacing** - Keep the conversational tone appropriate for voice-over
+4. **Stays concise** - Target 75-80 words for natural delivery timing
+5. **Is a complete thought** - The chapter must stand on its own
+
+Return only the polished script text, with no title, labels or quotes.
+
+Focus on making this sound professional but conversational, like an expert explaining features to a colleague."""
+
+def script_lines(chapters):
+    """Script file lines: one sentence per line, blank lines between sentences and chapters."""
+    lines = []
+    for i, chapter in enumerate(chapters):
+        # Split enhanced script into sentences and add each as a separate line
+        sentences = chapter['enhanced_script'].replace('. ', '.\n').split('\n')
+        for sentence in sentences:
+            sentence = sentence.strip()
+            if sentence:
+                lines.append(sentence)
+                lines.append("")  # Empty line after each sentence
+        
+        # Add extra empty lines between chapters (except after last chapter)
+        if i < len(chapters) - 1:
+            lines.append("")  # Additional line break between chapters
+            lines.append("")  # Second line break for clear separation
+    return lines
+
+def chapter_request_tokens(chapter_number, chapter, chapter_text, outline, part=1, parts=1):
+    """Prompt tokens plus expected response tokens for one --per-chapter request."""
+    prompt_tokens = count_message_tokens([
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": chapter_prompt(chapter_number, chapter, chapter_text, outline, part, parts)}
+    ], MODEL)
+    return prompt_tokens + RESPONSE_TOKENS_PER_CHAPTER
+
+async def generate_script_per_chapter(transcript_data, chapters_data, script_generated_file):
+    """Polish every chapter with its own request, at most CHAPTER_CONCURRENCY at a time.
+    
+    A chapter too long for one request is polished in parts (split_chapter) that are joined.
+    Each finished chapter is written to script_generated_file straight away (chapters in
+    order, unfinished ones left out). Returns script data shaped like generate_script's JSON.
+    """
+    chapters = chapters_data['chapters']
+    pieces = chapter_segments(transcript_data, chapters)
+    texts = [' '.join(chapter_pieces) for chapter_pieces in pieces]
+    outline = '\n'.join(f"{i + 1}. {chapter['title']}" for i, chapter in enumerate(chapters))
+    
+    chapter_parts = []
+    for index, chapter in enumerate(chapters):
+        if chapter_request_tokens(index + 1, chapter, texts[index], outline) <= REQUEST_TOKEN_BUDGET:
+            chapter_parts.append([texts[index]])
+            continue
+        widest = max(2, len(texts[index].split()))
+        overhead = chapter_request_tokens(index + 1, chapter, '', outline, widest, widest)
+        chapter_parts.append(split_chapter(pieces[index], overhead))
+        print(f"  ⚠ Chapter {index + 1} is too long for one request: polishing it in {len(chapter_parts[-1])} parts")
+    
+    print("  Connecting to OpenAI...")
+    client = AsyncOpenAI()
+    semaphore = asyncio.Semaphore(CHAPTER_CONCURRENCY)
+    finished = {}
+    
+    async def polish_part(index, chapter, part_text, part, parts):
+        async with semaphore:
+            content = await async_chat_completion(
+                client,
+                model=MODEL,
+                messages=[
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": chapter_prompt(index + 1, chapter, part_text, outline, part, parts)}
+                ],
+                temperature=0.3
+            )
+        return content.strip()
+    
+    async def polish(index, chapter, chapter_text):
+        parts = chapter_parts[index]
+        part_scripts = await asyncio.gather(
+            *(polish_part(index, chapter, part_text, part + 1, len(parts)) for part, part_text in enumerate(parts))
+        )
+        enhanced_script = ' '.join(part_scripts)
+        finished[index] = {
+            'chapter': index + 1,
+            'title': chapter['title'],
+            'original_text': chapter_text,
+            'enhanced_script': enhanced_script,
+            'word_count': len(enhanced_script.split())
+        }
+        
+        # Stream: rewrite the file with every chapter finished so far (no awaits, so no interleaving)
+        temp_file = script_generated_file.with_suffix('.tmp')
+        temp_file.write_text('\n'.join(script_lines([finished[i] for i in sorted(finished)])))
+        temp_file.replace(script_generated_file)
+        print(f"  ✓ Chapter {index + 1} ({len(finished)}/{len(chapters)} done)")
+    
+    print(f"  Generating {len(chapters)} chapter scripts with GPT ({CHAPTER_CONCURRENCY} at a time)...")
+    results = await asyncio.gather(
+        *(polish(index, chapter, text) for index, (chapter, text) in enumerate(zip(chapters, texts))),
+        return_exceptions=True
+    )
+    failures = [result for result in results if isinstance(result, Exception)]
+    if failures:
+        print(f"  ✗ Script generation failed for {len(failures)} chapter(s): {failures[0]}")
+        return None
+    
+    print("  ✓ Script generation completed")
+    return {'chapters': [finished[index] for index in range(len(chapters))]}
+
+def group_prompt(group, chapters, outline):
+    """Prompt for one map request: a group's (index, part, parts, text) items plus the full outline.
+    
+    A group holds whole chapters, or a single part of a chapter that was split.
+    """
+    sections = '\n\n'.join(f"{chapter_heading(index + 1, chapters[index], part, parts)}\n{text}"
+                           for index, part, parts, text in group)
+    return f"""You are polishing part of a software demonstration video script.
+
+VIDEO OUTLINE (for context only):
+{outline}
+
+CHAPTERS TO POLISH:
+{sections}
+{part_note(group[0][2])}
+Rewrite each chapter's transcript as a polished voice-over script that:
+
+1. **Preserves exact product terminology** - Keep all specific feature names, UI elements, and technical terms exactly as spoken
+2. **Improves clarity and flow** - Make the language more engaging and clear while maintaining the original meaning
+3. **Maintains natural pacing** - Keep the conversational tone appropriate for voice-over
+4. **Stays concise** - Target 75-80 words per chapter for natural delivery timing
+5. **Is a complete thought** - Each chapter must stand on its own
+
+Return a JSON object with this structure:
+{{
+  "chapters": [
+    {{
+      "chapter": {group[0][0] + 1},
+      "enhanced_script": "polished script text"
+    }}
+  ],
+  "terms": ["Every product, feature and UI name used in your scripts, spelled as you wrote it"]
+}}
+
+Focus on making this sound professional but conversational, like an expert explaining features to a colleague."""
+
+def group_request_tokens(group, chapters, outline):
+    """Prompt tokens plus expected response tokens for one map request."""
+    prompt_tokens = count_message_tokens([
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": group_prompt(group, chapters, outline)}
+    ], MODEL)
+    return prompt_tokens + RESPONSE_TOKENS_PER_CHAPTER * len(group)
+
+def plan_chapter_groups(chapters, pieces, outline, budget=REQUEST_TOKEN_BUDGET):
+    """Split the chapters into map requests of (index, part, parts, text) items that each fit in budget.
+    
+    Contiguous whole chapters share a request while they fit. A chapter too long for a request
+    on its own is split at segment boundaries (split_chapter) and each part gets its own request.
+    """
+    groups = []
+    current = []
+    for index, chapter_pieces in enumerate(pieces):
+        item = (index, 1, 1, ' '.join(chapter_pieces))
+        if group_request_tokens([item], chapters, outline) > budget:
+            # Headings of split chapters name the part, so count them with the widest part numbers
+            widest = max(2, len(item[3].split()))
+            overhead = group_request_tokens([(index, widest, widest, '')], chapters, outline)
+            parts = split_chapter(chapter_pieces, overhead, budget)
+            print(f"  ⚠ Chapter {index + 1} is too long for one request: polishing it in {len(parts)} parts")
+            if current:
+                groups.append(current)
+                current = []
+            groups += [[(index, part + 1, len(parts), text)] for part, text in enumerate(parts)]
+            continue
+        if current and group_request_tokens(current + [item], chapters, outline) > budget:
+            groups.append(current)
+            current = []
+        current.append(item)
+    if current:
+        groups.append(current)
+    return groups
+
+def group_label(group):
+    """Human-readable name of a map request's chapters."""
+    index, part, parts, _ = group[0]
+    if parts > 1:
+        return f"chapter {index + 1} part {part}/{parts}"
+    if len(group) > 1:
+        return f"chapters {index + 1}-{group[-1][0] + 1}"
+    return f"chapter {index + 1}"
+
+def terminology_prompt(group_terms):
+    """Reduce prompt: the terms each group used, to be mapped onto one spelling."""
+    term_lines = '\n'.join(f"- Chapters {chapters}: {', '.join(terms)}" for chapters, terms in group_terms)
+    return f"""These product, feature and UI names were used in separately written parts of one video script:
+
+{term_lines}
+
+Some names refer to the same thing but are written differently (capitalization, spacing,
+hyphenation, singular/plural, abbreviations). Pick one canonical spelling for each, preferring
+the product's official-looking form.
+
+Return a JSON object mapping every variant that should change to its canonical spelling:
+{{
+  "replacements": {{
+    "variant as written": "Canonical Spelling"
+  }}
+}}
+
+Return {{"replacements": {{}}}} if the terminology is already consistent."""
+
+def apply_replacements(text, replacements):
+    """Replace whole-word occurrences of each variant, longest variants first."""
+    for variant in sorted(replacements, key=len, reverse=True):
+        canonical = replacements[variant]
+        if variant and canonical and variant != canonical:
+            text = re.sub(r'(?<!\w)' + re.escape(variant) + r'(?!\w)', lambda match: canonical, text)
+    return text
+
+def generate_script_map_reduce(transcript_data, chapters_data):
+    """Polish chapter groups independently, then unify terminology across them.
+    
+    Every request fits REQUEST_TOKEN_BUDGET, so the work grows linearly with the recording.
+    Returns script data shaped like generate_script's JSON, or None.
+    """
+    chapters = chapters_data['chapters']
+    pieces = chapter_segments(transcript_data, chapters)
+    texts = [' '.join(chapter_pieces).strip() for chapter_pieces in pieces]
+    outline = '\n'.join(f"{i + 1}. {chapter['title']}" for i, chapter in enumerate(chapters))
+    groups = plan_chapter_groups(chapters, pieces, outline)
+    
+    print("  Connecting to OpenAI...")
+    client = OpenAI()
+    
+    def polish_group(group):
+        label = group_label(group)
+        try:
+            content = chat_completion(
+                client,
+                validate=validate_script_response,
+                model=MODEL,
+                messages=[
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": group_prompt(group, chapters, outline)}
+                ],
+                temperature=0.3
+            )
+            data = json.loads(content)
+            scripts = {int(chapter['chapter']) - 1: chapter['enhanced_script'].strip() for chapter in data['chapters']}
+            missing = [index + 1 for index, _, _, _ in group if index not in scripts]
+            if missing:
+                print(f"  ✗ Response for {label} is missing chapter(s) {missing}")
+                return None
+            print(f"  ✓ Polished {label}")
+            return {(index, part): scripts[index] for index, part, _, _ in group}, [str(term) for term in data.get('terms', [])]
+        except (json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+            print(f"  ✗ Could not parse response for {label}: {e}")
+            return None
+        except Exception as e:
+            print(f"  ✗ Script generation failed for {label}: {e}")
+            return None
+    
+    print(f"  Transcript too long for one request: generating {len(chapters)} chapters "
+          f"in {len(groups)} requests ({CHAPTER_CONCURRENCY} at a time)...")
+    with ThreadPoolExecutor(max_workers=min(CHAPTER_CONCURRENCY, len(groups))) as executor:
+        results = list(executor.map(polish_group, groups))
+    if not all(results):
+        return None
+    
+    part_scripts = {}
+    group_terms = []
+    for group, (group_scripts, terms) in zip(groups, results):
+        part_scripts.update(group_scripts)
+        if terms:
+            group_terms.append((group_label(group).split(' ', 1)[1], sorted(set(terms))))
+    # Parts of a split chapter are joined back in order
+    scripts = {index: ' '.join(part_scripts[key] for key in sorted(part_scripts) if key[0] == index)
+               for index in range(len(chapters))}
+    
+    # Reduce: one spelling per product term across all groups (skipped if it would not fit)
+    if len(groups) > 1 and group_terms:
+        prompt = terminology_prompt(group_terms)
+        if count_tokens(prompt, MODEL) + RESPONSE_TOKENS_PER_CHAPTER <= REQUEST_TOKEN_BUDGET:
+            print("  Unifying terminology across chapter groups...")
+            try:
+                content = chat_completion(
+                    client,
+                    validate=json.loads,
+                    model=MODEL,
+                    messages=[
+                        {"role": "system", "content": SYSTEM_PROMPT},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=0
+                )
+                replacements = json.loads(content).get('replacements') or {}
+                changed = 0
+                for index, script in scripts.items():
+                    scripts[index] = apply_replacements(script, replacements)
+                    changed += scripts[index] != script
+                print(f"  ✓ Terminology unified ({len(replacements)} variant(s), {changed} chapter(s) updated)")
+            except Exception as e:
+                print(f"  ⚠ Terminology pass failed, keeping chapter wording as generated: {e}")
+        else:
+            print("  ⚠ Too many terms for one terminology pass, keeping chapter wording as generated")
+    
+    print("  ✓ Script generation completed")
+    return {'chapters': [
+        {
+            'chapter': index + 1,
+            'title': chapter['title'],
+            'original_text': texts[index],
+            'enhanced_script': scripts[index],
+            'word_count': len(scripts[index].split())
+        }
+        for index, chapter in enumerate(chapters)
+    ]}
+
 def main():
-    if len(sys.argv) != 2:
-        print("Usage: python 3_generate_master_script.py <directory>")
+    args = [arg for arg in apply_bypass_flag(sys.argv[1:]) if arg != '--per-chapter']
+    per_chapter = '--per-chapter' in sys.argv
+    if len(args) != 1:
+        print("Usage: python 3_generate_master_script.py <directory> [--per-chapter] [--no-llm-cache]")
         print("Example: python 3_generate_master_script.py current-project/")
         sys.exit(1)
     
@@ -110,7 +549,7 @@ def main():
         print("✗ OPENAI_API_KEY environment variable not set")
         sys.exit(1)
     
-    directory = Path(sys.argv[1])
+    directory = Path(args[0])
     if not directory.exists():
         print(f"✗ Directory not found: {directory}")
         sys.exit(1)
@@ -190,30 +629,29 @@ def main():
     
     print(f"Processing {len(chapters_data['chapters'])} chapters")
     
-    # Generate script
-    script_response = generate_script(transcript_data, chapters_data)
-    if not script_response:
-        sys.exit(1)
+    # Generate script (one request for the whole video, one per chapter, or map-reduce over
+    # chapter groups when the whole video does not fit in one request)
+    script_response = None
+    if per_chapter:
+        script_data = asyncio.run(generate_script_per_chapter(transcript_data, chapters_data, script_generated_file))
+        if not script_data:
+            sys.exit(1)
+    elif fits_single_request(transcript_data, chapters_data):
+        script_response = generate_script(transcript_data, chapters_data)
+        if not script_response:
+            sys.exit(1)
+    else:
+        script_data = generate_script_map_reduce(transcript_data, chapters_data)
+        if not script_data:
+            sys.exit(1)
     
     try:
         # Parse JSON response
-        script_data = json.loads(script_response)
+        if script_response is not None:
+            script_data = json.loads(script_response)
         
         # Create simple final script file (one line per sentence, no chapter headers)
-        final_script_lines = []
-        for i, chapter in enumerate(script_data['chapters']):
-            # Split enhanced script into sentences and add each as a separate line
-            sentences = chapter['enhanced_script'].replace('. ', '.\n').split('\n')
-            for sentence in sentences:
-                sentence = sentence.strip()
-                if sentence:
-                    final_script_lines.append(sentence)
-                    final_script_lines.append("")  # Empty line after each sentence
-            
-            # Add extra empty lines between chapters (except after last chapter)
-            if i < len(script_data['chapters']) - 1:
-                final_script_lines.append("")  # Additional line break between chapters
-                final_script_lines.append("")  # Second line break for clear separation
+        final_script_lines = script_lines(script_data['chapters'])
         
         # Save review script in same format as resemble-a-roll.txt
         with open(script_review_file, 'w') as f:
@@ -4,114 +4,279 @@ Step 4: Script Verification
 - Analyze edited script for quality and issues
 - Provide content verification report
 - Check for grammar, flow, and video script quality
+- Incremental: per-chapter hashes are stored in script-verification-state.json, so only
+  chapters whose text changed are re-verified and merged into the report
+- Suggested revisions come back as sentence diffs, not a full rewrite
+- Local metrics (script_metrics) run first: pacing, word targets, readability and repetition
+  go into the report, a broken script is rejected before any GPT call, and GPT is asked for
+  style feedback only (--metrics-only skips GPT entirely)
+- The overall assessment is built from compact inputs (chapter titles, metrics, review
+  summaries, opening and closing lines), not the full script, and is only asked again when
+  those inputs change
+- An unchanged script reuses the cached report (llm_cache); --no-llm-cache asks GPT again
 """
 
 import os
+import re
 import sys
 import json
 import glob
+import time
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from openai import OpenAI
 from dotenv import load_dotenv
 
+from llm_cache import chat_completion, apply_bypass_flag
+from script_metrics import split_script_chapters, analyze_script, format_metrics
+from token_budget import count_message_tokens, context_tokens
+
 # Load environment variables
 load_dotenv()
 
-def verify_script_quality(script_content, chapters_data):
-    """Verify script quality using GPT."""
+SYSTEM_PROMPT = "You are a professional video script analyst with expertise in marketing content, technical documentation, and video production. You provide detailed, constructive feedback to help improve script quality."
+
+MODEL = "gpt-4"
+
+# The overall assessment prompt plus its expected response must fit here (headroom as in step 3)
+REQUEST_TOKEN_BUDGET = context_tokens(MODEL) * 3 // 4
+OVERALL_RESPONSE_TOKENS = 800
+
+# Per-chapter hashes and reviews, kept next to the report so unchanged chapters are not re-verified
+STATE_FILE_NAME = "script-verification-state.json"
+# Bump when the prompts change, so stored reviews are not reused
+PROMPT_VERSION = 3
+
+# Chapter reviews in flight at once
+VERIFY_CONCURRENCY = 4
+
+def chapter_hash(text, chapter):
+    """Hash of what a chapter review depends on: its sentences, title, duration and the prompts."""
+    sentences = [' '.join(line.split()) for line in text.splitlines() if line.strip()]
+    payload = json.dumps({
+        'version': PROMPT_VERSION,
+        'sentences': sentences,
+        'title': chapter.get('title') if chapter else None,
+        'duration': round(chapter['duration'], 1) if chapter else None
+    })
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def load_state(state_file):
     try:
-        print("  Connecting to OpenAI...")
-        client = OpenAI()
-        
-        video_chapters = chapters_data['chapters']
-        
-        print("  Analyzing script quality with GPT...")
-        
-        prompt = f"""You are a professional video script analyst. Please analyze this marketing video script for quality and provide a comprehensive report.
+        with open(state_file, 'r') as f:
+            state = json.load(f)
+        return state if state.get('version') == PROMPT_VERSION else {}
+    except (OSError, json.JSONDecodeError, AttributeError):
+        return {}
+
+def save_state(state_file, state):
+    temp_file = state_file.with_suffix('.tmp')
+    with open(temp_file, 'w') as f:
+        json.dump(state, f, indent=2)
+    temp_file.replace(state_file)
+
+def chapter_label(index, chapter):
+    if chapter:
+        return f"Chapter {index + 1}: {chapter['title']} ({chapter['duration']:.0f}s of video)"
+    return f"Chapter {index + 1}"
+
+def verify_chapter(client, index, text, chapter, chapter_count, metrics):
+    """Review one chapter's style; suggested revisions come back as sentence diffs, not a rewrite."""
+    prompt = f"""You are reviewing one chapter of a marketing video voice-over script.
+
+{chapter_label(index, chapter)} (of {chapter_count})
+CHAPTER SCRIPT:
+{text}
+
+Length, pacing and repetition were measured separately ({metrics['words']} words); do not comment on them.
+Please review this chapter's style for:
+- Clarity, grammar and awkward phrasing
+- Natural speech for voice-over delivery
+- Technical accuracy and terminology usage
+- Confusing statements or missing information
+
+Respond in exactly this format:
+
+**Assessment:** one or two sentences
+
+**Issues:**
+- one bullet per issue (or "None")
+
+**Suggested edits:**
+- original sentence exactly as written
++ revised sentence
+
+List only the sentences you would change, each as a "-" line followed by its "+" line, with a
+blank line between edits. Write "None" if no edits are needed. Do not rewrite the whole chapter."""
+
+    return chat_completion(
+        client,
+        model=MODEL,
+        messages=[
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.2
+    ).strip()
 
-SCRIPT TO ANALYZE:
-{script_content}
+def review_summary(review):
+    """The assessment sentence(s) of a stored chapter review, or its first line."""
+    match = re.search(r'\*\*Assessment:\*\*\s*(.+)', review)
+    return (match.group(1) if match else review.strip().split('\n', 1)[0]).strip()
 
-ORIGINAL VIDEO STRUCTURE (for reference):
-- Total duration: {sum(ch['duration'] for ch in video_chapters):.1f} seconds
-- {len(video_chapters)} chapters
-- Chapter breakdown: {json.dumps(video_chapters, indent=2)}
+def chapter_overview(index, text, chapter, metrics, review, with_lines):
+    """Compact stand-in for one chapter in the overall assessment."""
+    measured = f"{metrics['words']} words"
+    if metrics['words_per_second']:
+        measured += f", {metrics['words_per_second']:.1f} words/s"
+    if metrics['reading_ease'] is not None:
+        measured += f", reading ease {metrics['reading_ease']:.0f}"
+    lines = [f"{chapter_label(index, chapter)} - {measured}", f"  Review: {review_summary(review)}"]
+    sentences = [line.strip() for line in text.splitlines() if line.strip()]
+    if with_lines and sentences:
+        lines.append(f"  Opens: {sentences[0]}")
+        if len(sentences) > 1:
+            lines.append(f"  Closes: {sentences[-1]}")
+    return '\n'.join(lines)
 
-Please provide a detailed analysis covering:
+def overall_prompt(texts, chapters, analysis, reviews):
+    """Prompt for the whole-script assessment, or None if it cannot fit REQUEST_TOKEN_BUDGET.
+    
+    The full script is not sent: each chapter is represented by its title, metrics, the
+    summary of its own review and its opening and closing lines (dropped first if too long).
+    """
+    total_duration = sum(chapter['duration'] for chapter in chapters if chapter)
+    for with_lines in (True, False):
+        overview = '\n\n'.join(chapter_overview(index, text, chapter, analysis['chapters'][index], reviews[index], with_lines)
+                               for index, (text, chapter) in enumerate(zip(texts, chapters)))
+        prompt = f"""You are a professional video script analyst. Please assess this marketing video script as a whole.
+
+Each chapter was reviewed separately. Instead of the full script you get, per chapter, its
+measurements, a summary of its review{" and its opening and closing lines" if with_lines else ""}.
+
+CHAPTER OVERVIEW ({len(texts)} chapters, {total_duration:.1f} seconds of video):
+{overview}
+
+Please provide a concise analysis covering:
 
 1. **OVERALL QUALITY SCORE** (1-10 scale)
    - Rate the script's effectiveness as a marketing video script
 
 2. **CONTENT ANALYSIS**
    - Clarity and coherence of the message
-   - Professional tone and marketing effectiveness
-   - Technical accuracy and terminology usage
    - Flow between chapters and logical progression
+   - Consistency in tone, style and terminology across chapters
 
-3. **GRAMMAR AND LANGUAGE**
-   - Grammar errors or awkward phrasing
-   - Sentence structure and readability
-   - Consistency in tone and style
-
-4. **VIDEO SCRIPT SUITABILITY**
-   - Appropriateness for voice-over delivery
-   - Pacing and natural speech patterns
+3. **VIDEO SCRIPT SUITABILITY**
    - Engagement factor for video audience
    - Call-to-action effectiveness
 
-5. **POTENTIAL ISSUES**
-   - Redundancy or unnecessary repetition
-   - Confusing or unclear statements
-   - Missing important information
-   - Overly technical or overly simple language
-
-6. **RECOMMENDATIONS**
-   - Specific improvements to consider
-   - Suggested edits or rephrasing
-   - Overall strategic suggestions
-
-7. **SUGGESTED REVISION**
-   - Provide a complete revised version of the script incorporating all your recommendations
-   - Format it exactly like the original with chapter headers and one sentence per line
-   - Example format:
-     Chapter 1
-     First sentence.
-     Second sentence.
-     
-     Chapter 2
-     First sentence.
-     Second sentence.
-
-Please format your response as a structured report with clear headings and actionable feedback. Be honest about both strengths and areas for improvement."""
-
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are a professional video script analyst with expertise in marketing content, technical documentation, and video production. You provide detailed, constructive feedback to help improve script quality."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.2
-        )
+4. **RECOMMENDATIONS**
+   - The most important strategic improvements
+
+Do not include a revised script or sentence-level edits; each chapter is reviewed separately."""
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+        if count_message_tokens(messages, MODEL) + OVERALL_RESPONSE_TOKENS <= REQUEST_TOKEN_BUDGET:
+            return prompt
+    return None
+
+def verify_overall(client, prompt):
+    """Whole-script assessment (score, flow, consistency); chapter edits are reported separately."""
+    return chat_completion(
+        client,
+        model=MODEL,
+        messages=[
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.2
+    ).strip()
+
+def verify_script_quality(script_content, chapters_data, state_file, analysis):
+    """Verify script style using GPT, re-verifying only chapters whose text changed.
+    
+    analysis is script_metrics.analyze_script's result for the same script (with no errors).
+    Returns (merged report text, chapters re-verified, chapters), or None on failure.
+    """
+    try:
+        video_chapters = chapters_data['chapters']
+        texts = split_script_chapters(script_content)
+        chapters = [video_chapters[i] if i < len(video_chapters) else None for i in range(len(texts))]
+        hashes = [chapter_hash(text, chapter) for text, chapter in zip(texts, chapters)]
+        
+        state = load_state(state_file)
+        previous = {entry['hash']: entry['review'] for entry in state.get('chapters', [])}
+        changed = [index for index, digest in enumerate(hashes) if digest not in previous]
+        print(f"  {len(changed)} of {len(texts)} chapters changed since the last verification")
+        
+        reviews = {index: previous[digest] for index, digest in enumerate(hashes) if digest in previous}
+        client = None
+        if changed:
+            print("  Connecting to OpenAI...")
+            client = OpenAI()
+            
+            print("  Analyzing script quality with GPT...")
+            with ThreadPoolExecutor(max_workers=VERIFY_CONCURRENCY) as executor:
+                chapter_futures = {index: executor.submit(verify_chapter, client, index, texts[index],
+                                                          chapters[index], len(texts), analysis['chapters'][index])
+                                   for index in changed}
+                for index, future in chapter_futures.items():
+                    reviews[index] = future.result()
+                    print(f"  ✓ Chapter {index + 1} verified")
+        
+        # The overall assessment only depends on its compact prompt, so it is reused while that is unchanged
+        prompt = overall_prompt(texts, chapters, analysis, reviews)
+        overall_hash = hashlib.sha256(prompt.encode('utf-8')).hexdigest() if prompt else None
+        overall = state.get('overall')
+        if prompt is None:
+            print("  ⚠ Too many chapters for an overall assessment in one request, skipping it")
+            overall = "Skipped: the chapter overview does not fit in one request."
+        elif overall is None or state.get('overall_hash') != overall_hash:
+            if client is None:
+                print("  Connecting to OpenAI...")
+                client = OpenAI()
+            print("  Assessing the script as a whole...")
+            overall = verify_overall(client, prompt)
+            print("  ✓ Overall assessment completed")
+        
+        if changed or overall_hash != state.get('overall_hash'):
+            save_state(state_file, {
+                'version': PROMPT_VERSION,
+                'overall': overall,
+                'overall_hash': overall_hash,
+                'chapters': [{'hash': digest, 'review': reviews[index]} for index, digest in enumerate(hashes)]
+            })
+        
+        sections = [format_metrics(analysis), "## Overall Assessment\n", overall, ""]
+        for index, chapter in enumerate(chapters):
+            status = "re-verified" if index in changed else "unchanged since last run"
+            sections += [f"## {chapter_label(index, chapter)} ({status})\n", reviews[index], ""]
         
         print("  ✓ Script verification completed")
-        return response.choices[0].message.content
+        return '\n'.join(sections), len(changed), len(texts)
         
     except Exception as e:
         print(f"  ✗ Script verification failed: {e}")
         return None
 
 def main():
-    if len(sys.argv) != 2:
-        print("Usage: python 4_verify_script.py <directory>")
+    args = [arg for arg in apply_bypass_flag(sys.argv[1:]) if arg != '--metrics-only']
+    metrics_only = '--metrics-only' in sys.argv
+    if len(args) != 1:
+        print("Usage: python 4_verify_script.py <directory> [--metrics-only] [--no-llm-cache]")
         print("Example: python 4_verify_script.py current-project/")
         sys.exit(1)
     
     # Check for OpenAI API key
-    if not os.getenv('OPENAI_API_KEY'):
+    if not metrics_only and not os.getenv('OPENAI_API_KEY'):
         print("✗ OPENAI_API_KEY environment variable not set")
         sys.exit(1)
     
-    directory = Path(sys.argv[1])
+    directory = Path(args[0])
     if not directory.exists():
         print(f"✗ Directory not found: {directory}")
         sys.exit(1)
@@ -163,26 +328,51 @@ def main():
     print(f"  Script length: {len(script_content.split())} words")
     print(f"  Video chapters: {len(chapters_data['chapters'])}")
     
-    # Verify script
-    verification_report = verify_script_quality(script_content, chapters_data)
-    if not verification_report:
-        sys.exit(1)
+    # Local metrics first: a broken script is rejected without calling GPT
+    started = time.perf_counter()
+    analysis = analyze_script(split_script_chapters(script_content), chapters_data['chapters'])
+    print(f"  Local metrics: {len(analysis['errors'])} errors, {len(analysis['warnings'])} warnings "
+          f"({(time.perf_counter() - started) * 1000:.0f} ms)")
+    for warning in analysis['warnings']:
+        print(f"  ⚠ {warning}")
+    for error in analysis['errors']:
+        print(f"  ✗ {error}")
     
-    # Save verification report
     report_file = directory / "script-verification-report.txt"
+    state_file = directory / STATE_FILE_NAME
+    if analysis['errors'] or metrics_only:
+        status = "Rejected by local metrics (GPT review skipped)" if analysis['errors'] else "Local metrics only"
+        verification_report, changed_count, chapter_count = format_metrics(analysis), 0, len(analysis['chapters'])
+    else:
+        # Verify script style (only chapters changed since the last run)
+        status = "Verified"
+        result = verify_script_quality(script_content, chapters_data, state_file, analysis)
+        if not result:
+            sys.exit(1)
+        verification_report, changed_count, chapter_count = result
+    
+    # Save verification report
     with open(report_file, 'w') as f:
         f.write("# Script Verification Report\n")
         f.write("=" * 50 + "\n\n")
         f.write(f"**Script File:** {script_final_file.name}\n")
         f.write(f"**Analysis Date:** {Path().cwd()}\n")
-        f.write(f"**Word Count:** {len(script_content.split())} words\n\n")
+        f.write(f"**Word Count:** {len(script_content.split())} words\n")
+        f.write(f"**Status:** {status}\n")
+        f.write(f"**Chapters Re-verified:** {changed_count} of {chapter_count}\n\n")
         f.write(verification_report)
     
+    if analysis['errors']:
+        print(f"\n✗ Script rejected: fix the errors above in {script_final_file.name} (see {report_file.name})")
+        sys.exit(1)
+    
     print("\n" + "=" * 50)
     print("STEP 4 COMPLETED!")
     print("=" * 50)
     print("Created files:")
     print(f"  ✓ {report_file.name} (verification report)")
+    if state_file.exists():
+        print(f"  ✓ {state_file.name} (per-chapter hashes for the next run)")
     
     print(f"\n📝 NEXT STEPS:")
     print(f"   1. Review the verification report in '{report_file.name}'")
@@ -3,120 +3,52 @@
 Step 6: Match Video to Audio Timing
 - Extend or trim video chapters to match audio length + 1 second
 - Use freeze frame extension or cutting as needed
+- Chapters already in the intermediate format (intra-only, same profile, pix_fmt and size)
+  are trimmed by a frame-exact stream copy instead of a re-encode
+- Chapters already in the assembly format (step 1 conforms them, smart-cut ones included) get no scale/fps filter
+- Chapters are fitted by parallel workers sharing the CPU budget
 """
 
 import sys
 import json
-import subprocess
+import shutil
+from functools import partial
 from pathlib import Path
 
-def run_command(cmd, description):
-    """Run command with error handling."""
-    try:
-        print(f"  {description}...")
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
-        if result.returncode == 0:
-            print(f"  ✓ {description} completed")
-            return True
-        else:
-            print(f"  ✗ {description} failed: {result.stderr}")
-            return False
-    except Exception as e:
-        print(f"  ✗ Error in {description}: {e}")
-        return False
-
-def get_video_duration(video_file):
-    """Get video file duration."""
-    try:
-        cmd = ['ffprobe', '-v', 'quiet', '-show_entries', 'format=duration', '-of', 'csv=p=0', str(video_file)]
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode == 0:
-            return float(result.stdout.strip())
-    except Exception as e:
-        print(f"✗ Error getting duration: {e}")
-    return None
-
-def get_audio_duration(audio_file):
-    """Get audio file duration."""
-    try:
-        cmd = ['ffprobe', '-v', 'quiet', '-show_entries', 'format=duration', '-of', 'csv=p=0', str(audio_file)]
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode == 0:
-            return float(result.stdout.strip())
-    except Exception as e:
-        print(f"✗ Error getting duration: {e}")
-    return None
+from artifact_cache import run_cached_call, file_identity
+from pipeline_trace import configure_trace
+from media_probe import get_duration
+from media_backend import intermediate_settings, get_backend
+from media_format import target_format
+from chapter_pool import plan_workers, run_jobs
 
-def match_video_to_audio(chapter_video, chapter_audio, output_file):
-    """Match video duration to audio duration (video-only output)."""
-    video_duration = get_video_duration(chapter_video)
-    audio_duration = get_audio_duration(chapter_audio)
+def match_video_to_audio(chapter_video, chapter_audio, output_file, temp_dir, settings, threads=None):
+    """Match video duration to audio duration (video-only output, encoded with settings)."""
+    video_duration = get_duration(chapter_video)
+    audio_duration = get_duration(chapter_audio)
     
     if not video_duration or not audio_duration:
         return False
     
-    print(f"    Video: {video_duration:.1f}s, Audio: {audio_duration:.1f}s")
+    print(f"    {output_file.name} - Video: {video_duration:.1f}s, Audio: {audio_duration:.1f}s")
     
     # Create video-only file matching audio duration (no audio track)
     # If video is shorter, extend with freeze frame; if longer, trim to audio duration
     if video_duration < audio_duration:
-        # Extend video with freeze frame (hold last frame) to match audio duration
-        extension_duration = audio_duration - video_duration
-        temp_frame = output_file.parent / f"temp_lastframe_{output_file.stem}.png"
-        temp_freeze_video = output_file.parent / f"temp_freeze_{output_file.stem}.mov"
-        
-        # Extract frame from ~20 frames before the end (to avoid black frames)
-        frame_time = max(0, video_duration - (20/30))  # 20 frames at 30fps = 0.67s before end
-        extract_cmd = [
-            'ffmpeg', '-ss', str(frame_time), '-i', str(chapter_video),
-            '-vframes', '1', '-q:v', '1', '-y', str(temp_frame)
-        ]
-        
-        if not run_command(extract_cmd, "Extracting last frame"):
-            return False
-        
-        # Create freeze frame video at 4K resolution
-        freeze_cmd = [
-            'ffmpeg', '-loop', '1', '-i', str(temp_frame),
-            '-c:v', 'prores_ks', '-profile:v', '2', '-pix_fmt', 'yuv422p10le',
-            '-t', str(extension_duration), '-r', '30', '-s', '1920x1080', '-y', str(temp_freeze_video)
-        ]
-        
-        if not run_command(freeze_cmd, f"Creating freeze frame video ({extension_duration:.1f}s)"):
-            return False
-        
-        # Concatenate original + freeze frame
-        concat_file = output_file.parent / f"temp_concat_{output_file.stem}.txt"
-        with open(concat_file, 'w') as f:
-            f.write(f"file '{chapter_video.resolve()}'\n")
-            f.write(f"file '{temp_freeze_video.resolve()}'\n")
-        
-        concat_cmd = [
-            'ffmpeg', '-f', 'concat', '-safe', '0', '-i', str(concat_file),
-            '-c:v', 'prores_ks', '-profile:v', '2', '-pix_fmt', 'yuv422p10le',
-            '-s', '1920x1080', '-an', '-y', str(output_file)
-        ]
-        
-        result = run_command(concat_cmd, f"Concatenating with freeze frame")
-        
-        # Clean up temp files
-        for temp_file in [temp_frame, temp_freeze_video, concat_file]:
-            if temp_file.exists():
-                temp_file.unlink()
-        
-        return result
+        description = f"Extending {output_file.name} with freeze frame ({audio_duration - video_duration:.1f}s)"
     else:
-        # Trim video to match audio duration at 4K resolution
-        cmd = [
-            'ffmpeg', '-i', str(chapter_video),
-            '-c:v', 'prores_ks', '-profile:v', '2', '-pix_fmt', 'yuv422p10le',
-            '-t', str(audio_duration), '-s', '1920x1080', '-an', '-y', str(output_file)
-        ]
-        return run_command(cmd, f"Trimming video to {audio_duration:.1f}s")
+        description = f"Trimming {output_file.name} to {audio_duration:.1f}s"
+    
+    backend = get_backend()
+    return run_cached_call(
+        [backend.name, 'fit_video', audio_duration, settings], description,
+        [chapter_video, chapter_audio], [output_file], temp_dir,
+        lambda: backend.fit_video(chapter_video, output_file, audio_duration, settings, threads)
+    )
 
-def process_chapter_videos(chapters_dir, processed_voice_dir, temp_dir):
+def process_chapter_videos(chapters_dir, processed_voice_dir, temp_dir, settings):
     """Process all chapter videos to match audio timing (no hardcoded timing file)."""
-    timed_videos = []
+    chapter_jobs = []
     timed_videos_dir = temp_dir / "timed_chapters"
     timed_videos_dir.mkdir(exist_ok=True)
     
@@ -139,23 +71,34 @@ def process_chapter_videos(chapters_dir, processed_voice_dir, temp_dir):
                 return None
             break
         
-        print(f"Processing chapter {chapter_num}...")
+        print(f"Preparing chapter {chapter_num}...")
         
-        # Copy processed audio to timed_chapters for assembly pipeline
-        if not timed_audio.exists():
-            import shutil
+        # Copy processed audio to timed_chapters for assembly pipeline (refresh when the voice changed)
+        source_identity = file_identity(chapter_audio)
+        copied_identity = file_identity(timed_audio)
+        if not copied_identity or (copied_identity['size'], copied_identity['mtime_ns']) != (source_identity['size'], source_identity['mtime_ns']):
             shutil.copy2(chapter_audio, timed_audio)
             print(f"  ✓ Copied audio: {timed_audio.name}")
         
-        # Match video to audio timing
-        if match_video_to_audio(chapter_video, chapter_audio, timed_video):
-            timed_videos.append(timed_video)
-            print(f"  ✓ Timed video: {timed_video.name}")
-        else:
-            return None
-        
+        chapter_jobs.append((chapter_video, chapter_audio, timed_video))
         chapter_num += 1
     
+    # Match video to audio timing, several chapters at a time
+    workers, threads = plan_workers(len(chapter_jobs))
+    print(f"Matching {len(chapter_jobs)} chapters with {workers} worker(s), {threads} thread(s) each...")
+    results = run_jobs([
+        partial(match_video_to_audio, chapter_video, chapter_audio, timed_video, temp_dir, settings, threads)
+        for chapter_video, chapter_audio, timed_video in chapter_jobs
+    ], workers)
+    
+    timed_videos = []
+    for (_, _, timed_video), result in zip(chapter_jobs, results):
+        if not result:
+            print(f"  ✗ Could not time {timed_video.name}")
+            return None
+        timed_videos.append(timed_video)
+        print(f"  ✓ Timed video: {timed_video.name}")
+    
     print(f"  Processed {len(timed_videos)} chapters")
     return timed_videos
 
@@ -190,12 +133,18 @@ def main():
         print("Run step 8 first: python 8_process_voice.py current-project/")
         sys.exit(1)
     
+    configure_trace(temp_dir, "step 6")
+    
     print("Step 6: Match Video to Audio Timing")
     print("=" * 50)
     print("Matching chapter videos to processed audio timing (no hardcoded timing file)")
     
     # Process videos using dynamic detection
-    timed_videos = process_chapter_videos(chapters_dir, processed_voice_dir, temp_dir)
+    # Timed chapters are in the assembly format; chapters step 1 already conformed are not scaled again
+    settings = {**intermediate_settings(directory), **target_format(directory)}
+    print(f"Intermediate codec: {settings['video_codec']} ({settings['pixel_format']}, "
+          f"{settings['resolution']} @ {settings['frame_rate']} fps)")
+    timed_videos = process_chapter_videos(chapters_dir, processed_voice_dir, temp_dir, settings)
     if not timed_videos:
         sys.exit(1)
     
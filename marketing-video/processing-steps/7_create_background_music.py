@@ -9,34 +9,10 @@ Step 7: Create Background Music Track
 
 import sys
 import json
-import subprocess
 from pathlib import Path
 
-def run_command(cmd, description):
-    """Run command with error handling."""
-    try:
-        print(f"  {description}...")
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
-        if result.returncode == 0:
-            print(f"  ✓ {description} completed")
-            return True
-        else:
-            print(f"  ✗ {description} failed: {result.stderr}")
-            return False
-    except Exception as e:
-        print(f"  ✗ Error in {description}: {e}")
-        return False
-
-def detect_file_duration(file_path):
-    """Get duration of audio/video file using ffprobe."""
-    try:
-        cmd = ['ffprobe', '-v', 'quiet', '-show_entries', 'format=duration', '-of', 'csv=p=0', str(file_path)]
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode == 0:
-            return float(result.stdout.strip())
-    except Exception as e:
-        print(f"  ⚠ Could not detect duration for {file_path}: {e}")
-    return 0.0
+from pipeline_trace import configure_trace, run_command
+from media_probe import get_duration
 
 def get_video_timing_structure_from_files(project_dir, project_config):
     """Calculate video timing structure from actual processed files."""
@@ -48,7 +24,7 @@ def get_video_timing_structure_from_files(project_dir, project_config):
     if intro_video_path:
         intro_file = project_dir.parent / intro_video_path
         if intro_file.exists():
-            intro_duration = detect_file_duration(intro_file)
+            intro_duration = get_duration(intro_file) or 0.0
             print(f"  Detected intro duration: {intro_duration:.1f}s")
         else:
             print(f"  ⚠ Intro video file not found: {intro_file}")
@@ -64,7 +40,7 @@ def get_video_timing_structure_from_files(project_dir, project_config):
         for i in range(1, 10):  # Support up to 9 chapters
             chapter_file = processed_voice_dir / f"chapter_{i}_processed.wav"
             if chapter_file.exists():
-                duration = detect_file_duration(chapter_file)
+                duration = get_duration(chapter_file) or 0.0
                 total_chapters_duration += duration
                 chapter_count += 1
                 print(f"  Detected chapter {i} duration: {duration:.1f}s")
@@ -75,7 +51,7 @@ def get_video_timing_structure_from_files(project_dir, project_config):
     if outro_video_path:
         outro_file = project_dir.parent / outro_video_path
         if outro_file.exists():
-            outro_duration = detect_file_duration(outro_file)
+            outro_duration = get_duration(outro_file) or 0.0
             print(f"  Detected outro duration: {outro_duration:.1f}s")
         else:
             print(f"  ⚠ Outro video file not found: {outro_file}")
@@ -294,6 +270,8 @@ def main():
         print("Project config file is required for music file paths and volume levels")
         sys.exit(1)
     
+    configure_trace(temp_dir, "step 7")
+    
     print("Step 7: Create Final Audio Track")
     print("=" * 50)
     print("Detecting timing from actual processed files...")
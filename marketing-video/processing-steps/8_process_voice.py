@@ -9,39 +9,27 @@ Step 8: Process Voice Files
 
 import sys
 import json
-import subprocess
 from pathlib import Path
 
-def run_command(cmd, description):
-    """Run command with error handling."""
-    try:
-        print(f"  {description}...")
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
-        if result.returncode == 0:
-            print(f"  ✓ {description} completed")
-            return True
-        else:
-            print(f"  ✗ {description} failed: {result.stderr}")
-            return False
-    except Exception as e:
-        print(f"  ✗ Error in {description}: {e}")
-        return False
+from artifact_cache import run_cached_call
+from pipeline_trace import configure_trace
+from media_backend import get_backend
+
+# Normalize → limit to -5dB with 4:1 ratio → normalize again
+VOICE_FILTER = 'loudnorm=I=-16:TP=-1.5:LRA=11,compand=attacks=0.3:decays=0.8:points=-80/-80|-5/-5|20/-5,loudnorm=I=-16:TP=-1.5:LRA=11'
 
-def process_voice_file(input_file, output_file, description):
+def process_voice_file(input_file, output_file, description, temp_dir):
     """Apply normalization and limiting to a voice file."""
     if not input_file.exists():
         print(f"  ⚠ Skipping {description} - file not found: {input_file}")
         return True
     
-    # FFmpeg command with normalize → limit to -5dB with 4:1 ratio → normalize again
-    cmd = [
-        'ffmpeg', '-i', str(input_file),
-        '-af', 'loudnorm=I=-16:TP=-1.5:LRA=11,compand=attacks=0.3:decays=0.8:points=-80/-80|-5/-5|20/-5,loudnorm=I=-16:TP=-1.5:LRA=11',
-        '-c:a', 'pcm_s16le', '-ar', '48000', '-ac', '1',
-        '-y', str(output_file)
-    ]
-    
-    return run_command(cmd, f"Processing {description}")
+    backend = get_backend()
+    return run_cached_call(
+        [backend.name, 'filter_audio', VOICE_FILTER, 48000, 1], f"Processing {description}",
+        [input_file], [output_file], temp_dir,
+        lambda: backend.filter_audio(input_file, output_file, VOICE_FILTER, 48000, 1, f"Processing {description}")
+    )
 
 def main():
     if len(sys.argv) != 2:
@@ -70,6 +58,7 @@ def main():
     
     # Create output directory
     processed_voice_dir.mkdir(parents=True, exist_ok=True)
+    configure_trace(temp_dir, "step 8")
     
     print("Step 8: Process Voice Files")
     print("=" * 50)
@@ -84,7 +73,7 @@ def main():
         intro_audio_file = directory.parent / intro_audio_path
         if intro_audio_file.exists():
             intro_processed = processed_voice_dir / "intro1_processed.wav"
-            if process_voice_file(intro_audio_file, intro_processed, "intro voice"):
+            if process_voice_file(intro_audio_file, intro_processed, "intro voice", temp_dir):
                 processed_files.append("intro1_processed.wav")
         else:
             print(f"  ⚠ Intro audio file not found: {intro_audio_file}")
@@ -98,7 +87,7 @@ def main():
             chapter_audio = resemble_chapters_dir / f"{i}.wav"
             if chapter_audio.exists():
                 chapter_processed = processed_voice_dir / f"chapter_{i}_processed.wav"
-                if process_voice_file(chapter_audio, chapter_processed, f"chapter {i} voice"):
+                if process_voice_file(chapter_audio, chapter_processed, f"chapter {i} voice", temp_dir):
                     processed_files.append(f"chapter_{i}_processed.wav")
     else:
         # Fallback: check timed_chapters if resemble-chapters doesn't exist
@@ -107,7 +96,7 @@ def main():
                 chapter_audio = timed_chapters_dir / f"chapter_{i}.wav"
                 if chapter_audio.exists():
                     chapter_processed = processed_voice_dir / f"chapter_{i}_processed.wav"
-                    if process_voice_file(chapter_audio, chapter_processed, f"chapter {i} voice"):
+                    if process_voice_file(chapter_audio, chapter_processed, f"chapter {i} voice", temp_dir):
                         processed_files.append(f"chapter_{i}_processed.wav")
     
     # Process outro voice (if configured and exists)
@@ -116,7 +105,7 @@ def main():
         outro_audio_file = directory.parent / outro_audio_path
         if outro_audio_file.exists():
             outro_processed = processed_voice_dir / "outro1_processed.wav"
-            if process_voice_file(outro_audio_file, outro_processed, "outro voice"):
+            if process_voice_file(outro_audio_file, outro_processed, "outro voice", temp_dir):
                 processed_files.append("outro1_processed.wav")
         else:
             print(f"  ⚠ Outro audio file not found: {outro_audio_file}")
@@ -4,7 +4,12 @@ Step 9.1: Final Assembly and Add Overlays
 - Combine background music, b-roll intro/outro, and chapter files
 - Add title and logo overlays with precise timing
 - Optimized single-pass audio mixing (voice + background music)
-- Output professional ProRes 422 final video
+- Output professional ProRes 422 final video (intermediates use the template's intermediate profile)
+- --single-pass: cut chapters from orig_screencast.mp4 inside the same graph (no step 6 chapter files)
+- Format negotiation (media_format): inputs already at the template's resolution and frame
+  rate skip the scale/fps filters, in the conversions and in the final graph
+- MEDIA_BACKEND=pyav converts the talking heads and b-roll in-process and composes the video
+  track (concat, scale, overlays) in one in-process pass; ffmpeg then only mixes the audio
 
 NOTE TO CLAUDE NEVER HARD CODE ANYTHING IN THIS PYTHON FILE.  Always use the assembly template.
 """
@@ -14,35 +19,36 @@ NOTE TO CLAUDE NEVER HARD CODE ANYTHING IN THIS PYTHON FILE.  Always use the ass
 import sys
 import json
 import subprocess
+from fractions import Fraction
 from pathlib import Path
 
-# Assembly template will be loaded from JSON file - no hardcoded config
+from artifact_cache import run_cached_call
+from pipeline_trace import configure_trace, run_command
+from media_probe import get_duration
+from media_backend import intermediate_settings, freeze_frame_filters, get_backend
+from media_format import template_format, conform_filters, conforms
 
-def run_command(cmd, description):
-    """Run command with error handling."""
-    try:
-        print(f"  {description}...")
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=3600)
-        if result.returncode == 0:
-            print(f"  ✓ {description} completed")
-            return True
-        else:
-            print(f"  ✗ {description} failed: {result.stderr}")
-            return False
-    except Exception as e:
-        print(f"  ✗ Error in {description}: {e}")
-        return False
+# Assembly template will be loaded from JSON file - no hardcoded config
 
-def detect_audio_duration(audio_file):
-    """Detect actual duration of audio file using ffprobe."""
-    try:
-        cmd = ['ffprobe', '-v', 'quiet', '-show_entries', 'format=duration', '-of', 'csv=p=0', str(audio_file)]
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode == 0:
-            return float(result.stdout.strip())
-    except Exception as e:
-        print(f"  ⚠ Could not detect duration for {audio_file}: {e}")
-    return None
+def calculate_intro_broll_duration(assembly_template, intro1_audio):
+    """Intro b-roll length: the template's beginning section minus the hello message voice.
+    
+    At least 1s, rounded to whole frames of the template frame rate. Both render modes use
+    this, so the audio timing never depends on a b-roll file left by an earlier run.
+    """
+    beginning_section = assembly_template.get('video_sections', {}).get('beginning', {})
+    beginning_total_duration = beginning_section.get('total_duration', 10.0)  # From template
+    
+    intro1_duration = get_duration(intro1_audio) if intro1_audio else None
+    if intro1_duration is not None:
+        intro_broll_duration = max(1.0, beginning_total_duration - intro1_duration)
+        print(f"  Calculated intro b-roll duration: {intro_broll_duration:.3f}s (beginning: {beginning_total_duration}s - intro1: {intro1_duration:.3f}s)")
+    else:
+        print("  ⚠ Could not detect intro1 duration, using template total duration")
+        intro_broll_duration = beginning_total_duration
+    
+    frame_rate = Fraction(template_format(assembly_template.get('conversion_settings', {}))['frame_rate'])
+    return float(max(1, round(intro_broll_duration * frame_rate)) / frame_rate)
 
 def create_video_concat_list(directory, temp_dir, assembly_template):
     """Create concatenation list for videos based on assembly template structure."""
@@ -77,45 +83,37 @@ def create_video_concat_list(directory, temp_dir, assembly_template):
             project_config = json.load(f)
             b_roll_path = project_config.get('b_roll_video', b_roll_path)
     
-    # Convert intro1.mov to ProRes if needed
+    # Talking heads and b-roll are converted once into the template's intermediate codec;
+    # the artifact cache redoes a conversion when its source, duration or profile changes
+    settings = {**intermediate_settings(directory), **template_format(assembly_template.get('conversion_settings', {}))}
+    backend = get_backend()
+    
+    def convert(source, output_file, description, duration=None):
+        # Scale/fps only what differs from the template format (probed once, cached)
+        return run_cached_call(
+            [backend.name, 'convert_video', duration, settings], description, [source], [output_file], temp_dir,
+            lambda: backend.convert_video(source, output_file, settings, description, duration)
+        )
+    
+    # Convert intro1.mov to the intermediate codec
     intro1_file = video_files['hello_message']
-    if not intro1_file.exists():
-        original_intro1 = directory.parent / "assets/intros-and-outros/intro1.mov"
-        if original_intro1.exists():
-            print(f"  Converting intro1 to ProRes format...")
-            cmd = [
-                'ffmpeg', '-i', str(original_intro1),
-                '-c:v', 'prores_ks', '-profile:v', '2', '-pix_fmt', 'yuv422p10le',
-                '-r', '30', '-s', '1920x1080', '-an', '-y', str(intro1_file)
-            ]
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            if result.returncode != 0:
-                print(f"  ✗ Failed to convert intro1: {result.stderr}")
-                return None
-        else:
-            print(f"  ⚠ intro1 file not found: {original_intro1}")
-            print(f"  Please ensure intro1.mov exists in assets/intros-and-outros/")
-            return None
+    original_intro1 = directory.parent / "assets/intros-and-outros/intro1.mov"
+    if not original_intro1.exists():
+        print(f"  ⚠ intro1 file not found: {original_intro1}")
+        print(f"  Please ensure intro1.mov exists in assets/intros-and-outros/")
+        return None
+    if not convert(original_intro1, intro1_file, f"Converting intro1 to {settings['video_codec']}"):
+        return None
     
-    # Convert outro1.mov to ProRes if needed
+    # Convert outro1.mov to the intermediate codec
     outro1_file = video_files['goodbye_message']
-    if not outro1_file.exists():
-        original_outro1 = directory.parent / "assets/intros-and-outros/outro1.mov"
-        if original_outro1.exists():
-            print(f"  Converting outro1 to ProRes format...")
-            cmd = [
-                'ffmpeg', '-i', str(original_outro1),
-                '-c:v', 'prores_ks', '-profile:v', '2', '-pix_fmt', 'yuv422p10le',
-                '-r', '30', '-s', '1920x1080', '-an', '-y', str(outro1_file)
-            ]
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            if result.returncode != 0:
-                print(f"  ✗ Failed to convert outro1: {result.stderr}")
-                return None
-        else:
-            print(f"  ⚠ outro1 file not found: {original_outro1}")
-            print(f"  Please ensure outro1.mov exists in assets/intros-and-outros/")
-            return None
+    original_outro1 = directory.parent / "assets/intros-and-outros/outro1.mov"
+    if not original_outro1.exists():
+        print(f"  ⚠ outro1 file not found: {original_outro1}")
+        print(f"  Please ensure outro1.mov exists in assets/intros-and-outros/")
+        return None
+    if not convert(original_outro1, outro1_file, f"Converting outro1 to {settings['video_codec']}"):
+        return None
     
     # Convert B-roll files based on assembly template
     broll_intro_file = video_files['intro_broll']
@@ -129,58 +127,32 @@ def create_video_concat_list(directory, temp_dir, assembly_template):
         return None
     
     # Create intro b-roll (calculated from assembly template)
-    if not broll_intro_file.exists():
-        beginning_section = video_sections.get('beginning', {})
-        beginning_total_duration = beginning_section.get('total_duration', 10.0)  # From template
-        
-        # Get actual intro1 audio duration
-        intro1_audio_file = temp_dir / "processed_voice" / "intro1_processed.wav"
-        intro1_duration = detect_audio_duration(intro1_audio_file)
-        
-        if intro1_duration is not None:
-            intro_broll_duration = max(1.0, beginning_total_duration - intro1_duration)
-            print(f"  Calculated intro b-roll duration: {intro_broll_duration}s (beginning: {beginning_total_duration}s - intro1: {intro1_duration}s)")
-        else:
-            print("  ⚠ Could not detect intro1 duration, using template total duration")
-            intro_broll_duration = beginning_total_duration
-        
-        print(f"  Converting intro B-roll to ProRes format ({intro_broll_duration}s)...")
-        cmd = [
-            'ffmpeg', '-i', str(original_broll),
-            '-c:v', 'prores_ks', '-profile:v', '2', '-pix_fmt', 'yuv422p10le',
-            '-r', '30', '-s', '1920x1080', '-t', str(intro_broll_duration), '-an', '-y', str(broll_intro_file)
-        ]
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode != 0:
-            print(f"  ✗ Failed to convert intro B-roll: {result.stderr}")
-            return None
+    intro_broll_duration = calculate_intro_broll_duration(
+        assembly_template, temp_dir / "processed_voice" / "intro1_processed.wav"
+    )
+    
+    if not convert(original_broll, broll_intro_file,
+                   f"Converting intro B-roll to {settings['video_codec']} ({intro_broll_duration}s)", intro_broll_duration):
+        return None
     
     # Create outro b-roll (from assembly template)
-    if not broll_outro_file.exists():
-        end_section = video_sections.get('end', {})
-        outro_segments = end_section.get('segments', [])
-        outro_broll_duration = None
-        
-        # Find outro_broll segment duration from template
-        for segment in outro_segments:
-            if segment.get('name') == 'outro_broll':
-                outro_broll_duration = segment.get('duration')
-                break
-        
-        if outro_broll_duration is None:
-            print("  ⚠ outro_broll duration not found in assembly template")
-            return None
-        
-        print(f"  Converting outro B-roll to ProRes format ({outro_broll_duration}s)...")
-        cmd = [
-            'ffmpeg', '-i', str(original_broll),
-            '-c:v', 'prores_ks', '-profile:v', '2', '-pix_fmt', 'yuv422p10le',
-            '-r', '30', '-s', '1920x1080', '-t', str(outro_broll_duration), '-an', '-y', str(broll_outro_file)
-        ]
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode != 0:
-            print(f"  ✗ Failed to convert outro B-roll: {result.stderr}")
-            return None
+    end_section = video_sections.get('end', {})
+    outro_segments = end_section.get('segments', [])
+    outro_broll_duration = None
+    
+    # Find outro_broll segment duration from template
+    for segment in outro_segments:
+        if segment.get('name') == 'outro_broll':
+            outro_broll_duration = segment.get('duration')
+            break
+    
+    if outro_broll_duration is None:
+        print("  ⚠ outro_broll duration not found in assembly template")
+        return None
+    
+    if not convert(original_broll, broll_outro_file,
+                   f"Converting outro B-roll to {settings['video_codec']} ({outro_broll_duration}s)", outro_broll_duration):
+        return None
     
     # Generate concat list based on assembly template structure
     print("  Generating video concat list from assembly template...")
@@ -260,9 +232,11 @@ def extract_talking_head_audio(directory, temp_dir):
     
     return intro1_audio, outro1_audio
 
-def create_audio_inputs_for_filter(directory, temp_dir):
+def create_audio_inputs_for_filter(directory, temp_dir, single_pass=False):
     """Prepare audio input files for single-pass filter processing."""
-    chapters_dir = temp_dir / "timed_chapters"
+    # Single-pass renders skip step 6, so chapter voices come straight from step 8
+    chapters_dir = temp_dir / ("processed_voice" if single_pass else "timed_chapters")
+    chapter_name = "chapter_{}_processed.wav" if single_pass else "chapter_{}.wav"
     
     # Extract talking head audio (intro1 and outro1)
     intro1_audio, outro1_audio = extract_talking_head_audio(directory, temp_dir)
@@ -276,7 +250,7 @@ def create_audio_inputs_for_filter(directory, temp_dir):
     chapter_num = 1
     
     while True:
-        chapter_audio = chapters_dir / f"chapter_{chapter_num}.wav"
+        chapter_audio = chapters_dir / chapter_name.format(chapter_num)
         if chapter_audio.exists():
             chapter_files.append(chapter_audio)
             chapter_num += 1
@@ -369,6 +343,49 @@ def generate_overlays(directory, config, temp_dir, assembly_template):
     
     return overlays
 
+def overlay_layers(overlays, assembly_template, assembly_timing, outro1_audio):
+    """Placement and timing of each generated overlay, in stacking order.
+    
+    Each layer is {'name', 'file', 'position' (ffmpeg overlay 'x:y'), 'scale' or 'size', 'start', 'end'};
+    the ffmpeg graph and the in-process compositor (media_backend.compose_video) both draw from it.
+    """
+    overlay_sections = assembly_template.get('overlay_sections', {})
+    layers = []
+    
+    # Title and logo (top-right) until the end of the beginning section
+    overlay_end_time = assembly_timing['beginning_total_duration']
+    if 'title' in overlays:
+        layers.append({'name': 'title', 'file': overlays['title'],
+                       'position': overlay_sections.get('title', {}).get('position', '0:0'),
+                       'start': 0, 'end': overlay_end_time})
+    if 'logo' in overlays:
+        layers.append({'name': 'logo', 'file': overlays['logo'],
+                       'position': overlay_sections.get('logo', {}).get('position', 'W-w-20:20'),
+                       'start': 0, 'end': overlay_end_time})
+    
+    # Bottom logo during the end section (scale and position from the assembly template)
+    if 'bottom_logo' in overlays:
+        bottom_logo_overlay = overlay_sections.get('bottom_logo', {})
+        layers.append({'name': 'bottom_logo', 'file': overlays['bottom_logo'],
+                       'position': bottom_logo_overlay.get('position', '(W-w)/2:(H*5/6)'),
+                       'scale': bottom_logo_overlay.get('scale', '1.0'),
+                       'start': assembly_timing['goodbye_message_start_time'],
+                       'end': assembly_timing['total_video_duration']})
+    
+    # Subscribe overlay during the outro b-roll (starts when the goodbye message ends), full frame
+    if 'subscribe' in overlays:
+        outro1_audio_duration = assembly_timing['goodbye_message_duration']
+        if outro1_audio and outro1_audio.exists():
+            outro1_audio_duration = get_duration(outro1_audio) or outro1_audio_duration
+        subscribe_start_time = assembly_timing['goodbye_message_start_time'] + outro1_audio_duration
+        layers.append({'name': 'subscribe', 'file': overlays['subscribe'],
+                       'position': overlay_sections.get('subscribe', {}).get('position', '0:0'),
+                       'size': template_format(assembly_template.get('conversion_settings', {}))['resolution'],
+                       'start': subscribe_start_time,
+                       'end': subscribe_start_time + assembly_timing['outro_broll_duration']})
+    
+    return layers
+
 def calculate_assembly_timing(assembly_template, temp_dir, intro1_audio, outro1_audio):
     """Calculate complete timing structure from assembly template and actual audio durations."""
     video_sections = assembly_template.get('video_sections', {})
@@ -380,29 +397,10 @@ def calculate_assembly_timing(assembly_template, temp_dir, intro1_audio, outro1_
     # Get hello_message duration (auto-detected from intro1_audio)
     hello_message_duration = 0.0
     if intro1_audio and intro1_audio.exists():
-        probe_cmd = ['ffprobe', '-v', 'quiet', '-show_entries', 'format=duration', '-of', 'csv=p=0', str(intro1_audio)]
-        result = subprocess.run(probe_cmd, capture_output=True, text=True)
-        if result.returncode == 0:
-            hello_message_duration = float(result.stdout.strip())
-    
-    # Use actual intro_broll duration from created video file for precise timing
-    # This ensures audio timing matches actual video sequence
-    broll_prores_file = temp_dir / "temp_prores" / "b-roll_prores.mov"
-    if broll_prores_file.exists():
-        # Use actual b-roll duration for precise timing alignment
-        probe_cmd = ['ffprobe', '-v', 'quiet', '-show_entries', 'format=duration', '-of', 'csv=p=0', str(broll_prores_file)]
-        result = subprocess.run(probe_cmd, capture_output=True, text=True)
-        if result.returncode == 0:
-            intro_broll_duration = float(result.stdout.strip())
-            print(f"  Using actual intro b-roll duration: {intro_broll_duration:.3f}s (from created video file)")
-        else:
-            # Fallback to template calculation
-            intro_broll_duration = beginning_total_duration - hello_message_duration
-            print(f"  Using template calculation for intro b-roll: {intro_broll_duration:.3f}s")
-    else:
-        # Fallback to template calculation if file doesn't exist yet
-        intro_broll_duration = beginning_total_duration - hello_message_duration
-        print(f"  Using template calculation for intro b-roll: {intro_broll_duration:.3f}s")
+        hello_message_duration = get_duration(intro1_audio) or 0.0
+    
+    # Same calculation as the b-roll conversion (never a b-roll file left by an earlier run)
+    intro_broll_duration = calculate_intro_broll_duration(assembly_template, intro1_audio)
     
     # Calculate chapters total duration from actual chapter audio files
     chapters_total_duration = 0.0
@@ -420,7 +418,7 @@ def calculate_assembly_timing(assembly_template, temp_dir, intro1_audio, outro1_
                 break
                 
             # Get actual chapter duration
-            chapter_duration = detect_audio_duration(chapter_file)
+            chapter_duration = get_duration(chapter_file)
             if chapter_duration is not None:
                 chapter_timings.append({
                     'chapter': chapter_num,
@@ -443,10 +441,7 @@ def calculate_assembly_timing(assembly_template, temp_dir, intro1_audio, outro1_
     # Get goodbye_message duration (auto-detected from outro1_audio)
     goodbye_message_duration = 0.0
     if outro1_audio and outro1_audio.exists():
-        probe_cmd = ['ffprobe', '-v', 'quiet', '-show_entries', 'format=duration', '-of', 'csv=p=0', str(outro1_audio)]
-        result = subprocess.run(probe_cmd, capture_output=True, text=True)
-        if result.returncode == 0:
-            goodbye_message_duration = float(result.stdout.strip())
+        goodbye_message_duration = get_duration(outro1_audio) or 0.0
     
     # Get outro_broll duration from template
     end_section = video_sections.get('end', {})
@@ -491,11 +486,131 @@ def calculate_assembly_timing(assembly_template, temp_dir, intro1_audio, outro1_
     
     return timing_structure
 
-def combine_final_video_optimized(concat_list, intro1_audio, outro1_audio, chapter_audio_files, background_music, overlays, output_file, temp_dir, config, assembly_template):
-    """Combine video with audio tracks and overlays in single pass using filter graphs."""
+def concat_list_files(concat_list):
+    """Segment files named in a concat list, in order."""
+    with open(concat_list, 'r') as f:
+        return [Path(line.strip()[len("file '"):-1]) for line in f if line.startswith("file '")]
+
+def final_video_settings(assembly_template):
+    """Codec and format of the final video track (the template's conversion_settings)."""
+    conversion_settings = assembly_template.get('conversion_settings', {})
+    return {
+        'video_codec': conversion_settings.get('video_codec', 'prores_ks'),
+        'video_profile': conversion_settings.get('video_profile', '2'),
+        'pixel_format': conversion_settings.get('pixel_format', 'yuv422p10le'),
+        **template_format(conversion_settings)
+    }
+
+def concat_list_video_source(concat_list, assembly_template):
+    """Video track read from the concat list of pre-rendered ProRes segments (input 0)."""
+    target = template_format(assembly_template.get('conversion_settings', {}))
     
-    # Calculate timing structure from assembly template and actual audio durations
-    assembly_timing = calculate_assembly_timing(assembly_template, temp_dir, intro1_audio, outro1_audio)
+    inputs = ['-f', 'concat', '-safe', '0', '-i', str(concat_list)]
+    segment_files = concat_list_files(concat_list)
+    if all(conforms(segment_file, target) for segment_file in segment_files):
+        # Every segment was conformed at ingest/conversion: no scaler on the base video
+        print("  ✓ All segments are already in the template format, no scaling needed")
+        return inputs, [], '[0:v]'
+    
+    # Scale base video to target resolution
+    filters = [f"[0:v]{','.join(conform_filters(None, target))}[base_scaled]"]
+    return inputs, filters, '[base_scaled]'
+
+def single_pass_video_source(directory, temp_dir, config, assembly_template, assembly_timing):
+    """Video track compiled straight from the sources: b-roll, talking heads and screencast chapters.
+    
+    Each screencast chapter is cut from orig_screencast.mp4 and trimmed or frozen (on the
+    frame step 6 holds) to match its processed voice, so steps 1 and 6 need not render chapter files.
+    Returns (ffmpeg inputs, filter parts, output label) or None.
+    """
+    conversion_settings = assembly_template.get('conversion_settings', {})
+    target = template_format(conversion_settings)
+    pixel_format = conversion_settings.get('pixel_format', 'yuv422p10le')
+    
+    screencast = directory / "human-provided-content" / "orig_screencast.mp4"
+    chapters_file = temp_dir / "chapters.json"
+    original_broll = directory.parent / config.get('b_roll_video', "human-provided-content/b-roll.mp4")
+    intro1_file = directory.parent / "assets/intros-and-outros/intro1.mov"
+    outro1_file = directory.parent / "assets/intros-and-outros/outro1.mov"
+    
+    for required in [screencast, chapters_file, original_broll, intro1_file, outro1_file]:
+        if not required.exists():
+            print(f"  ✗ Single-pass source not found: {required}")
+            return None
+    
+    with open(chapters_file, 'r') as f:
+        chapters = json.load(f)['chapters']
+    chapter_timings = assembly_timing['chapter_timings']
+    if len(chapters) != len(chapter_timings):
+        print(f"  ✗ {len(chapters)} chapters in {chapters_file.name} but {len(chapter_timings)} processed voice chapters")
+        return None
+    
+    inputs = []
+    filters = []
+    segment_labels = []
+    
+    def add_segment(input_args, label, source, extra_filters=()):
+        # Normalize only what differs from the template format (concat needs matching segments)
+        index = len(segment_labels)
+        inputs.extend(input_args)
+        chain = list(extra_filters) + conform_filters(source, target, pixel_format)
+        filters.append(f"[{index}:v]{','.join(chain) or 'null'}[{label}]")
+        segment_labels.append(f'[{label}]')
+    
+    # Same segment order as the concat list: beginning -> chapters -> end
+    video_sections = assembly_template.get('video_sections', {})
+    for section_name in ['beginning', 'chapters', 'end']:
+        for segment in video_sections.get(section_name, {}).get('segments', []):
+            segment_name = segment.get('name')
+            segment_type = segment.get('type')
+            
+            if segment_type == 'broll' and segment_name == 'intro_broll':
+                add_segment(['-t', str(assembly_timing['intro_broll_duration']), '-i', str(original_broll)], 'intro_broll',
+                            original_broll)
+                print(f"    Added intro b-roll: {original_broll.name} ({assembly_timing['intro_broll_duration']:.1f}s)")
+            
+            elif segment_type == 'talking_head' and segment_name == 'hello_message':
+                add_segment(['-i', str(intro1_file)], 'hello_message', intro1_file)
+                print(f"    Added hello message: {intro1_file.name}")
+            
+            elif segment_type == 'generated_content' and segment_name == 'generated_content':
+                for chapter, timing in zip(chapters, chapter_timings):
+                    video_duration = chapter['duration']
+                    audio_duration = timing['duration']
+                    if video_duration < audio_duration:
+                        # Hold the frame step 6 holds (a few frames before the end) until the voice finishes
+                        fit = [f"fps={target['frame_rate']}"] + freeze_frame_filters(video_duration, target['frame_rate'])
+                    else:
+                        fit = []
+                    add_segment(
+                        ['-ss', str(chapter['start_time']), '-t', str(min(video_duration, audio_duration)), '-i', str(screencast)],
+                        f"chapter_{chapter['index']}", screencast, fit + [f'trim=duration={audio_duration}', 'setpts=PTS-STARTPTS']
+                    )
+                    print(f"    Added chapter {chapter['index']}: {video_duration:.1f}s source → {audio_duration:.1f}s")
+            
+            elif segment_type == 'talking_head' and segment_name == 'goodbye_message':
+                add_segment(['-i', str(outro1_file)], 'goodbye_message', outro1_file)
+                print(f"    Added goodbye message: {outro1_file.name}")
+            
+            elif segment_type == 'broll' and segment_name == 'outro_broll':
+                add_segment(['-t', str(assembly_timing['outro_broll_duration']), '-i', str(original_broll)], 'outro_broll',
+                            original_broll)
+                print(f"    Added outro b-roll: {original_broll.name} ({assembly_timing['outro_broll_duration']:.1f}s)")
+            
+            else:
+                print(f"  ⚠ Unknown segment: {segment_name} ({segment_type})")
+    
+    filters.append(f'{"".join(segment_labels)}concat=n={len(segment_labels)}:v=1:a=0[base_scaled]')
+    return inputs, filters, '[base_scaled]'
+
+def combine_final_video_optimized(video_source, intro1_audio, outro1_audio, chapter_audio_files, background_music, layers, output_file, temp_dir, config, assembly_template, assembly_timing, video_encoded=False):
+    """Combine video with audio tracks and overlays in single pass using filter graphs.
+    
+    video_source is (ffmpeg inputs, filter parts, output label) for the base video track and
+    layers are overlay_layers(). With video_encoded, input 0 is the finished video track
+    (composed in-process, overlays included): it is copied and only the audio is mixed.
+    """
+    video_inputs, video_filters, base_video = video_source
     
     print(f"  Debug: Assembly timing calculated:")
     print(f"    Beginning: {assembly_timing['beginning_total_duration']:.1f}s")
@@ -506,11 +621,11 @@ def combine_final_video_optimized(concat_list, intro1_audio, outro1_audio, chapt
     print(f"    Outro broll: {assembly_timing['outro_broll_duration']:.1f}s")
     print(f"    Total: {assembly_timing['total_video_duration']:.1f}s")
     
-    # Build FFmpeg inputs
-    inputs = ['-f', 'concat', '-safe', '0', '-i', str(concat_list)]  # 0: video
+    # Build FFmpeg inputs: base video input(s) first, then audio and overlays
+    inputs = list(video_inputs)
     
     # Add intro1 audio if available
-    current_index = 1
+    current_index = inputs.count('-i')
     intro1_index = None
     if intro1_audio:
         inputs.extend(['-i', str(intro1_audio)])
@@ -547,8 +662,7 @@ def combine_final_video_optimized(concat_list, intro1_audio, outro1_audio, chapt
     broll_music_index = None
     if broll_music_file.exists():
         # Check if temp file is long enough (should be > 12 seconds for our needs)
-        result = subprocess.run(['ffprobe', '-v', 'quiet', '-show_entries', 'format=duration', '-of', 'csv=p=0', str(broll_music_file)], capture_output=True, text=True)
-        temp_duration = float(result.stdout.strip()) if result.returncode == 0 else 0
+        temp_duration = get_duration(broll_music_file) or 0
         
         if temp_duration >= assembly_timing['beginning_total_duration'] + 2.5:  # Template-based minimum duration
             # Use temp file if it's long enough
@@ -570,27 +684,14 @@ def combine_final_video_optimized(concat_list, intro1_audio, outro1_audio, chapt
         print(f"  Using original B-roll music file (temp file not found)")
     
     # Add overlay inputs
-    input_index = current_index
     overlay_indices = {}
-    if 'title' in overlays:
-        inputs.extend(['-i', str(overlays['title'])])
-        overlay_indices['title'] = input_index
-        input_index += 1
-    if 'logo' in overlays:
-        inputs.extend(['-i', str(overlays['logo'])])
-        overlay_indices['logo'] = input_index
-        input_index += 1
-    if 'bottom_logo' in overlays:
-        inputs.extend(['-i', str(overlays['bottom_logo'])])
-        overlay_indices['bottom_logo'] = input_index
-        input_index += 1
-    if 'subscribe' in overlays:
-        inputs.extend(['-i', str(overlays['subscribe'])])
-        overlay_indices['subscribe'] = input_index
-        input_index += 1
+    for layer in layers:
+        inputs.extend(['-i', str(layer['file'])])
+        overlay_indices[layer['name']] = current_index
+        current_index += 1
     
     # Build filter complex for single-pass processing
-    filter_parts = []
+    filter_parts = list(video_filters)
     
     # Audio processing: combine intro1 + chapters + outro1 with proper timing from assembly template
     
@@ -685,12 +786,7 @@ def combine_final_video_optimized(concat_list, intro1_audio, outro1_audio, chapt
         # Get actual outro1 duration if available
         outro1_audio_duration = assembly_timing['goodbye_message_duration']
         if outro1_audio and outro1_audio.exists():
-            try:
-                result = subprocess.run(['ffprobe', '-v', 'quiet', '-show_entries', 'format=duration', '-of', 'csv=p=0', str(outro1_audio)], capture_output=True, text=True)
-                if result.returncode == 0:
-                    outro1_audio_duration = float(result.stdout.strip())
-            except:
-                pass  # Use fallback
+            outro1_audio_duration = get_duration(outro1_audio) or outro1_audio_duration
         
         broll_outro_start = outro1_start_time + outro1_audio_duration
         broll_outro_start_ms = int(broll_outro_start * 1000)
@@ -727,68 +823,20 @@ def combine_final_video_optimized(concat_list, intro1_audio, outro1_audio, chapt
         else:
             filter_parts.append(f'[music_low]copy[final_audio]')
     
-    # Video processing: start with base video scaled to target resolution
-    conversion_settings = assembly_template.get('conversion_settings', {})
-    target_resolution = conversion_settings.get('resolution', '1920x1080')
-    
-    # Scale base video to target resolution
-    filter_parts.append(f'[0:v]scale={target_resolution}[base_scaled]')
-    current_video = '[base_scaled]'
-    
-    # Add title overlay (until end of beginning section)
-    overlay_end_time = assembly_timing['beginning_total_duration']  # End when intro section ends
-    if 'title' in overlay_indices:
-        filter_parts.append(f'{current_video}[{overlay_indices["title"]}:v]overlay=0:0:enable=\'between(t,0,{overlay_end_time})\'[titled]')
-        current_video = '[titled]'
-    
-    # Add logo overlay (until end of beginning section, top-right)
-    if 'logo' in overlay_indices:
-        filter_parts.append(f'{current_video}[{overlay_indices["logo"]}:v]overlay=W-w-20:20:enable=\'between(t,0,{overlay_end_time})\'[logo_video]')
-        current_video = '[logo_video]'
-    
-    # Add bottom logo overlay (during end section, bottom center, scaled 50%)
-    if 'bottom_logo' in overlay_indices:
-        # Calculate end section timing from assembly
-        end_start_time = outro1_start_time  # Start when goodbye message begins
-        end_end_time = assembly_timing['total_video_duration']  # Use assembly calculated total duration
-        # Get scale and position from assembly template instead of hardcoding
-        bottom_logo_overlay = assembly_template.get('overlay_sections', {}).get('bottom_logo', {})
-        logo_scale = bottom_logo_overlay.get('scale', '1.0')
-        logo_position = bottom_logo_overlay.get('position', '(W-w)/2:(H*5/6)')
-        filter_parts.append(f'[{overlay_indices["bottom_logo"]}:v]scale=iw*{logo_scale}:ih*{logo_scale}[bottom_scaled]')
-        filter_parts.append(f'{current_video}[bottom_scaled]overlay={logo_position}:enable=\'between(t,{end_start_time},{end_end_time})\'[logo_final]')
-        current_video = '[logo_final]'
-    
-    # Add subscribe video overlay (during outro b-roll section with alpha channel)
-    if 'subscribe' in overlay_indices:
-        # Calculate outro b-roll timing (starts after goodbye message ends)
-        outro1_audio_duration = assembly_timing['goodbye_message_duration']
-        if outro1_audio and outro1_audio.exists():
-            try:
-                result = subprocess.run(['ffprobe', '-v', 'quiet', '-show_entries', 'format=duration', '-of', 'csv=p=0', str(outro1_audio)], capture_output=True, text=True)
-                if result.returncode == 0:
-                    outro1_audio_duration = float(result.stdout.strip())
-            except:
-                pass  # Use fallback
-        
-        subscribe_start_time = outro1_start_time + outro1_audio_duration  # Start when outro b-roll begins
-        # Use outro_broll_duration from assembly template instead of hardcoded value
-        outro_broll_duration = assembly_timing['outro_broll_duration']
-        subscribe_end_time = subscribe_start_time + outro_broll_duration
-        # Get chroma key settings from assembly template
-        subscribe_overlay = assembly_template.get('overlay_sections', {}).get('subscribe', {})
-        subscribe_position = subscribe_overlay.get('position', '0:0')
-        chroma_key = subscribe_overlay.get('chroma_key', {})
-        chroma_color = chroma_key.get('color', 'green')
-        chroma_similarity = chroma_key.get('similarity', '0.4')
-        chroma_blend = chroma_key.get('blend', '0.1')
-        
-        # Simple PNG overlay with transparency
-        filter_parts.append(f'[{overlay_indices["subscribe"]}:v]scale=1920:1080[subscribe_scaled]')
-        filter_parts.append(f'{current_video}[subscribe_scaled]overlay=0:0:enable=between(t\\,{subscribe_start_time}\\,{subscribe_end_time})[final_video]')
-        current_video = '[final_video]'
-    else:
-        # Rename current for consistency
+    # Video processing: start with the base video at target resolution, then draw each overlay layer
+    current_video = base_video
+    for layer in layers:
+        name = layer['name']
+        overlay_source = f'[{overlay_indices[name]}:v]'
+        if layer.get('scale'):
+            filter_parts.append(f"{overlay_source}scale=iw*{layer['scale']}:ih*{layer['scale']}[{name}_scaled]")
+            overlay_source = f'[{name}_scaled]'
+        elif layer.get('size'):
+            filter_parts.append(f"{overlay_source}scale={layer['size'].replace('x', ':')}[{name}_scaled]")
+            overlay_source = f'[{name}_scaled]'
+        filter_parts.append(f"{current_video}{overlay_source}overlay={layer['position']}:enable='between(t,{layer['start']},{layer['end']})'[{name}_video]")
+        current_video = f'[{name}_video]'
+    if not video_encoded:
         filter_parts.append(f'{current_video}copy[final_video]')
         current_video = '[final_video]'
     
@@ -802,33 +850,43 @@ def combine_final_video_optimized(concat_list, intro1_audio, outro1_audio, chapt
     print(f"  Debug: intro1_start_time={intro1_start_time}, chapter_start_time={chapter_start_time}")
     print(f"  Debug: intro1_index={intro1_index}, outro1_index={outro1_index}")
     
-    # Complete FFmpeg command with resolution settings from template
+    # Complete FFmpeg command with codec settings from template (the graph output is already
+    # at the template resolution and frame rate, so no -s/-r rescaling at the output)
     conversion_settings = assembly_template.get('conversion_settings', {})
     
+    if video_encoded:
+        video_args = ['-map', '0:v', '-map', '[final_audio]', '-c:v', 'copy']
+    else:
+        video_args = [
+            '-map', current_video, '-map', '[final_audio]',
+            '-c:v', conversion_settings.get('video_codec', 'prores_ks'),
+            '-profile:v', conversion_settings.get('video_profile', '2'),
+            '-pix_fmt', conversion_settings.get('pixel_format', 'yuv422p10le')
+        ]
+    
     cmd = [
         'ffmpeg'
     ] + inputs + [
-        '-filter_complex', filter_complex,
-        '-map', current_video, '-map', '[final_audio]',
-        '-c:v', conversion_settings.get('video_codec', 'prores_ks'),
-        '-profile:v', conversion_settings.get('video_profile', '2'),
-        '-pix_fmt', conversion_settings.get('pixel_format', 'yuv422p10le'),
-        '-r', conversion_settings.get('frame_rate', '30'),
-        '-s', conversion_settings.get('resolution', '1920x1080'),
+        '-filter_complex', filter_complex
+    ] + video_args + [
         '-c:a', conversion_settings.get('audio_codec', 'pcm_s16le'),
         '-ar', conversion_settings.get('audio_sample_rate', '44100'),
         '-y', str(output_file)
     ]
     
-    return run_command(cmd, "Single-pass final assembly with optimized audio processing")
+    return run_command(cmd, "Single-pass final assembly with optimized audio processing",
+                       expected_duration=assembly_timing['total_video_duration'])
 
 def main():
-    if len(sys.argv) != 2:
-        print("Usage: python 9_final_assembly_and_add_overlays.py <directory>")
+    # --single-pass renders from orig_screencast.mp4 directly instead of step 6's timed chapters
+    args = [arg for arg in sys.argv[1:] if arg != '--single-pass']
+    single_pass = len(args) != len(sys.argv) - 1
+    if len(args) != 1:
+        print("Usage: python 9_final_assembly_and_add_overlays.py <directory> [--single-pass]")
         print("Example: python 9_final_assembly_and_add_overlays.py current-project/")
         sys.exit(1)
     
-    directory = Path(sys.argv[1])
+    directory = Path(args[0])
     if not directory.exists():
         print(f"✗ Directory not found: {directory}")
         sys.exit(1)
@@ -848,11 +906,13 @@ def main():
         print("Run step 7 first: python 7_create_background_music.py current-project/")
         sys.exit(1)
     
-    if not timed_videos_dir.exists():
+    if not single_pass and not timed_videos_dir.exists():
         print(f"✗ Timed videos not found: {timed_videos_dir}")
         print("Run step 7 first: python 7_match_video_timing.py temp-assets/")
         sys.exit(1)
     
+    configure_trace(temp_dir, "step 9")
+    
     print("Step 9: Final Assembly")
     print("=" * 50)
     
@@ -879,28 +939,55 @@ def main():
     # Debug: Don't clean up temp files so we can inspect them
     debug_mode = True
     
-    # Create video concatenation list
-    concat_list = create_video_concat_list(directory, temp_dir, assembly_template)
-    if not concat_list:
-        sys.exit(1)
+    # Create video concatenation list (single-pass reads the sources directly instead)
+    if not single_pass:
+        concat_list = create_video_concat_list(directory, temp_dir, assembly_template)
+        if not concat_list:
+            sys.exit(1)
     
     # Prepare audio inputs for optimized processing  
-    intro1_audio, outro1_audio, chapter_audio_files = create_audio_inputs_for_filter(directory, temp_dir)
+    intro1_audio, outro1_audio, chapter_audio_files = create_audio_inputs_for_filter(directory, temp_dir, single_pass)
     if not chapter_audio_files:
         sys.exit(1)
     
+    # Calculate timing structure from assembly template and actual audio durations
+    assembly_timing = calculate_assembly_timing(assembly_template, temp_dir, intro1_audio, outro1_audio)
+    if not assembly_timing:
+        sys.exit(1)
+    
+    if single_pass:
+        print("\nCompiling single-pass video graph from source files...")
+        video_source = single_pass_video_source(directory, temp_dir, config, assembly_template, assembly_timing)
+        if not video_source:
+            sys.exit(1)
+    else:
+        video_source = concat_list_video_source(concat_list, assembly_template)
+    
     # Generate overlays
     print("\nGenerating overlays...")
     overlays = generate_overlays(directory, config, temp_dir, assembly_template)
     if not overlays:
         sys.exit(1)
+    layers = overlay_layers(overlays, assembly_template, assembly_timing, outro1_audio)
+    
+    # In-process backends render the video track (concat, scale, overlays) without the CLI graph
+    video_encoded = False
+    backend = get_backend()
+    if not single_pass and hasattr(backend, 'compose_video'):
+        video_track = temp_dir / "final_video_track.mov"
+        if backend.compose_video(concat_list_files(concat_list), video_track, final_video_settings(assembly_template), layers):
+            video_source = (['-i', str(video_track)], [], '[0:v]')
+            layers = []
+            video_encoded = True
+        else:
+            print("  ⚠ In-process composition failed, rendering the video track with the ffmpeg CLI")
     
     # Final assembly with overlays
     final_output_dir = directory / "final-output"
     final_output_dir.mkdir(exist_ok=True)
     output_file = final_output_dir / "final_video.mov"
     
-    if combine_final_video_optimized(concat_list, intro1_audio, outro1_audio, chapter_audio_files, background_music_file, overlays, output_file, temp_dir, config, assembly_template):
+    if combine_final_video_optimized(video_source, intro1_audio, outro1_audio, chapter_audio_files, background_music_file, layers, output_file, temp_dir, config, assembly_template, assembly_timing, video_encoded):
         # Clean up temp files (disabled for debug)
         # Note: temp_dir cleanup disabled since it's the main temp directory
         
@@ -911,10 +998,8 @@ def main():
         print(f"  ✓ {output_file.name}")
         
         # Get video info
-        probe_cmd = ['ffprobe', '-v', 'quiet', '-show_entries', 'format=duration', '-of', 'csv=p=0', str(output_file)]
-        result = subprocess.run(probe_cmd, capture_output=True, text=True)
-        if result.returncode == 0:
-            duration = float(result.stdout.strip())
+        duration = get_duration(output_file)
+        if duration is not None:
             print(f"\nVideo details:")
             print(f"  Duration: {duration:.1f} seconds")
             print(f"  Structure: B-roll (6.7s) + Intro1 talking (4.3s) → Chapters → B-roll outro (10s)")
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Artifact Cache
+- Key each piece of media work by its input file identities plus the exact ffmpeg argument vector
+- Record what a key produced under temp/artifact-cache/
+- Skip work whose inputs and command did not change since the last successful run
+
+Set PIPELINE_NO_CACHE=1 to force every step to re-run its commands.
+"""
+
+import os
+import json
+import hashlib
+from pathlib import Path
+
+CACHE_DIR_NAME = "artifact-cache"
+
+def file_identity(file_path):
+    """Return the identity (resolved path, size, mtime) of a file, or None if it is missing."""
+    path = Path(file_path)
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return {
+        'path': str(path.resolve()),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns
+    }
+
+def cache_key(inputs, cmd):
+    """Hash the identities of the input files together with the command argument vector."""
+    digest = hashlib.sha256()
+    for input_file in inputs:
+        identity = file_identity(input_file) or {'path': str(Path(input_file).resolve()), 'missing': True}
+        digest.update(json.dumps(identity, sort_keys=True).encode())
+    digest.update(json.dumps([str(arg) for arg in cmd]).encode())
+    return digest.hexdigest()
+
+def _entry_file(temp_dir, key):
+    return Path(temp_dir) / CACHE_DIR_NAME / f"{key}.json"
+
+def is_cached(temp_dir, key, outputs):
+    """Check whether the outputs recorded for this key still exist untouched."""
+    if os.getenv('PIPELINE_NO_CACHE'):
+        return False
+
+    entry_file = _entry_file(temp_dir, key)
+    if not entry_file.exists():
+        return False
+
+    try:
+        with open(entry_file, 'r') as f:
+            entry = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return False
+
+    recorded = entry.get('outputs', [])
+    if len(recorded) != len(outputs):
+        return False
+
+    for output_file, recorded_identity in zip(outputs, recorded):
+        if file_identity(output_file) != recorded_identity:
+            return False
+    return True
+
+def record(temp_dir, key, outputs):
+    """Remember the outputs produced for this key."""
+    entry_file = _entry_file(temp_dir, key)
+    entry_file.parent.mkdir(parents=True, exist_ok=True)
+
+    identities = [file_identity(output_file) for output_file in outputs]
+    if any(identity is None for identity in identities):
+        return
+
+    temp_file = entry_file.with_suffix('.tmp')
+    with open(temp_file, 'w') as f:
+        json.dump({'outputs': identities}, f, indent=2)
+    os.replace(temp_file, entry_file)
+
+def run_cached_call(signature, description, inputs, outputs, temp_dir, action):
+    """Call action() unless an identical call already produced the outputs.
+
+    signature stands in for the command line: it must change whenever the work would.
+    """
+    key = cache_key(inputs, signature)
+    if is_cached(temp_dir, key, outputs):
+        print(f"  ✓ {description} (cached, inputs unchanged)")
+        return True
+
+    result = action()
+    if result:
+        record(temp_dir, key, outputs)
+    return result
+
+def run_cached(cmd, description, inputs, outputs, temp_dir, runner):
+    """Run a command through runner unless an identical run already produced the outputs."""
+    return run_cached_call(cmd, description, inputs, outputs, temp_dir, lambda: runner(cmd, description))
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Chapter Pool
+- Fan per-chapter media jobs out over a bounded pool of workers (steps 1 and 6)
+- Give each worker a share of the CPU budget as its encoder thread count, so the
+  workers together use about one thread per core
+- Return results in job order, so chapter numbering and output never depend on scheduling
+
+Each worker drives an ffmpeg subprocess (or PyAV, which releases the GIL while coding),
+so a thread pool is enough to keep the encoders running in parallel.
+
+The budget is the machine's core count; set PIPELINE_CPU_BUDGET to lower it (batch builds
+split the cores between concurrent projects) and PIPELINE_CHAPTER_WORKERS to pin the worker count.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# ProRes encoding stops scaling past a few threads per stream; prefer more workers over more threads
+THREADS_PER_WORKER = 4
+
+def cpu_budget():
+    """Cores this step may use: PIPELINE_CPU_BUDGET, or every core."""
+    try:
+        budget = int(os.getenv('PIPELINE_CPU_BUDGET', '0'))
+    except ValueError:
+        budget = 0
+    return budget if budget > 0 else (os.cpu_count() or 1)
+
+def plan_workers(job_count):
+    """Return (workers, threads per worker) for job_count independent chapter jobs."""
+    budget = cpu_budget()
+    try:
+        workers = int(os.getenv('PIPELINE_CHAPTER_WORKERS', '0'))
+    except ValueError:
+        workers = 0
+    if workers <= 0:
+        workers = max(1, budget // THREADS_PER_WORKER)
+    workers = max(1, min(workers, job_count))
+    return workers, max(1, budget // workers)
+
+def run_jobs(jobs, workers):
+    """Call every job (a no-argument callable) with at most workers running at once.
+
+    Returns the results in job order; an exception in a job becomes a False result.
+    """
+    def run(job):
+        try:
+            return job()
+        except Exception as e:
+            print(f"  ✗ Chapter job failed: {e}")
+            return False
+
+    if workers <= 1 or len(jobs) <= 1:
+        return [run(job) for job in jobs]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(run, jobs))
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+LLM Cache
+- On-disk cache of chat completion responses shared by steps 3, 4 and the archive step
+- Keyed by a hash of the whole request (model, temperature, messages, max_tokens), so a
+  byte-identical prompt is answered from disk instead of waiting on the API again
+- Size-bounded: least recently used responses are evicted first
+
+The cache lives in ~/.cache/marketing-video/llm-responses/ (override with LLM_CACHE_DIR),
+one JSON file per response, capped at LLM_CACHE_MAX_MB (default: 20).
+Set LLM_CACHE_BYPASS=1 (or pass --no-llm-cache to steps 3, 4, 5 and 8) to always call the API;
+fresh responses still replace the cached ones. A caller that parses the response passes
+validate=, so a malformed response is never cached and a retry asks the API again.
+"""
+
+import os
+import json
+import hashlib
+import threading
+from pathlib import Path
+
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "marketing-video" / "llm-responses"
+DEFAULT_MAX_MB = 20
+
+BYPASS_FLAG = '--no-llm-cache'
+
+_evict_lock = threading.Lock()
+
+def _cache_dir():
+    return Path(os.getenv('LLM_CACHE_DIR', str(DEFAULT_CACHE_DIR)))
+
+def _max_bytes():
+    try:
+        max_mb = float(os.getenv('LLM_CACHE_MAX_MB', str(DEFAULT_MAX_MB)))
+    except ValueError:
+        max_mb = DEFAULT_MAX_MB
+    return int(max_mb * 1024 * 1024)
+
+def bypassed():
+    """True when LLM_CACHE_BYPASS is set: every request goes to the API."""
+    return os.getenv('LLM_CACHE_BYPASS', '').lower() in ('1', 'true', 'yes')
+
+def apply_bypass_flag(args):
+    """Remove --no-llm-cache from a step's arguments, setting LLM_CACHE_BYPASS if it was given."""
+    if BYPASS_FLAG in args:
+        os.environ['LLM_CACHE_BYPASS'] = '1'
+    return [arg for arg in args if arg != BYPASS_FLAG]
+
+def request_key(request):
+    """Hash of the full request; any change to model, temperature or messages is a new key."""
+    payload = json.dumps(request, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def lookup(key, validate=None):
+    """Return the cached response content for key, or None. A hit counts as a use for LRU.
+
+    A cached response that fails validate(content) is deleted and reported as a miss.
+    """
+    if bypassed():
+        return None
+    entry_file = _cache_dir() / f"{key}.json"
+    try:
+        with open(entry_file, 'r') as f:
+            content = json.load(f)['content']
+    except (OSError, json.JSONDecodeError, KeyError):
+        return None
+    if validate:
+        try:
+            validate(content)
+        except Exception:
+            _discard(entry_file)
+            return None
+    try:
+        os.utime(entry_file)
+    except OSError:
+        pass
+    return content
+
+def _discard(entry_file):
+    try:
+        entry_file.unlink()
+    except OSError:
+        pass
+
+def store(key, request, content):
+    """Save a response (atomically, other steps may be reading), then evict down to the size cap."""
+    cache_dir = _cache_dir()
+    entry_file = cache_dir / f"{key}.json"
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        temp_file = entry_file.with_name(f"{entry_file.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(temp_file, 'w') as f:
+            json.dump({'model': request.get('model'), 'request': request, 'content': content}, f)
+        os.replace(temp_file, entry_file)
+    except OSError as e:
+        print(f"  ⚠ Could not save LLM response cache: {e}")
+        return
+    _evict(cache_dir, keep=entry_file)
+
+def _evict(cache_dir, keep):
+    """Delete least recently used entries (never keep) until the cache fits in LLM_CACHE_MAX_MB."""
+    with _evict_lock:
+        entries = []
+        for entry_file in cache_dir.glob("*.json"):
+            try:
+                stat = entry_file.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry_file))
+        total = sum(size for _, size, _ in entries)
+        limit = _max_bytes()
+        for _, size, entry_file in sorted(entries):
+            if total <= limit:
+                break
+            if entry_file == keep:
+                continue
+            try:
+                entry_file.unlink()
+            except OSError:
+                pass
+            total -= size
+
+def chat_completion(client, validate=None, **request):
+    """client.chat.completions.create(**request) through the cache; returns the message content.
+
+    validate(content), if given, must raise for a response the caller cannot use; such a
+    response is not cached and the exception propagates to the caller.
+    """
+    key = request_key(request)
+    content = lookup(key, validate)
+    if content is not None:
+        print("  ✓ Using cached GPT response (LLM_CACHE_BYPASS=1 to regenerate)")
+        return content
+    response = client.chat.completions.create(**request)
+    content = response.choices[0].message.content
+    if validate:
+        validate(content)
+    store(key, request, content)
+    return content
+
+async def async_chat_completion(client, validate=None, **request):
+    """chat_completion for an AsyncOpenAI client."""
+    key = request_key(request)
+    content = lookup(key, validate)
+    if content is not None:
+        return content
+    response = await client.chat.completions.create(**request)
+    content = response.choices[0].message.content
+    if validate:
+        validate(content)
+    store(key, request, content)
+    return content
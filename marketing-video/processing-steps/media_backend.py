@@ -0,0 +1,701 @@
+#!/usr/bin/env python3
+"""
+Media Backend
+- One interface for the media work of steps 1, 6, 8 and 9: chapter splits, timing fits,
+  voice filtering and format conversion (trim + scale + encode)
+- CliBackend spawns the ffmpeg CLI per operation (default, always available)
+- PyAVBackend decodes, filters and encodes in-process with PyAV, so all chapters of a
+  screencast share one decoder instead of re-opening and re-seeking the source per chapter
+- PyAVBackend.compose_video also renders step 9's video track in-process: the segments are
+  concatenated, scaled and overlaid frame by frame and encoded once, with no temp file between
+  the stages (image overlays need numpy)
+
+Select with MEDIA_BACKEND=cli|pyav. Without PyAV installed the CLI backend is used.
+The intermediate codec is a named profile from the assembly template's conversion_settings
+(INTERMEDIATE_PROFILE=prores_proxy|prores_lt|prores_422|ffv1|x264_lossless overrides it).
+Video operations take threads=N to cap decoder/encoder threads when chapters run in parallel.
+A 'resolution'/'frame_rate' in the settings is the target format (media_format); sources
+already in it are encoded without any scale or fps filter.
+Not in-process: step 9's audio mix and its --single-pass graph (always the ffmpeg CLI), and the
+CLI backend's overlays (step 9 builds them into its filter graph). Steps still hand files to each
+other, as each step is a separate process.
+"""
+
+import os
+import ast
+import json
+import time
+import operator
+from fractions import Fraction
+from pathlib import Path
+
+from pipeline_trace import run_command, record_event
+from media_probe import probe, get_duration, keyframe_index
+from media_format import assembly_template_file, conform_filters, filter_args
+
+try:
+    import av
+except ImportError:
+    av = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# ProRes 422 10-bit, the intermediate format when the template names no profile
+INTERMEDIATE_SETTINGS = {
+    'video_codec': 'prores_ks',
+    'video_profile': '2',
+    'pixel_format': 'yuv422p10le'
+}
+
+# Frames taken before the end when holding the last frame (avoids trailing black frames)
+FREEZE_FRAME_OFFSET = 20
+
+# Smart cut: source codec -> (encoder for the partial GOPs at the edges, Annex B bitstream filter,
+# sample entry that keeps parameter sets in-band, so each piece carries its own SPS/PPS)
+SMART_CUT_CODECS = {
+    'h264': ('libx264', 'h264_mp4toannexb', 'avc3'),
+    'hevc': ('libx265', 'hevc_mp4toannexb', 'hev1')
+}
+SMART_CUT_CRF = '12'  # visually lossless, so re-encoded edges match the copied GOPs
+# ffprobe profile name -> encoder -profile:v, so re-encoded edges declare the source's profile
+SMART_CUT_PROFILES = {
+    'h264': {'Baseline': 'baseline', 'Constrained Baseline': 'baseline', 'Main': 'main', 'High': 'high',
+             'High 10': 'high10', 'High 4:2:2': 'high422', 'High 4:4:4 Predictive': 'high444'},
+    'hevc': {'Main': 'main', 'Main 10': 'main10', 'Main Still Picture': 'mainstillpicture'}
+}
+KEYFRAME_TOLERANCE = 0.001
+
+# Intra-only intermediate encoders -> ffprobe codec name; every frame is a keyframe, so a
+# trim can be a frame-exact stream copy (ffv1 only with g=1, as in the ffv1 profile)
+INTRA_ONLY_CODECS = {
+    'prores_ks': 'prores',
+    'prores': 'prores',
+    'prores_aw': 'prores',
+    'ffv1': 'ffv1'
+}
+# prores_ks -profile:v number -> profile name reported by ffprobe
+PRORES_PROFILE_NAMES = {'0': 'Proxy', '1': 'LT', '2': 'Standard', '3': 'HQ', '4': '4444', '5': 'XQ'}
+
+def freeze_hold_time(source_duration, frame_rate):
+    """Time of the frame held when a clip is extended: FREEZE_FRAME_OFFSET frames before its end."""
+    return max(0, source_duration - FREEZE_FRAME_OFFSET / float(Fraction(str(frame_rate))))
+
+def freeze_frame_filters(source_duration, frame_rate):
+    """ffmpeg filters that keep a clip up to freeze_hold_time, then clone that frame without end.
+
+    The input must already run at frame_rate; the caller caps the length (-frames:v or trim).
+    """
+    frame_rate = Fraction(str(frame_rate))
+    kept_frames = max(1, round(freeze_hold_time(source_duration, frame_rate) * frame_rate))
+    return [f'trim=end_frame={kept_frames}', 'tpad=stop=-1:stop_mode=clone']
+
+def _thread_args(threads):
+    return ['-threads', str(threads)] if threads else []
+
+def video_codec_args(settings, threads=None):
+    """ffmpeg output arguments for a video codec setting (codec, profile, pixel format, encoder options)."""
+    args = ['-c:v', settings['video_codec']]
+    if settings.get('video_profile'):
+        args += ['-profile:v', str(settings['video_profile'])]
+    for option, value in settings.get('encoder_options', {}).items():
+        args += [f'-{option}', str(value)]
+    return args + ['-pix_fmt', settings['pixel_format']] + _thread_args(threads)
+
+def _copy_trim_frames(source, duration, settings):
+    """Frame count for trimming source to duration by stream copy, or None if it must be transcoded.
+
+    Copying is only possible when source is already intra-only and in the target format:
+    same codec, profile, pixel format, size and (if set) frame rate as settings.
+    """
+    codec = INTRA_ONLY_CODECS.get(settings['video_codec'])
+    if not codec or (codec == 'ffv1' and str(settings.get('encoder_options', {}).get('g', '')) != '1'):
+        return None
+    metadata = probe(source)
+    video = metadata['video'] if metadata else None
+    if not video or video['codec'] != codec or video['pix_fmt'] != settings['pixel_format'] or not video['frame_rate']:
+        return None
+    if codec == 'prores' and settings.get('video_profile') is not None:
+        if video['profile'] != PRORES_PROFILE_NAMES.get(str(settings['video_profile'])):
+            return None
+    if settings.get('resolution') and f"{video['width']}x{video['height']}" != settings['resolution']:
+        return None
+    if settings.get('frame_rate') and abs(video['frame_rate'] - float(Fraction(str(settings['frame_rate'])))) > 0.01:
+        return None
+    return max(1, round(duration * video['frame_rate']))
+
+def _smart_cut_encoder_args(video):
+    """Encoder options matching the source's profile, level and reference frames (from probe()).
+
+    The edges carry their own (in-band) parameter sets; matching the stream parameters keeps
+    the joined chapter within what a decoder set up for the source expects.
+    """
+    codec = video['codec']
+    args = []
+    profile = SMART_CUT_PROFILES[codec].get(video.get('profile'))
+    if profile:
+        args += ['-profile:v', profile]
+    level = video.get('level')
+    refs = video.get('refs')
+    if codec == 'h264':
+        if level and level > 0:
+            args += ['-level:v', f"{level // 10}.{level % 10}"]
+        if refs:
+            args += ['-x264-params', f'ref={refs}']
+    else:
+        params = []
+        if level and level > 0:
+            params.append(f"level-idc={level / 30:g}")
+        if refs:
+            params.append(f'ref={refs}')
+        if params:
+            args += ['-x265-params', ':'.join(params)]
+    return args
+
+def load_intermediate_profiles(template_file):
+    """Return (selected profile name, {name: settings}) from an assembly template's conversion_settings."""
+    with open(template_file, 'r') as f:
+        conversion_settings = json.load(f).get('conversion_settings', {})
+    profiles = conversion_settings.get('intermediate_profiles', {})
+    return conversion_settings.get('intermediate_profile'), profiles
+
+def intermediate_settings(project_dir):
+    """Video settings for the project's intermediate files.
+
+    The project's assembly template selects a named profile; INTERMEDIATE_PROFILE overrides
+    the selection. Falls back to ProRes 422 when there is no template or profile.
+    """
+    template_file = assembly_template_file(project_dir)
+    if not template_file.exists():
+        return INTERMEDIATE_SETTINGS
+
+    selected, profiles = load_intermediate_profiles(template_file)
+    selected = os.getenv('INTERMEDIATE_PROFILE') or selected
+    if not selected:
+        return INTERMEDIATE_SETTINGS
+    if selected not in profiles:
+        print(f"  ⚠ Unknown intermediate profile '{selected}' (known: {', '.join(profiles)}), using ProRes 422")
+        return INTERMEDIATE_SETTINGS
+    return profiles[selected]
+
+class CliBackend:
+    """Run every operation as an ffmpeg subprocess."""
+    name = 'cli'
+
+    def split_video(self, source, segments, settings, audio_output=None, threads=None):
+        """Encode each (start, duration, output) segment of source as a video-only file.
+
+        One ffmpeg decodes the source once and fans it out through split/trim to every
+        segment; audio_output=(path, sample_rate, channels) extracts PCM audio in the same pass.
+        """
+        if not segments and not audio_output:
+            return True
+
+        input_args = _thread_args(threads)
+        if segments and not audio_output:
+            # Without audio only the span covering the segments needs decoding
+            seek_to = min(start for start, _, _ in segments)
+            end = max(start + duration for start, duration, _ in segments)
+            if seek_to > 0:
+                input_args += ['-ss', str(seek_to)]
+            input_args += ['-t', str(end - seek_to)]
+        else:
+            seek_to = 0
+
+        filter_parts = []
+        output_args = []
+        if segments:
+            # Conform once here, at ingest (nothing is added when the source already matches)
+            conform = ''.join(f',{name}' for name in conform_filters(source, settings))
+            split_labels = ''.join(f'[split{index}]' for index in range(len(segments)))
+            filter_parts.append(f'[0:v]split={len(segments)}{split_labels}')
+            for index, (start, duration, output) in enumerate(segments):
+                filter_parts.append(
+                    f'[split{index}]trim=start={start - seek_to}:duration={duration},setpts=PTS-STARTPTS{conform}[segment{index}]'
+                )
+                output_args += ['-map', f'[segment{index}]'] + video_codec_args(settings, threads) + [
+                    '-an', '-y', str(output)
+                ]
+
+        if audio_output:
+            audio_file, sample_rate, channels = audio_output
+            output_args += [
+                '-map', '0:a:0', '-vn', '-acodec', 'pcm_s16le', '-ar', str(sample_rate), '-ac', str(channels),
+                '-y', str(audio_file)
+            ]
+
+        cmd = ['ffmpeg'] + input_args + ['-i', str(source)]
+        if filter_parts:
+            cmd += ['-filter_complex', '; '.join(filter_parts)]
+        cmd += output_args
+
+        total = sum(duration for _, duration, _ in segments)
+        parts = [f"{len(segments)} chapter file(s) ({total:.1f}s)"] if segments else []
+        if audio_output:
+            parts.append("audio")
+        expected_duration = None if audio_output else end - seek_to
+        description = f"Creating {' + '.join(parts)} in one decode pass" if segments else "Extracting audio"
+        return run_command(cmd, description, expected_duration=expected_duration)
+
+    def smart_cut(self, source, start, duration, output, threads=None, target=None):
+        """Cut [start, start + duration) of source without transcoding the whole GOPs inside it.
+
+        GOPs lying fully inside the range are stream-copied, by frame count so the copy ends
+        exactly on a GOP boundary; only the partial GOPs at each edge are re-encoded, with the
+        source's profile, level and reference frames. The pieces keep their parameter sets
+        in-band (avc3/hev1 sample entry), so edges and copied GOPs need not share one SPS/PPS.
+        Returns (True, details) on success or (False, reason) when the source cannot be cut
+        this way (e.g. it is not in the target resolution/frame rate), in which case the
+        caller should transcode.
+        """
+        metadata = probe(source)
+        video = metadata['video'] if metadata else None
+        if not video or video['codec'] not in SMART_CUT_CODECS:
+            return False, f"{video['codec'] if video else 'unknown'} source cannot be stream-copied"
+        if target and conform_filters(source, target):
+            # Copied GOPs cannot be conformed; transcoding conforms at ingest instead of in step 6
+            return False, "source is not in the target resolution/frame rate"
+
+        keyframes = keyframe_index(source)
+        end = start + duration
+        inside = [(t, frames) for t, frames in keyframes or []
+                  if start - KEYFRAME_TOLERANCE <= t <= end + KEYFRAME_TOLERANCE]
+        if len(inside) < 2:
+            return False, "no complete GOP inside the chapter"
+
+        encoder, bitstream_filter, sample_entry = SMART_CUT_CODECS[video['codec']]
+        copy_start, copy_end = inside[0][0], inside[-1][0]
+        copy_frames = sum(frames for _, frames in inside[:-1])
+        # Seek half a frame past the keyframe: the demuxer lands on it, never on the GOP before
+        seek_margin = 0.5 / video['frame_rate'] if video['frame_rate'] else KEYFRAME_TOLERANCE
+        output = Path(output)
+        pieces = []
+        commands = []
+
+        def encoded_piece(name, piece_start, piece_duration):
+            piece = output.parent / f"temp_{name}_{output.stem}.ts"
+            pieces.append(piece)
+            commands.append(([
+                'ffmpeg', '-ss', str(piece_start), '-i', str(source), '-t', str(piece_duration), '-an',
+                '-c:v', encoder, '-crf', SMART_CUT_CRF, '-pix_fmt', video['pix_fmt']
+            ] + _smart_cut_encoder_args(video) + _thread_args(threads) + [
+                '-f', 'mpegts', '-y', str(piece)
+            ], f"Re-encoding {name} of {output.name} ({piece_duration:.2f}s)"))
+
+        if copy_start - start > KEYFRAME_TOLERANCE:
+            encoded_piece('head', start, copy_start - start)
+        middle = output.parent / f"temp_middle_{output.stem}.ts"
+        pieces.append(middle)
+        commands.append(([
+            'ffmpeg', '-ss', str(copy_start + seek_margin), '-i', str(source), '-frames:v', str(copy_frames), '-an',
+            '-c:v', 'copy', '-bsf:v', bitstream_filter, '-f', 'mpegts', '-y', str(middle)
+        ], f"Copying whole GOPs of {output.name} ({copy_end - copy_start:.2f}s)"))
+        if end - copy_end > KEYFRAME_TOLERANCE:
+            encoded_piece('tail', copy_end, end - copy_end)
+
+        concat_file = output.parent / f"temp_concat_{output.stem}.txt"
+        try:
+            for cmd, description in commands:
+                if not run_command(cmd, description):
+                    return False, "stream copy failed"
+            with open(concat_file, 'w') as f:
+                for piece in pieces:
+                    f.write(f"file '{piece.resolve()}'\n")
+            concat_cmd = ['ffmpeg', '-f', 'concat', '-safe', '0', '-i', str(concat_file), '-c', 'copy',
+                          '-tag:v', sample_entry, '-y', str(output)]
+            if not run_command(concat_cmd, f"Joining smart-cut pieces of {output.name}", expected_duration=duration):
+                return False, "joining pieces failed"
+        finally:
+            for temp_file in pieces + [concat_file]:
+                if temp_file.exists():
+                    temp_file.unlink()
+
+        reencoded = duration - (copy_end - copy_start)
+        return True, f"copied {copy_end - copy_start:.1f}s, re-encoded {reencoded:.1f}s"
+
+    def fit_video(self, source, output, duration, settings, threads=None):
+        """Trim source to duration, or hold its last frame until duration is reached (video only)."""
+        output = Path(output)
+        source_duration = get_duration(source)
+        if not source_duration:
+            return False
+
+        if source_duration >= duration:
+            frames = _copy_trim_frames(source, duration, settings)
+            if frames:
+                # Already intra-only in the target format: remux the first frames, no encode
+                cmd = ['ffmpeg', '-i', str(source), '-map', '0:v:0', '-c:v', 'copy', '-frames:v', str(frames),
+                       '-an', '-y', str(output)]
+                return run_command(cmd, f"Trimming {output.name} to {duration:.1f}s (stream copy, {frames} frames)")
+            cmd = ['ffmpeg'] + _thread_args(threads) + ['-i', str(source)] + filter_args(conform_filters(source, settings)) + \
+                video_codec_args(settings, threads) + ['-t', str(duration), '-an', '-y', str(output)]
+            return run_command(cmd, f"Trimming {output.name} to {duration:.1f}s")
+
+        # One encode: conform to the output rate and size (only what differs), stop ~20 frames
+        # before the end (to avoid black frames), then clone that frame; -frames:v makes the
+        # length frame-exact
+        frame_rate = Fraction(str(settings.get('frame_rate', '30')))
+        total_frames = max(1, round(duration * frame_rate))
+        chain = conform_filters(source, {**settings, 'frame_rate': str(frame_rate)}) + \
+            freeze_frame_filters(source_duration, frame_rate)
+        cmd = ['ffmpeg'] + _thread_args(threads) + [
+            '-i', str(source),
+            '-filter_complex', f"[0:v]{','.join(chain)}[video]",
+            '-map', '[video]', '-frames:v', str(total_frames)
+        ] + video_codec_args(settings, threads) + ['-an', '-y', str(output)]
+        return run_command(cmd, f"Extending {output.name} with freeze frame ({duration - source_duration:.1f}s)",
+                           expected_duration=duration)
+
+    def convert_video(self, source, output, settings, description, duration=None, threads=None):
+        """Encode source (its first duration seconds) in settings' codec, conformed to its format (video only)."""
+        cmd = ['ffmpeg'] + _thread_args(threads) + ['-i', str(source)] + filter_args(conform_filters(source, settings)) + \
+            video_codec_args(settings, threads)
+        if duration is not None:
+            cmd += ['-t', str(duration)]
+        cmd += ['-an', '-y', str(output)]
+        return run_command(cmd, description)
+
+    def filter_audio(self, source, output, audio_filter, sample_rate, channels, description):
+        """Run source through an ffmpeg audio filter chain into 16-bit PCM."""
+        cmd = [
+            'ffmpeg', '-i', str(source),
+            '-af', audio_filter,
+            '-c:a', 'pcm_s16le', '-ar', str(sample_rate), '-ac', str(channels),
+            '-y', str(output)
+        ]
+        return run_command(cmd, description)
+
+def _file_bytes(paths):
+    return sum(os.path.getsize(path) for path in paths if os.path.isfile(path))
+
+def _run_traced(description, inputs, outputs, action):
+    """Run an in-process operation with run_command's console output and a trace event."""
+    print(f"  {description}...")
+    start_time = time.time()
+    start = time.perf_counter()
+    try:
+        action()
+        succeeded = True
+    except Exception as e:
+        print(f"  ✗ Error in {description}: {e}")
+        succeeded = False
+    duration = time.perf_counter() - start
+
+    record_event(description, start_time, duration, {
+        'backend': 'pyav',
+        'succeeded': succeeded,
+        'wall_s': round(duration, 3),
+        'input_bytes': _file_bytes(inputs),
+        'output_bytes': _file_bytes(outputs)
+    }, category='pyav')
+
+    if succeeded:
+        print(f"  ✓ {description} completed")
+    return succeeded
+
+_EXPRESSION_OPERATORS = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv,
+    ast.USub: operator.neg, ast.UAdd: operator.pos
+}
+
+def _evaluate_position(expression, names):
+    """Evaluate an ffmpeg overlay coordinate such as '(W-w)/2' or 'H*5/6' (arithmetic on W, H, w, h only)."""
+    def evaluate(node):
+        if isinstance(node, ast.Expression):
+            return evaluate(node.body)
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+            return node.value
+        if isinstance(node, ast.Name) and node.id in names:
+            return names[node.id]
+        if isinstance(node, ast.BinOp) and type(node.op) in _EXPRESSION_OPERATORS:
+            return _EXPRESSION_OPERATORS[type(node.op)](evaluate(node.left), evaluate(node.right))
+        if isinstance(node, ast.UnaryOp) and type(node.op) in _EXPRESSION_OPERATORS:
+            return _EXPRESSION_OPERATORS[type(node.op)](evaluate(node.operand))
+        raise ValueError(f"Unsupported overlay position expression: {expression}")
+    return int(evaluate(ast.parse(expression.strip(), mode='eval')))
+
+def _sample_frames(frames, timestamps):
+    """Yield, for each ascending timestamp, the latest decoded frame at or before it."""
+    current, upcoming = None, next(frames, None)
+    for timestamp in timestamps:
+        while upcoming is not None and (current is None or upcoming.time <= timestamp + 1e-6):
+            current, upcoming = upcoming, next(frames, None)
+        if current is None:
+            raise ValueError("No video frames")
+        yield current
+
+class PyAVBackend:
+    """Decode, filter and encode in-process with PyAV."""
+    name = 'pyav'
+
+    def _add_video_stream(self, container, settings, source_stream, threads=None):
+        rate = Fraction(str(settings['frame_rate'])) if settings.get('frame_rate') else source_stream.average_rate or Fraction(30)
+        stream = container.add_stream(settings['video_codec'], rate=rate)
+        if settings.get('resolution'):
+            stream.width, stream.height = (int(value) for value in settings['resolution'].split('x'))
+        else:
+            stream.width, stream.height = source_stream.codec_context.width, source_stream.codec_context.height
+        stream.pix_fmt = settings['pixel_format']
+        stream.time_base = 1 / rate
+        options = {option: str(value) for option, value in settings.get('encoder_options', {}).items()}
+        if settings.get('video_profile'):
+            options['profile'] = str(settings['video_profile'])
+        if options:
+            stream.options = options
+        if threads:
+            stream.codec_context.thread_count = threads
+        return stream, rate
+
+    def _render_segments(self, source, segments, settings, hold_from=None, threads=None):
+        """Encode (start, duration, output) segments at a constant frame rate from one decoder.
+
+        Every output frame is the latest source frame at or before its timestamp, so a
+        segment running past the end of the source holds the last frame. With hold_from,
+        timestamps after it repeat the frame shown at hold_from.
+        """
+        with av.open(str(source)) as input_container:
+            source_stream = input_container.streams.video[0]
+            source_stream.thread_type = 'AUTO'
+            if threads:
+                source_stream.codec_context.thread_count = threads
+
+            def seek(position):
+                if position > 0:
+                    input_container.seek(int(position / source_stream.time_base), stream=source_stream)
+                return input_container.decode(source_stream)
+
+            frames = None
+            current = upcoming = None
+            for start, duration, output in sorted(segments, key=lambda segment: segment[0]):
+                if frames is None or (current is not None and current.time > start):
+                    frames = seek(start)
+                    current, upcoming = None, next(frames, None)
+
+                with av.open(str(output), 'w') as output_container:
+                    stream, rate = self._add_video_stream(output_container, settings, source_stream, threads)
+                    for index in range(max(1, round(duration * rate))):
+                        timestamp = start + index / rate
+                        if hold_from is not None:
+                            timestamp = min(timestamp, hold_from)
+                        while upcoming is not None and (current is None or upcoming.time <= timestamp + 1e-6):
+                            current, upcoming = upcoming, next(frames, None)
+                        if current is None:
+                            raise ValueError(f"No video frames in {source}")
+
+                        frame = current.reformat(width=stream.width, height=stream.height, format=stream.pix_fmt,
+                                                 interpolation='LANCZOS')
+                        frame.pts = index
+                        frame.time_base = stream.time_base
+                        output_container.mux(stream.encode(frame))
+                    output_container.mux(stream.encode())
+
+    def split_video(self, source, segments, settings, audio_output=None, threads=None):
+        """Encode each (start, duration, output) segment of source, decoding the video once.
+
+        audio_output=(path, sample_rate, channels) also extracts PCM audio (a separate audio decode).
+        """
+        if segments:
+            total = sum(duration for _, duration, _ in segments)
+            if not _run_traced(
+                f"Creating {len(segments)} chapter file(s) ({total:.1f}s) from one decode",
+                [source], [output for _, _, output in segments],
+                lambda: self._render_segments(source, segments, settings, threads=threads)
+            ):
+                return False
+        if audio_output:
+            audio_file, sample_rate, channels = audio_output
+            return _run_traced(
+                "Extracting audio", [source], [audio_file],
+                lambda: self._filter_audio(source, audio_file, 'anull', sample_rate, channels)
+            )
+        return True
+
+    def _copy_frames(self, source, output, frames):
+        """Remux the first frames video packets of an intra-only source (no decode or encode)."""
+        with av.open(str(source)) as input_container, av.open(str(output), 'w') as output_container:
+            source_stream = input_container.streams.video[0]
+            if hasattr(output_container, 'add_stream_from_template'):
+                stream = output_container.add_stream_from_template(source_stream)
+            else:
+                stream = output_container.add_stream(template=source_stream)
+            copied = 0
+            for packet in input_container.demux(source_stream):
+                if packet.dts is None:
+                    continue
+                if copied == frames:
+                    break
+                packet.stream = stream
+                output_container.mux(packet)
+                copied += 1
+
+    def fit_video(self, source, output, duration, settings, threads=None):
+        """Trim source to duration, or hold its last frame until duration is reached (video only)."""
+        source_duration = get_duration(source)
+        if not source_duration:
+            return False
+
+        frames = _copy_trim_frames(source, duration, settings) if source_duration >= duration else None
+        if frames:
+            return _run_traced(
+                f"Trimming {Path(output).name} to {duration:.1f}s (stream copy, {frames} frames)", [source], [output],
+                lambda: self._copy_frames(source, output, frames)
+            )
+
+        hold_from = None
+        if source_duration < duration:
+            # Hold the frame ~20 frames before the end (to avoid black frames), like the CLI path
+            hold_from = freeze_hold_time(source_duration, settings.get('frame_rate', '30'))
+        return _run_traced(
+            f"Fitting {Path(output).name} to {duration:.1f}s", [source], [output],
+            lambda: self._render_segments(source, [(0, duration, output)], settings, hold_from, threads)
+        )
+
+    def convert_video(self, source, output, settings, description, duration=None, threads=None):
+        """Encode source (its first duration seconds) in settings' codec, conformed to its format (video only)."""
+        source_duration = get_duration(source)
+        if not source_duration:
+            return False
+        duration = min(duration, source_duration) if duration is not None else source_duration
+        return _run_traced(
+            description, [source], [output],
+            lambda: self._render_segments(source, [(0, duration, output)], settings, threads=threads)
+        )
+
+    def _load_overlay(self, overlay, width, height):
+        """(x, y, RGBA 16-bit pixels) of an overlay image, scaled and placed as step 9's layer describes."""
+        with av.open(str(overlay['file'])) as container:
+            image = next(container.decode(video=0))
+        overlay_width, overlay_height = image.width, image.height
+        if overlay.get('size'):
+            overlay_width, overlay_height = (int(value) for value in overlay['size'].split('x'))
+        elif overlay.get('scale'):
+            scale = float(overlay['scale'])
+            overlay_width, overlay_height = round(overlay_width * scale), round(overlay_height * scale)
+        pixels = image.reformat(width=overlay_width, height=overlay_height, format='rgba64le').to_ndarray()
+
+        names = {'W': width, 'H': height, 'w': overlay_width, 'h': overlay_height,
+                 'main_w': width, 'main_h': height, 'overlay_w': overlay_width, 'overlay_h': overlay_height}
+        x_expression, y_expression = overlay['position'].split(':')
+        return _evaluate_position(x_expression, names), _evaluate_position(y_expression, names), pixels
+
+    def _composite(self, frame, layers, timestamp):
+        """Blend the layers shown at timestamp onto frame (returned unchanged when none are)."""
+        active = [layer for layer in layers if layer['start'] <= timestamp <= layer['end']]
+        if not active:
+            return frame
+        canvas = frame.to_ndarray(format='rgb48le').astype(np.float32)
+        height, width = canvas.shape[:2]
+        for layer in active:
+            x, y, pixels = layer['image']
+            left, top = max(x, 0), max(y, 0)
+            right, bottom = min(x + pixels.shape[1], width), min(y + pixels.shape[0], height)
+            if right <= left or bottom <= top:
+                continue
+            region = pixels[top - y:bottom - y, left - x:right - x].astype(np.float32)
+            alpha = region[..., 3:] / 65535
+            canvas[top:bottom, left:right] = region[..., :3] * alpha + canvas[top:bottom, left:right] * (1 - alpha)
+        blended = av.VideoFrame.from_ndarray(canvas.round().astype(np.uint16), format='rgb48le')
+        return blended.reformat(format=frame.format.name)
+
+    def _compose(self, sources, output, settings, overlays, threads):
+        with av.open(str(output), 'w') as output_container:
+            stream = rate = layers = None
+            written = 0
+            for source in sources:
+                source_duration = get_duration(source)
+                if not source_duration:
+                    raise ValueError(f"Cannot read the duration of {source}")
+                with av.open(str(source)) as input_container:
+                    source_stream = input_container.streams.video[0]
+                    source_stream.thread_type = 'AUTO'
+                    if threads:
+                        source_stream.codec_context.thread_count = threads
+                    if stream is None:
+                        stream, rate = self._add_video_stream(output_container, settings, source_stream, threads)
+                        layers = [{**overlay, 'image': self._load_overlay(overlay, stream.width, stream.height)}
+                                  for overlay in overlays]
+                    start = float(source_stream.start_time * source_stream.time_base) if source_stream.start_time else 0.0
+
+                    # Concat: this segment's frames continue the output timeline at the output rate
+                    count = max(1, round(source_duration * rate))
+                    timestamps = (start + index / rate for index in range(count))
+                    for index, current in enumerate(_sample_frames(input_container.decode(source_stream), timestamps)):
+                        frame = current.reformat(width=stream.width, height=stream.height, format=stream.pix_fmt,
+                                                 interpolation='LANCZOS')
+                        frame = self._composite(frame, layers, float((written + index) / rate))
+                        frame.pts = written + index
+                        frame.time_base = stream.time_base
+                        output_container.mux(stream.encode(frame))
+                    written += count
+            if stream is not None:
+                output_container.mux(stream.encode())
+
+    def compose_video(self, sources, output, settings, overlays=(), threads=None):
+        """Concatenate sources into one video track in settings' format, with timed image overlays.
+
+        overlays are step 9's layers: {'file', 'position' (ffmpeg 'x:y' expression), 'scale' or
+        'size' ('WxH'), 'start', 'end'}. Frames go from decoder to scaler, compositor and encoder
+        in memory. Returns False (the caller uses the ffmpeg CLI graph) if overlays need numpy.
+        """
+        if overlays and np is None:
+            print("  ⚠ In-process overlays need numpy (pip install numpy), using the ffmpeg CLI")
+            return False
+        total = sum(get_duration(source) or 0 for source in sources)
+        return _run_traced(
+            f"Composing {len(sources)} segment(s) with {len(overlays)} overlay(s) in-process ({total:.1f}s)",
+            list(sources), [output], lambda: self._compose(sources, output, settings, overlays, threads)
+        )
+
+    def _filter_audio(self, source, output, audio_filter, sample_rate, channels):
+        layout = 'mono' if channels == 1 else 'stereo'
+        with av.open(str(source)) as input_container, av.open(str(output), 'w') as output_container:
+            source_stream = input_container.streams.audio[0]
+            stream = output_container.add_stream('pcm_s16le', rate=sample_rate)
+            stream.layout = layout
+
+            # abuffer -> the step's filter chain -> aformat -> abuffersink
+            graph = av.filter.Graph()
+            nodes = [graph.add_abuffer(template=source_stream)]
+            for filter_spec in audio_filter.split(','):
+                filter_name, _, filter_args = filter_spec.partition('=')
+                nodes.append(graph.add(filter_name, filter_args or None))
+            nodes.append(graph.add('aformat', f"sample_fmts=s16:sample_rates={sample_rate}:channel_layouts={layout}"))
+            nodes.append(graph.add('abuffersink'))
+            for upstream, downstream in zip(nodes, nodes[1:]):
+                upstream.link_to(downstream)
+            graph.configure()
+
+            def drain():
+                while True:
+                    try:
+                        filtered = graph.pull()
+                    except (BlockingIOError, EOFError):
+                        return
+                    output_container.mux(stream.encode(filtered))
+
+            for frame in input_container.decode(source_stream):
+                graph.push(frame)
+                drain()
+            graph.push(None)
+            drain()
+            output_container.mux(stream.encode())
+
+    def filter_audio(self, source, output, audio_filter, sample_rate, channels, description):
+        """Run source through an ffmpeg audio filter chain into 16-bit PCM (filters must not contain commas)."""
+        return _run_traced(
+            description, [source], [output],
+            lambda: self._filter_audio(source, output, audio_filter, sample_rate, channels)
+        )
+
+def get_backend(name=None):
+    """Return the media backend selected by name or MEDIA_BACKEND (default: cli)."""
+    name = (name or os.getenv('MEDIA_BACKEND', 'cli')).lower()
+    if name == 'pyav':
+        if av is not None:
+            return PyAVBackend()
+        print("  ⚠ MEDIA_BACKEND=pyav but PyAV is not installed (pip install av), using the ffmpeg CLI")
+    elif name != 'cli':
+        print(f"  ⚠ Unknown MEDIA_BACKEND '{name}', using the ffmpeg CLI")
+    return CliBackend()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Media Format
+- Format negotiation for every video segment of the assembly: the assembly template's
+  conversion_settings name one target resolution and frame rate
+- Each source is probed once (media_probe's cache) and conformed once, when it enters the
+  pipeline, with a single high-quality scaler
+- Later stages ask conform_filters() what a file still needs; a file already in the target
+  format gets an empty chain, so no no-op scale/fps/format filter runs on its frames
+"""
+
+import json
+from fractions import Fraction
+from pathlib import Path
+
+from media_probe import probe
+
+DEFAULT_ASSEMBLY_TEMPLATE = "assembly-template1.json"
+DEFAULT_RESOLUTION = '1920x1080'
+DEFAULT_FRAME_RATE = '30'
+
+# Lanczos with full chroma interpolation: the one scale a frame goes through should be the good one
+SCALE_FLAGS = 'lanczos+accurate_rnd+full_chroma_int'
+
+FRAME_RATE_TOLERANCE = 0.01
+
+def assembly_template_file(project_dir):
+    """The project's assembly template (project-config.json's assembly_template, or the default)."""
+    project_dir = Path(project_dir)
+    template_name = DEFAULT_ASSEMBLY_TEMPLATE
+    config_file = project_dir / "human-provided-content" / "project-config.json"
+    if config_file.exists():
+        with open(config_file, 'r') as f:
+            template_name = json.load(f).get('assembly_template', template_name)
+    return project_dir.parent / "video-templates" / template_name
+
+def template_format(conversion_settings):
+    """Target {'resolution', 'frame_rate'} from an assembly template's conversion_settings."""
+    return {
+        'resolution': conversion_settings.get('resolution', DEFAULT_RESOLUTION),
+        'frame_rate': str(conversion_settings.get('frame_rate', DEFAULT_FRAME_RATE))
+    }
+
+def target_format(project_dir):
+    """Target {'resolution', 'frame_rate'} of the project's assembly template."""
+    template_file = assembly_template_file(project_dir)
+    if not template_file.exists():
+        return template_format({})
+    with open(template_file, 'r') as f:
+        return template_format(json.load(f).get('conversion_settings', {}))
+
+def conform_filters(source, target, pixel_format=None):
+    """ffmpeg video filters that bring source to target (and pixel_format, if given).
+
+    Only the properties that differ get a filter; an unreadable source (or source=None, for a
+    stream of mixed inputs) gets all of them. Returns [] when source is already in the target format.
+    """
+    metadata = probe(source) if source else None
+    video = metadata['video'] if metadata else None
+    filters = []
+
+    frame_rate = target.get('frame_rate')
+    if frame_rate and not (video and video['frame_rate'] and
+                           abs(video['frame_rate'] - float(Fraction(str(frame_rate)))) <= FRAME_RATE_TOLERANCE):
+        filters.append(f'fps={frame_rate}')
+
+    resolution = target.get('resolution')
+    if resolution and not (video and f"{video['width']}x{video['height']}" == resolution):
+        width, height = resolution.split('x')
+        filters += [f'scale={width}:{height}:flags={SCALE_FLAGS}', 'setsar=1']
+
+    if pixel_format and not (video and video['pix_fmt'] == pixel_format):
+        filters.append(f'format={pixel_format}')
+    return filters
+
+def conforms(source, target, pixel_format=None):
+    """True if source needs no conversion to match target."""
+    return not conform_filters(source, target, pixel_format)
+
+def filter_args(filters):
+    """['-vf', chain] for a filter list, or [] when there is nothing to do."""
+    return ['-vf', ','.join(filters)] if filters else []
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Media Probe
+- Single ffprobe service shared by every processing step
+- Returns stream metadata (duration, codec, resolution, frame rate, sample rate, pix_fmt, chapters)
+- Lists video keyframe times (and frames per GOP) for stream-copy cutting
+- Memoizes results on disk keyed by path + size + mtime, so unchanged files are never probed twice
+- New results are saved in batches under one lock, so chapter workers never write the file concurrently
+
+The cache lives in ~/.cache/marketing-video/media-probe.json (override with MEDIA_PROBE_CACHE)
+so shared assets like intros, outros and music beds are probed once across projects.
+"""
+
+import os
+import json
+import atexit
+import threading
+from pathlib import Path
+
+from pipeline_trace import run_process
+
+DEFAULT_CACHE_FILE = Path.home() / ".cache" / "marketing-video" / "media-probe.json"
+
+# New entries are written to disk in batches of this size (and once more at exit)
+SAVE_BATCH_SIZE = 16
+
+_cache = None
+_pending = {}
+_cache_lock = threading.Lock()
+
+def _cache_file():
+    return Path(os.getenv('MEDIA_PROBE_CACHE', str(DEFAULT_CACHE_FILE)))
+
+def _read_cache_file():
+    try:
+        with open(_cache_file(), 'r') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+def _save_entries(entries):
+    """Merge entries into the on-disk cache (other processes may have written since we loaded)."""
+    cache_file = _cache_file()
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        on_disk = _read_cache_file()
+        on_disk.update(entries)
+        temp_file = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(temp_file, 'w') as f:
+            json.dump(on_disk, f)
+        os.replace(temp_file, cache_file)
+    except OSError as e:
+        print(f"  ⚠ Could not save media probe cache: {e}")
+
+def _parse_rate(rate):
+    """Convert an ffprobe rate like '30000/1001' to a float."""
+    try:
+        numerator, _, denominator = str(rate).partition('/')
+        value = float(numerator) / float(denominator or 1)
+        return value if value > 0 else None
+    except (ValueError, ZeroDivisionError):
+        return None
+
+def _parse_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def _summarize(probe_data):
+    """Reduce raw ffprobe JSON to the fields the pipeline uses."""
+    format_info = probe_data.get('format', {})
+    streams = probe_data.get('streams', [])
+    video_stream = next((s for s in streams if s.get('codec_type') == 'video'), None)
+    audio_stream = next((s for s in streams if s.get('codec_type') == 'audio'), None)
+
+    metadata = {
+        'duration': _parse_float(format_info.get('duration')),
+        'start_time': _parse_float(format_info.get('start_time')),
+        'format_name': format_info.get('format_name'),
+        'bit_rate': _parse_float(format_info.get('bit_rate')),
+        'video': None,
+        'audio': None,
+        'chapters': probe_data.get('chapters', [])
+    }
+
+    if video_stream:
+        metadata['video'] = {
+            'codec': video_stream.get('codec_name'),
+            'profile': video_stream.get('profile'),
+            'level': video_stream.get('level'),
+            'refs': video_stream.get('refs'),
+            'width': video_stream.get('width'),
+            'height': video_stream.get('height'),
+            'pix_fmt': video_stream.get('pix_fmt'),
+            'frame_rate': _parse_rate(video_stream.get('avg_frame_rate')) or _parse_rate(video_stream.get('r_frame_rate')),
+            'duration': _parse_float(video_stream.get('duration'))
+        }
+
+    if audio_stream:
+        metadata['audio'] = {
+            'codec': audio_stream.get('codec_name'),
+            'sample_rate': int(audio_stream['sample_rate']) if audio_stream.get('sample_rate') else None,
+            'channels': audio_stream.get('channels'),
+            'duration': _parse_float(audio_stream.get('duration'))
+        }
+
+    return metadata
+
+def _file_key(file_path):
+    """Return (cache key, identity) for a file, or (None, None) if it is missing."""
+    path = Path(file_path)
+    try:
+        stat = path.stat()
+    except OSError:
+        return None, None
+    return str(path.resolve()), {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+def _cached(path_key, identity):
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = _read_cache_file()
+        entry = _cache.get(path_key)
+        if entry and entry.get('identity') == identity:
+            return entry
+    return None
+
+def _flush_locked():
+    if _pending:
+        _save_entries(dict(_pending))
+        _pending.clear()
+
+def flush():
+    """Write probe results not yet saved to the on-disk cache."""
+    with _cache_lock:
+        _flush_locked()
+
+atexit.register(flush)
+
+def _store(path_key, identity, metadata):
+    entry = {'identity': identity, 'metadata': metadata}
+    with _cache_lock:
+        _cache[path_key] = entry
+        _pending[path_key] = entry
+        if len(_pending) >= SAVE_BATCH_SIZE:
+            _flush_locked()
+
+def probe(file_path):
+    """Return stream metadata for a media file, or None if it is missing or unreadable."""
+    path = Path(file_path)
+    path_key, identity = _file_key(path)
+    if path_key is None:
+        return None
+
+    entry = _cached(path_key, identity)
+    if entry:
+        return entry['metadata']
+
+    cmd = [
+        'ffprobe', '-v', 'quiet', '-print_format', 'json',
+        '-show_format', '-show_streams', '-show_chapters', str(path)
+    ]
+    try:
+        result = run_process(cmd, description=f"Probing {path.name}")
+    except Exception as e:
+        print(f"  ⚠ Could not probe {path}: {e}")
+        return None
+    if result.returncode != 0:
+        return None
+
+    try:
+        metadata = _summarize(json.loads(result.stdout))
+    except json.JSONDecodeError:
+        return None
+
+    _store(path_key, identity, metadata)
+    return metadata
+
+def keyframe_index(file_path):
+    """Return [(keyframe time, frames until the next keyframe)] in presentation order, or None.
+
+    Reads packet timestamps and flags only (no decoding), so it is fast even for long
+    screencasts. The frame counts let a stream copy end on a GOP boundary by frame count
+    (-frames:v) instead of by a rounded timestamp.
+    """
+    path = Path(file_path)
+    path_key, identity = _file_key(path)
+    if path_key is None:
+        return None
+    path_key = f"{path_key}#keyframe-index"
+
+    entry = _cached(path_key, identity)
+    if entry:
+        return [tuple(keyframe) for keyframe in entry['metadata']]
+
+    cmd = [
+        'ffprobe', '-v', 'quiet', '-select_streams', 'v:0',
+        '-show_entries', 'packet=pts_time,flags', '-of', 'csv=p=0', str(path)
+    ]
+    try:
+        result = run_process(cmd, description=f"Probing keyframes of {path.name}", stderr_lines=20)
+    except Exception as e:
+        print(f"  ⚠ Could not probe keyframes of {path}: {e}")
+        return None
+    if result.returncode != 0:
+        return None
+
+    packets = []
+    for line in result.stdout.splitlines():
+        pts_time, _, flags = line.partition(',')
+        time_value = _parse_float(pts_time)
+        if time_value is not None:
+            packets.append((time_value, 'K' in flags))
+    packets.sort()
+
+    index = []
+    for time_value, is_keyframe in packets:
+        if is_keyframe:
+            index.append([time_value, 0])
+        if index:
+            index[-1][1] += 1
+
+    _store(path_key, identity, index)
+    return [tuple(keyframe) for keyframe in index]
+
+def keyframe_times(file_path):
+    """Return the sorted presentation times of the video keyframes, or None if they cannot be read."""
+    index = keyframe_index(file_path)
+    return [time_value for time_value, _ in index] if index is not None else None
+
+def get_duration(file_path):
+    """Return the container duration in seconds, or None if it cannot be determined."""
+    metadata = probe(file_path)
+    return metadata['duration'] if metadata else None
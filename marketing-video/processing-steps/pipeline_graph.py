@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Pipeline Task Graph
+- Declare each processing step with the project files it reads and writes
+- Derive step order from real data dependencies instead of list position
+- Run independent steps concurrently (e.g. the step 4 GPT call overlaps the ffmpeg work)
+"""
+
+import sys
+import time
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
+
+from pipeline_trace import TRACE_FILE_NAME, record_event
+
+STEPS_DIR = Path(__file__).resolve().parent
+
+# Paths are relative to the project directory; a directory path covers everything inside it.
+# 'project-config.json#key' names a single top-level config key, so watch mode can tell
+# a branding edit (step 9 only) from a music or intro/outro change.
+PIPELINE_TASKS = [
+    {
+        'name': 'verify_script',
+        'script': '4_verify_script.py',
+        'label': 'step 4',
+        'description': 'Step 4: Verify script quality',
+        'inputs': ['human-provided-content/resemble-a-roll.txt', 'temp/chapters.json'],
+        'outputs': ['script-verification-report.txt', 'script-verification-state.json'],
+        'optional': True
+    },
+    {
+        'name': 'process_voice',
+        'script': '8_process_voice.py',
+        'label': 'step 8',
+        'description': 'Step 8: Process voice with Resemble AI',
+        'inputs': ['human-provided-content/resemble-chapters', 'human-provided-content/project-config.json#intro_outro'],
+        'outputs': ['temp/processed_voice'],
+        'optional': False
+    },
+    {
+        'name': 'match_video_timing',
+        'script': '6_match_video_timing.py',
+        'label': 'step 6',
+        'description': 'Step 6: Combine video chapters with audio',
+        'inputs': [
+            'temp/original-chapters', 'temp/processed_voice',
+            'human-provided-content/project-config.json#assembly_template'
+        ],
+        'outputs': ['temp/timed_chapters'],
+        'optional': False
+    },
+    {
+        'name': 'background_music',
+        'script': '7_create_background_music.py',
+        'label': 'step 7',
+        'description': 'Step 7: Create professional background music',
+        'inputs': [
+            'temp/processed_voice', 'human-provided-content/project-config.json#intro_outro',
+            'human-provided-content/project-config.json#music', 'human-provided-content/project-config.json#audio_levels',
+            'human-provided-content/project-config.json#assembly_template'
+        ],
+        'outputs': ['temp/background_music.wav', 'temp/temp_broll_intro.wav'],
+        'optional': False
+    },
+    {
+        'name': 'final_assembly',
+        'script': '9_final_assembly_with_overlays.py',
+        'label': 'step 9',
+        'description': 'Step 9: Final assembly + overlays',
+        'inputs': [
+            'temp/timed_chapters', 'temp/processed_voice', 'temp/background_music.wav',
+            'temp/temp_broll_intro.wav', 'human-provided-content/project-config.json#branding',
+            'human-provided-content/project-config.json#music', 'human-provided-content/project-config.json#audio_levels',
+            'human-provided-content/project-config.json#intro_outro', 'human-provided-content/project-config.json#b_roll_video',
+            'human-provided-content/project-config.json#title_svg_template',
+            'human-provided-content/project-config.json#assembly_template'
+        ],
+        'outputs': ['final-output/final_video.mov'],
+        'optional': False
+    }
+]
+
+# Single-pass render (Step 5 --single-pass): step 9 cuts the chapters from the screencast
+# inside its own ffmpeg graph, so step 6 and its timed chapter files drop out
+SINGLE_PASS_TASKS = [
+    task for task in PIPELINE_TASKS if task['name'] not in ('match_video_timing', 'final_assembly')
+] + [
+    {
+        'name': 'final_assembly',
+        'script': '9_final_assembly_with_overlays.py',
+        'args': ['--single-pass'],
+        'label': 'step 9',
+        'description': 'Step 9: Single-pass render + overlays',
+        'inputs': [
+            'human-provided-content/orig_screencast.mp4', 'temp/chapters.json', 'temp/processed_voice',
+            'temp/background_music.wav', 'temp/temp_broll_intro.wav', 'human-provided-content/project-config.json#branding',
+            'human-provided-content/project-config.json#music', 'human-provided-content/project-config.json#audio_levels',
+            'human-provided-content/project-config.json#intro_outro', 'human-provided-content/project-config.json#b_roll_video',
+            'human-provided-content/project-config.json#title_svg_template',
+            'human-provided-content/project-config.json#assembly_template'
+        ],
+        'outputs': ['final-output/final_video.mov'],
+        'optional': False
+    }
+]
+
+_print_lock = threading.Lock()
+
+def _covers(output_path, input_path):
+    """True if the output path is the input path or a directory containing it."""
+    output_parts = Path(output_path).parts
+    input_parts = Path(input_path).parts
+    return input_parts[:len(output_parts)] == output_parts
+
+def resolve_dependencies(tasks):
+    """Map each task name to the set of tasks producing one of its inputs."""
+    dependencies = {task['name']: set() for task in tasks}
+    for task in tasks:
+        for producer in tasks:
+            if producer is task:
+                continue
+            if any(_covers(output, input_path) for output in producer['outputs'] for input_path in task['inputs']):
+                dependencies[task['name']].add(producer['name'])
+    return dependencies
+
+def topological_order(tasks, dependencies):
+    """Order tasks so every producer comes before its consumers; reject cycles."""
+    order = []
+    remaining = [task['name'] for task in tasks]
+    while remaining:
+        ready = [name for name in remaining if dependencies[name].issubset(order)]
+        if not ready:
+            raise ValueError(f"Dependency cycle between tasks: {', '.join(remaining)}")
+        order.extend(ready)
+        remaining = [name for name in remaining if name not in ready]
+    return order
+
+def run_task(task, project_dir, label=None):
+    """Run one step as a subprocess, prefixing its output with the step label."""
+    label = label or task['label']
+    with _print_lock:
+        print(f"\n🚀 {task['description']} [{label}]")
+
+    cmd = [sys.executable, '-u', str(STEPS_DIR / task['script']), str(project_dir)] + task.get('args', [])
+    start_time = time.time()
+    start = time.perf_counter()
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    for line in process.stdout:
+        with _print_lock:
+            print(f"  [{label}] {line}", end='')
+    process.wait()
+
+    # Step-level span so the trace shows where each step starts and ends
+    trace_file = Path(project_dir) / "temp" / TRACE_FILE_NAME
+    record_event(task['description'], start_time, time.perf_counter() - start,
+                 {'returncode': process.returncode}, trace_file=trace_file)
+
+    with _print_lock:
+        if process.returncode == 0:
+            print(f"✅ {task['description']} [{label}] - COMPLETED!")
+        else:
+            print(f"❌ {task['description']} [{label}] - FAILED!")
+            if task['optional']:
+                print("⚠️  Continuing anyway...")
+    return process.returncode == 0
+
+def run_projects(project_dirs, tasks=PIPELINE_TASKS, max_workers=None):
+    """Run the task graph for several projects through one bounded worker pool.
+
+    Returns a dict mapping each project directory to its list of failed task descriptions.
+    """
+    dependencies = resolve_dependencies(tasks)
+    order = topological_order(tasks, dependencies)
+    tasks_by_name = {task['name']: task for task in tasks}
+    batch = len(project_dirs) > 1
+
+    results = {project_dir: {} for project_dir in project_dirs}
+    failed = {project_dir: [] for project_dir in project_dirs}
+    running = {}
+    # Project-major order, so with a full pool earlier projects finish first
+    pending = [(project_dir, name) for project_dir in project_dirs for name in order]
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(tasks)) as executor:
+        while pending or running:
+            for project_dir, name in list(pending):
+                project_results = results[project_dir]
+                if any(project_results.get(dep) is False for dep in dependencies[name]):
+                    # An upstream step failed, so this one cannot produce valid output
+                    pending.remove((project_dir, name))
+                    project_results[name] = False
+                    failed[project_dir].append(f"{tasks_by_name[name]['description']} (skipped, upstream failed)")
+                elif all(project_results.get(dep) is True for dep in dependencies[name]):
+                    pending.remove((project_dir, name))
+                    task = tasks_by_name[name]
+                    label = f"{Path(project_dir).name} {task['label']}" if batch else task['label']
+                    running[executor.submit(run_task, task, project_dir, label)] = (project_dir, name)
+
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                project_dir, name = running.pop(future)
+                task = tasks_by_name[name]
+                try:
+                    succeeded = future.result()
+                except Exception as e:
+                    print(f"❌ {task['description']} - ERROR: {e}")
+                    succeeded = False
+                results[project_dir][name] = succeeded or task['optional']
+                if not results[project_dir][name]:
+                    failed[project_dir].append(task['description'])
+
+    return failed
+
+def run_pipeline(project_dir, tasks=PIPELINE_TASKS, max_workers=None):
+    """Run the task graph for a project; returns the list of failed task descriptions."""
+    return run_projects([project_dir], tasks, max_workers)[project_dir]
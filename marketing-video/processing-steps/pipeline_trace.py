@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Pipeline Trace
+- Shared run_command used by every processing step for ffmpeg/ffprobe calls
+- Records wall time, user/sys CPU, peak RSS, input/output bytes and argv per subprocess
+- Appends events to temp/pipeline-trace.json in Chrome Trace Event format
+- Streams ffmpeg -progress output (fps, speed, ETA) and stops stalled encodes
+
+The trace file is a JSON array without the closing bracket so concurrent steps can
+append to it safely; chrome://tracing, Perfetto and speedscope all accept that form.
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+import subprocess
+from collections import deque
+from pathlib import Path
+
+TRACE_FILE_NAME = "pipeline-trace.json"
+
+# ffmpeg options that take no value (everything else starting with '-' consumes the next argument)
+FFMPEG_FLAGS_WITHOUT_VALUE = {
+    '-y', '-n', '-an', '-vn', '-sn', '-dn', '-nostdin', '-nostats', '-stats',
+    '-hide_banner', '-shortest', '-re', '-copyts', '-accurate_seek', '-noaccurate_seek'
+}
+
+# Only the tail of ffmpeg's stderr is kept for error reports
+STDERR_RING_LINES = 200
+
+# Progress lines are printed at most this often
+PROGRESS_INTERVAL = 5.0
+
+# Watchdog: kill ffmpeg when its output time stops advancing, or when it runs far
+# slower than real time; both limits grow with the expected media duration
+STALL_BASE_SECONDS = 60
+STALL_PER_MEDIA_SECOND = 0.5
+DEADLINE_BASE_SECONDS = 300
+DEADLINE_PER_MEDIA_SECOND = 30
+WATCHDOG_POLL_SECONDS = 0.2
+
+_trace_file = None
+_step_name = None
+_write_lock = threading.Lock()
+
+def configure_trace(temp_dir, step_name):
+    """Send trace events for this process to temp_dir/pipeline-trace.json."""
+    global _trace_file, _step_name
+    _trace_file = Path(temp_dir) / TRACE_FILE_NAME
+    _step_name = step_name
+    _append_event({
+        'name': 'process_name', 'ph': 'M', 'pid': os.getpid(), 'tid': 0,
+        'args': {'name': step_name}
+    })
+
+def reset_trace(temp_dir):
+    """Start a fresh trace for a new build."""
+    trace_file = Path(temp_dir) / TRACE_FILE_NAME
+    if trace_file.exists():
+        trace_file.unlink()
+
+def _append_event(event, trace_file=None):
+    trace_file = trace_file or _trace_file
+    if trace_file is None:
+        return
+    try:
+        trace_file.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            # Whoever creates the file writes the array opener
+            fd = os.open(trace_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+            os.write(fd, b"[\n")
+            os.close(fd)
+        except FileExistsError:
+            pass
+        line = (json.dumps(event) + ",\n").encode()
+        with _write_lock:
+            fd = os.open(trace_file, os.O_WRONLY | os.O_APPEND)
+            try:
+                os.write(fd, line)
+            finally:
+                os.close(fd)
+    except OSError as e:
+        print(f"  ⚠ Could not write trace event: {e}")
+
+def record_event(name, start_time, duration, args=None, category='step', trace_file=None):
+    """Record a complete ('X') event covering [start_time, start_time + duration] seconds."""
+    _append_event({
+        'name': name,
+        'cat': category,
+        'ph': 'X',
+        'ts': int(start_time * 1_000_000),
+        'dur': int(duration * 1_000_000),
+        'pid': os.getpid(),
+        'tid': threading.get_ident(),
+        'args': args or {}
+    }, trace_file)
+
+def _file_size(arg):
+    try:
+        path = Path(arg)
+        return path.stat().st_size if path.is_file() else 0
+    except (OSError, ValueError):
+        return 0
+
+def _split_media_args(cmd):
+    """Split an ffmpeg/ffprobe argv into (input files, output files)."""
+    inputs, outputs = [], []
+    tool = Path(cmd[0]).name
+    i = 1
+    while i < len(cmd):
+        arg = str(cmd[i])
+        if arg == '-i' and i + 1 < len(cmd):
+            inputs.append(str(cmd[i + 1]))
+            i += 2
+        elif arg in FFMPEG_FLAGS_WITHOUT_VALUE:
+            i += 1
+        elif arg.startswith('-') and len(arg) > 1:
+            i += 2
+        else:
+            # ffprobe's positional argument is its input, ffmpeg's are outputs
+            (inputs if tool == 'ffprobe' else outputs).append(arg)
+            i += 1
+    return inputs, outputs
+
+def _peak_rss_bytes(usage):
+    # ru_maxrss is bytes on macOS and kilobytes on Linux
+    return usage.ru_maxrss if sys.platform == 'darwin' else usage.ru_maxrss * 1024
+
+def _option_value(cmd, *flags):
+    """Value of the last occurrence of any of the given options, or None."""
+    value = None
+    for i, arg in enumerate(cmd[:-1]):
+        if arg in flags:
+            value = cmd[i + 1]
+    return value
+
+def expected_media_duration(cmd):
+    """Seconds of media an ffmpeg command will produce, from -t/-frames or the first input's duration."""
+    duration = _option_value(cmd, '-t')
+    if duration is not None:
+        try:
+            return float(duration)
+        except ValueError:
+            pass
+
+    frames = _option_value(cmd, '-frames:v', '-vframes')
+    if frames is not None:
+        try:
+            return int(frames) / float(_option_value(cmd, '-r') or 30)
+        except ValueError:
+            pass
+
+    inputs, _ = _split_media_args(cmd)
+    media_inputs = [path for path in inputs if Path(path).is_file() and Path(path).suffix != '.txt']
+    if media_inputs:
+        from media_probe import get_duration  # media_probe runs its ffprobe through this module
+        return get_duration(media_inputs[0])
+    return None
+
+def _parse_progress_value(value, suffix=''):
+    try:
+        return float(value.rstrip(suffix))
+    except (AttributeError, ValueError):
+        return None
+
+def _format_progress(progress, expected_duration):
+    position = progress['out_time_s']
+    if expected_duration:
+        parts = [f"{min(100.0, position / expected_duration * 100):.0f}% ({position:.1f}s/{expected_duration:.1f}s)"]
+    else:
+        parts = [f"{position:.1f}s"]
+    if progress['fps']:
+        parts.append(f"{progress['fps']:.0f} fps")
+    if progress['speed']:
+        parts.append(f"{progress['speed']:.2f}x")
+        if expected_duration:
+            parts.append(f"ETA {max(0.0, expected_duration - position) / progress['speed']:.0f}s")
+    return "    ⏳ " + "  ".join(parts)
+
+def _read_progress(stream, progress, expected_duration):
+    """Parse ffmpeg -progress key=value blocks and print a throttled progress line."""
+    block = {}
+    for line in stream:
+        key, _, value = line.strip().partition('=')
+        if key != 'progress':
+            block[key] = value
+            continue
+
+        out_time_us = _parse_progress_value(block.get('out_time_us', block.get('out_time_ms')))
+        now = time.perf_counter()
+        if out_time_us is not None and out_time_us / 1_000_000 > progress['out_time_s']:
+            progress['out_time_s'] = out_time_us / 1_000_000
+            progress['last_advance'] = now
+        progress['fps'] = _parse_progress_value(block.get('fps')) or progress['fps']
+        progress['speed'] = _parse_progress_value(block.get('speed'), 'x') or progress['speed']
+        progress['frame'] = block.get('frame', progress['frame'])
+        block = {}
+
+        if value == 'end':
+            progress['ended'] = True
+        elif now - progress['last_print'] >= PROGRESS_INTERVAL:
+            progress['last_print'] = now
+            print(_format_progress(progress, expected_duration), flush=True)
+
+def run_process(cmd, timeout=None, description=None, expected_duration=None, stderr_lines=STDERR_RING_LINES):
+    """Run a subprocess and record its trace event; returns CompletedProcess.
+
+    ffmpeg commands report live progress and are supervised by a watchdog whose stall
+    window and deadline scale with the expected media duration. Only the last
+    stderr_lines lines of stderr are kept (None keeps everything).
+    """
+    cmd = [str(arg) for arg in cmd]
+    inputs, outputs = _split_media_args(cmd)
+    input_bytes = sum(_file_size(path) for path in inputs)
+
+    is_ffmpeg = Path(cmd[0]).name == 'ffmpeg'
+    if is_ffmpeg:
+        if expected_duration is None:
+            expected_duration = expected_media_duration(cmd)
+        cmd = [cmd[0], '-progress', 'pipe:1', '-nostats'] + cmd[1:]
+
+    start_time = time.time()
+    start = time.perf_counter()
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, bufsize=1)
+
+    stdout_chunks = []
+    stderr_tail = deque(maxlen=stderr_lines)
+    progress = {'out_time_s': 0.0, 'fps': None, 'speed': None, 'frame': None,
+                'last_advance': start, 'last_print': start, 'ended': False}
+    if is_ffmpeg:
+        stdout_reader = threading.Thread(target=_read_progress, args=(process.stdout, progress, expected_duration), daemon=True)
+    else:
+        stdout_reader = threading.Thread(target=lambda: stdout_chunks.append(process.stdout.read()), daemon=True)
+    stderr_reader = threading.Thread(target=lambda: stderr_tail.extend(process.stderr), daemon=True)
+    readers = [stdout_reader, stderr_reader]
+    for reader in readers:
+        reader.start()
+
+    # Watchdog limits: ffmpeg gets a stall window and deadline proportional to the media it produces
+    stall_window = STALL_BASE_SECONDS + STALL_PER_MEDIA_SECOND * (expected_duration or 0) if is_ffmpeg else None
+    deadline = DEADLINE_BASE_SECONDS + DEADLINE_PER_MEDIA_SECOND * expected_duration if is_ffmpeg and expected_duration else None
+    if timeout:
+        deadline = min(deadline, timeout) if deadline else timeout
+
+    usage = None
+    kill_reason = None
+    while True:
+        if hasattr(os, 'wait4'):
+            # wait4 reports resource usage for this child alone, even with concurrent children
+            pid, status, child_usage = os.wait4(process.pid, os.WNOHANG)
+            if pid:
+                usage = child_usage
+                process.returncode = os.waitstatus_to_exitcode(status)
+                break
+        elif process.poll() is not None:
+            break
+
+        now = time.perf_counter()
+        if deadline and now - start > deadline:
+            kill_reason = f"exceeded {deadline:.0f}s deadline"
+        elif stall_window and now - progress['last_advance'] > stall_window:
+            kill_reason = f"no progress for {stall_window:.0f}s"
+        if kill_reason:
+            process.kill()
+            if hasattr(os, 'wait4'):
+                _, status, usage = os.wait4(process.pid, 0)
+                process.returncode = os.waitstatus_to_exitcode(status)
+            else:
+                process.wait()
+            break
+        time.sleep(WATCHDOG_POLL_SECONDS)
+
+    for reader in readers:
+        reader.join()
+
+    duration = time.perf_counter() - start
+    stdout = ''.join(stdout_chunks)
+    stderr = ''.join(stderr_tail)
+
+    record_event(description or Path(cmd[0]).name, start_time, duration, {
+        'step': _step_name,
+        'argv': cmd,
+        'returncode': process.returncode,
+        'wall_s': round(duration, 3),
+        'user_cpu_s': round(usage.ru_utime, 3) if usage else None,
+        'sys_cpu_s': round(usage.ru_stime, 3) if usage else None,
+        'peak_rss_bytes': _peak_rss_bytes(usage) if usage else None,
+        'input_bytes': input_bytes,
+        'output_bytes': sum(_file_size(path) for path in outputs),
+        'media_s': expected_duration,
+        'speed': progress['speed'],
+        'frames': progress['frame'],
+        'killed': kill_reason
+    }, category=Path(cmd[0]).name)
+
+    if kill_reason:
+        print(f"  ✗ Watchdog stopped {description or cmd[0]}: {kill_reason}")
+        raise subprocess.TimeoutExpired(cmd, duration, output=stdout, stderr=stderr)
+    return subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
+
+def run_command(cmd, description, expected_duration=None, timeout=None):
+    """Run command with error handling."""
+    try:
+        print(f"  {description}...")
+        result = run_process(cmd, timeout=timeout, description=description, expected_duration=expected_duration)
+        if result.returncode == 0:
+            print(f"  ✓ {description} completed")
+            return result.stdout.strip() if result.stdout.strip() else True
+        else:
+            print(f"  ✗ {description} failed: {result.stderr}")
+            return False
+    except Exception as e:
+        print(f"  ✗ Error in {description}: {e}")
+        return False
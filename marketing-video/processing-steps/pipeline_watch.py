@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Pipeline Watch Mode
+- Poll human-provided-content/ for edits to the script, chapter voice files and project config
+- Map each change to the tasks that read it, plus everything downstream of them
+- Re-run only those tasks; the artifact cache limits per-chapter work to the changed chapters
+
+A new resemble-chapters/3.wav re-runs steps 8, 6, 7 and 9, but only chapter 3 is re-encoded
+by steps 8 and 6. A branding edit in project-config.json re-runs step 9 alone.
+"""
+
+import json
+import time
+from pathlib import Path
+
+from pipeline_graph import PIPELINE_TASKS, resolve_dependencies, topological_order, run_projects
+from pipeline_trace import reset_trace
+
+WATCHED_DIR = "human-provided-content"
+CONFIG_FILE = "human-provided-content/project-config.json"
+
+# Seconds between polls, and how long a change must stay unchanged before a rebuild starts
+POLL_INTERVAL = 1.0
+SETTLE_TIME = 1.5
+
+_invalid_configs = set()
+
+def _split_input(input_path):
+    """Split 'file#key' into ('file', 'key'); plain paths have no key."""
+    path, _, key = input_path.partition('#')
+    return path, key or None
+
+def snapshot(project_dir, previous=None):
+    """Identity of every watched file, with project-config.json expanded per top-level key."""
+    project_dir = Path(project_dir)
+    state = {}
+    watched_dir = project_dir / WATCHED_DIR
+    if watched_dir.exists():
+        for path in sorted(watched_dir.rglob('*')):
+            if path.is_file() and not path.name.startswith('.'):
+                stat = path.stat()
+                state[path.relative_to(project_dir).as_posix()] = (stat.st_size, stat.st_mtime_ns)
+
+    config_file = project_dir / CONFIG_FILE
+    if config_file.exists():
+        try:
+            with open(config_file, 'r') as f:
+                config = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            # Half-saved or invalid config: keep the last good keys until it parses again
+            if config_file not in _invalid_configs:
+                print(f"  ⚠ {config_file} is not valid JSON, ignoring it until it is fixed")
+                _invalid_configs.add(config_file)
+            config = None
+        else:
+            _invalid_configs.discard(config_file)
+        del state[CONFIG_FILE]
+        if config is None:
+            state.update({path: value for path, value in (previous or {}).items() if path.startswith(f"{CONFIG_FILE}#")})
+            return state
+        for key, value in config.items():
+            state[f"{CONFIG_FILE}#{key}"] = json.dumps(value, sort_keys=True)
+    return state
+
+def changed_inputs(before, after):
+    """Paths (and config keys) that were added, removed or modified between two snapshots."""
+    return {path for path in set(before) | set(after) if before.get(path) != after.get(path)}
+
+def _reads(task, changed_path, known_keys):
+    changed_file, changed_key = _split_input(changed_path)
+    if changed_key is not None and changed_key not in known_keys:
+        # A key no task declares: assume anything reading the config may use it
+        changed_key = None
+    for input_path in task['inputs']:
+        input_file, input_key = _split_input(input_path)
+        input_parts = Path(input_file).parts
+        if Path(changed_file).parts[:len(input_parts)] != input_parts:
+            continue
+        if input_key is None or changed_key is None or input_key == changed_key:
+            return True
+    return False
+
+def affected_tasks(tasks, changed):
+    """Tasks reading a changed input, plus every task downstream of them, in task order."""
+    known_keys = {_split_input(input_path)[1] for task in tasks for input_path in task['inputs']}
+    dependencies = resolve_dependencies(tasks)
+
+    affected = {task['name'] for task in tasks if any(_reads(task, path, known_keys) for path in changed)}
+    for name in topological_order(tasks, dependencies):
+        if dependencies[name] & affected:
+            affected.add(name)
+    return [task for task in tasks if task['name'] in affected]
+
+def _wait_until_settled(project_dir, state):
+    """Wait for editors and exports to finish writing, returning the settled snapshot."""
+    settled_since = time.monotonic()
+    while time.monotonic() - settled_since < SETTLE_TIME:
+        time.sleep(POLL_INTERVAL / 2)
+        current = snapshot(project_dir, state)
+        if current != state:
+            state = current
+            settled_since = time.monotonic()
+    return state
+
+def watch_projects(project_dirs, tasks=PIPELINE_TASKS, max_workers=None):
+    """Rebuild the affected part of each project whenever its human-provided content changes."""
+    states = {project_dir: snapshot(project_dir) for project_dir in project_dirs}
+    print(f"\n👀 Watching {', '.join(str(Path(p) / WATCHED_DIR) for p in project_dirs)} (Ctrl+C to stop)")
+
+    try:
+        while True:
+            time.sleep(POLL_INTERVAL)
+            for project_dir in project_dirs:
+                current = snapshot(project_dir, states[project_dir])
+                if current == states[project_dir]:
+                    continue
+
+                current = _wait_until_settled(project_dir, current)
+                changed = changed_inputs(states[project_dir], current)
+                # Anything edited while the rebuild runs is picked up by the next poll
+                states[project_dir] = current
+
+                rebuild = affected_tasks(tasks, changed)
+                print(f"\n🔄 {project_dir}: changed {', '.join(sorted(changed))}")
+                if not rebuild:
+                    print("  Nothing reads these inputs, no rebuild needed")
+                    continue
+                print(f"  Re-running: {', '.join(task['label'] for task in rebuild)}")
+
+                reset_trace(Path(project_dir) / "temp")
+                start = time.perf_counter()
+                failed = run_projects([project_dir], rebuild, max_workers)[project_dir]
+                if failed:
+                    print(f"❌ Rebuild failed at: {', '.join(failed)}")
+                else:
+                    print(f"✅ Rebuild finished in {time.perf_counter() - start:.1f}s")
+                print("\n👀 Watching for changes...")
+    except KeyboardInterrupt:
+        print("\n👋 Stopped watching")
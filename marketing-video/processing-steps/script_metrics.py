@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Script Metrics
+- Local checks of resemble-a-roll.txt that run in milliseconds, before step 4 calls GPT
+- Per chapter: word count against the 75-80 word target step 3 asks for, words per second
+  against the chapter's duration in chapters.json, Flesch reading ease and repeated phrases
+- Errors (empty chapters, a chapter count that does not match the video, leftover JSON)
+  reject the script without an API round trip; warnings, including pace, only go into the
+  report (step 6 extends a chapter's video to its voice, so a fast chapter is never broken)
+"""
+
+import re
+from collections import Counter
+
+# Word target per chapter (matches step 3's prompts)
+TARGET_WORDS = (75, 80)
+
+# Comfortable voice-over pace, words per second of chapter video
+WORDS_PER_SECOND = (1.5, 3.0)
+# Typical speaking rate (about 150 words per minute), to estimate how long a voice-over runs
+SPOKEN_WORDS_PER_SECOND = 2.5
+
+# Flesch reading ease below this reads as difficult for a voice-over
+MIN_READING_EASE = 50
+
+# Phrase length for repeated-phrase counting
+PHRASE_WORDS = 3
+
+# Phrases made only of these words are too common to count as repetition
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'but', 'by', 'can', 'for', 'from', 'have', 'in',
+    'is', 'it', 'its', "it's", 'of', 'on', 'or', 'so', 'that', 'the', 'this', 'to', 'we', 'with',
+    'you', 'your', "you'll", "you're"
+}
+
+# Step 3's JSON field names or braces left in the script mean a response was pasted unparsed
+JSON_ARTIFACT = re.compile(r'"(?:enhanced_script|original_text|chapter|word_count)"\s*:|^\s*[{}\[\]],?\s*$', re.MULTILINE)
+
+def split_script_chapters(script_content):
+    """Split resemble-a-roll.txt into chapter texts.
+    
+    Step 3 writes one sentence per line with a blank line between sentences and two
+    more blank lines between chapters, so chapters are separated by 2+ blank lines.
+    """
+    blocks = re.split(r'\n(?:[ \t]*\n){2,}', script_content.strip())
+    return [block.strip() for block in blocks if block.strip()]
+
+def _words(text):
+    return re.findall(r"[A-Za-z0-9]+(?:['’][A-Za-z]+)?", text)
+
+def count_syllables(word):
+    """Vowel-group syllable estimate (silent final e dropped), at least one per word."""
+    word = word.lower()
+    if word.isdigit():
+        return len(word)
+    groups = re.findall(r'[aeiouy]+', word)
+    count = len(groups)
+    if word.endswith('e') and not word.endswith(('le', 'ee')) and count > 1:
+        count -= 1
+    return max(1, count)
+
+def reading_ease(text):
+    """Flesch reading ease (higher is easier; 60-70 is plain English), or None for no words."""
+    words = _words(text)
+    if not words:
+        return None
+    sentences = max(1, len([s for s in re.split(r'[.!?]+', text) if _words(s)]))
+    syllables = sum(count_syllables(word) for word in words)
+    return 206.835 - 1.015 * (len(words) / sentences) - 84.6 * (syllables / len(words))
+
+def repeated_phrases(text, length=PHRASE_WORDS):
+    """[(phrase, count)] for every phrase of length words said more than once, most repeated first."""
+    words = [word.lower().replace('’', "'") for word in _words(text)]
+    phrases = Counter(
+        tuple(words[i:i + length]) for i in range(len(words) - length + 1)
+        if not all(word in STOPWORDS for word in words[i:i + length])
+    )
+    return [(' '.join(phrase), count) for phrase, count in phrases.most_common() if count > 1]
+
+def chapter_metrics(index, text, chapter):
+    """Metrics, errors and warnings for one chapter (chapter is its chapters.json entry or None)."""
+    words = len(_words(text))
+    duration = chapter['duration'] if chapter else None
+    words_per_second = words / duration if duration else None
+    ease = reading_ease(text)
+    repeats = repeated_phrases(text)
+    
+    errors = []
+    warnings = []
+    label = f"Chapter {index + 1}"
+    if not words:
+        errors.append(f"{label} has no words")
+    if JSON_ARTIFACT.search(text):
+        errors.append(f"{label} contains JSON from a script response")
+    if words_per_second and words_per_second > WORDS_PER_SECOND[1]:
+        warnings.append(f"{label}: {words_per_second:.1f} words/s is fast for {duration:.0f}s of video; the voice-over "
+                        f"runs about {words / SPOKEN_WORDS_PER_SECOND:.0f}s and step 6 holds the last frame for the rest")
+    elif words_per_second and words_per_second < WORDS_PER_SECOND[0]:
+        warnings.append(f"{label}: {words_per_second:.1f} words/s is slow for {duration:.0f}s of video "
+                        f"({WORDS_PER_SECOND[0]}-{WORDS_PER_SECOND[1]} reads naturally)")
+    if words and not TARGET_WORDS[0] <= words <= TARGET_WORDS[1]:
+        warnings.append(f"{label}: {words} words, outside the {TARGET_WORDS[0]}-{TARGET_WORDS[1]} word target")
+    if ease is not None and ease < MIN_READING_EASE:
+        warnings.append(f"{label}: reading ease {ease:.0f} is hard to follow by ear")
+    for phrase, count in repeats[:3]:
+        warnings.append(f"{label}: \"{phrase}\" repeated {count} times")
+    
+    return {
+        'chapter': index + 1,
+        'title': chapter['title'] if chapter else None,
+        'words': words,
+        'duration': duration,
+        'words_per_second': words_per_second,
+        'reading_ease': ease,
+        'repeated_phrases': repeats,
+        'errors': errors,
+        'warnings': warnings
+    }
+
+def analyze_script(texts, video_chapters):
+    """Metrics for every chapter text; returns {'chapters', 'errors', 'warnings'}."""
+    errors = []
+    if not texts:
+        errors.append("Script is empty")
+    elif len(texts) != len(video_chapters):
+        errors.append(f"Script has {len(texts)} chapters but the video has {len(video_chapters)} "
+                      f"(separate chapters with two blank lines)")
+    
+    chapters = [chapter_metrics(index, text, video_chapters[index] if index < len(video_chapters) else None)
+                for index, text in enumerate(texts)]
+    return {
+        'chapters': chapters,
+        'errors': errors + [error for chapter in chapters for error in chapter['errors']],
+        'warnings': [warning for chapter in chapters for warning in chapter['warnings']]
+    }
+
+def format_metrics(analysis):
+    """Markdown section with the metrics table, errors and warnings."""
+    lines = [
+        "## Local Metrics\n",
+        "| Chapter | Words | Duration | Words/s | Reading ease | Repeated phrases |",
+        "|---|---|---|---|---|---|"
+    ]
+    for metrics in analysis['chapters']:
+        duration = f"{metrics['duration']:.0f}s" if metrics['duration'] else "-"
+        pace = f"{metrics['words_per_second']:.1f}" if metrics['words_per_second'] else "-"
+        ease = f"{metrics['reading_ease']:.0f}" if metrics['reading_ease'] is not None else "-"
+        lines.append(f"| {metrics['chapter']} | {metrics['words']} | {duration} | {pace} | {ease} | "
+                     f"{len(metrics['repeated_phrases'])} |")
+    lines.append("")
+    lines.append(f"Targets: {TARGET_WORDS[0]}-{TARGET_WORDS[1]} words per chapter, "
+                 f"{WORDS_PER_SECOND[0]}-{WORDS_PER_SECOND[1]} words/s, reading ease {MIN_READING_EASE}+")
+    lines.append("")
+    for heading, messages in (("Errors", analysis['errors']), ("Warnings", analysis['warnings'])):
+        if messages:
+            lines.append(f"**{heading}:**")
+            lines.extend(f"- {message}" for message in messages)
+            lines.append("")
+    return '\n'.join(lines)
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Token Budget
+- Count prompt tokens locally, before a request is sent, to decide whether it fits the model context
+- Uses tiktoken's encoding for the model when installed, otherwise estimates about 4 characters per token
+"""
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Context window of the chat model used by steps 3 and 4 (prompt + response)
+MODEL_CONTEXT_TOKENS = {
+    'gpt-4': 8192
+}
+DEFAULT_CONTEXT_TOKENS = 8192
+
+# Characters per token for English text when tiktoken is not available
+CHARS_PER_TOKEN = 4
+
+_encodings = {}
+
+def _encoding(model):
+    if tiktoken is None:
+        return None
+    if model not in _encodings:
+        try:
+            _encodings[model] = tiktoken.encoding_for_model(model)
+        except KeyError:
+            _encodings[model] = tiktoken.get_encoding("cl100k_base")
+    return _encodings[model]
+
+def count_tokens(text, model="gpt-4"):
+    """Number of tokens text encodes to for model (an estimate without tiktoken)."""
+    encoding = _encoding(model)
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+def count_message_tokens(messages, model="gpt-4"):
+    """Prompt tokens of a chat request, including the few tokens of framing per message."""
+    return sum(count_tokens(message['content'], model) + 4 for message in messages) + 3
+
+def context_tokens(model="gpt-4"):
+    return MODEL_CONTEXT_TOKENS.get(model, DEFAULT_CONTEXT_TOKENS)
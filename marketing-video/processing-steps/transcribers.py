@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Transcribers
+- One interface for step 2's speech-to-text: transcribe(audio_file) -> {'text', 'segments', 'duration'}
+- OpenAITranscriber uploads to the Whisper API (default)
+- LocalTranscriber runs a quantized faster-whisper model on the CPU, with no network access,
+  loaded once per process and shared by every file and project it transcribes
+
+Select with TRANSCRIBER=openai|local. The local model is LOCAL_WHISPER_MODEL (default: small,
+int8); its weights are downloaded once into the Hugging Face cache, or give a local model directory.
+"""
+
+import os
+import threading
+
+from chapter_pool import cpu_budget
+
+try:
+    from openai import OpenAI
+except ImportError:
+    OpenAI = None
+
+try:
+    from faster_whisper import WhisperModel
+except ImportError:
+    WhisperModel = None
+
+LOCAL_MODEL = "small"
+LOCAL_COMPUTE_TYPE = "int8"
+
+# Segment fields written to transcript.json, as returned by the Whisper API's verbose_json
+SEGMENT_FIELDS = ['id', 'seek', 'start', 'end', 'text', 'tokens', 'temperature',
+                  'avg_logprob', 'compression_ratio', 'no_speech_prob']
+
+def _segment_dict(segment):
+    """Plain dict with the verbose_json segment fields, from an SDK model, tuple or dict."""
+    if isinstance(segment, dict):
+        values = segment
+    elif hasattr(segment, 'model_dump'):
+        values = segment.model_dump()
+    else:
+        values = {field: getattr(segment, field, None) for field in SEGMENT_FIELDS}
+    return {field: values.get(field) for field in SEGMENT_FIELDS if field in values}
+
+class OpenAITranscriber:
+    """Upload audio to the OpenAI Whisper API."""
+    name = 'openai'
+    # Uploads are size-limited and slow, so step 2 sends compact chunks concurrently
+    uploads = True
+
+    def __init__(self):
+        self.client = OpenAI()
+
+    def transcribe(self, audio_file):
+        with open(audio_file, 'rb') as f:
+            response = self.client.audio.transcriptions.create(
+                model="whisper-1",
+                file=f,
+                response_format="verbose_json"
+            )
+        return {
+            'text': response.text,
+            'segments': [_segment_dict(segment) for segment in response.segments or []],
+            'duration': response.duration
+        }
+
+_models = {}
+_models_lock = threading.Lock()
+
+class LocalTranscriber:
+    """Transcribe on the CPU with faster-whisper (CTranslate2), using every core of the budget."""
+    name = 'local'
+    # Reads audio.wav directly; no compression or chunking needed
+    uploads = False
+
+    def __init__(self, model_name=None, threads=None):
+        self.model_name = model_name or os.getenv('LOCAL_WHISPER_MODEL', LOCAL_MODEL)
+        self.threads = threads or cpu_budget()
+
+    def _model(self):
+        key = (self.model_name, self.threads)
+        with _models_lock:
+            if key not in _models:
+                print(f"  Loading {self.model_name} ({LOCAL_COMPUTE_TYPE}, {self.threads} threads)...")
+                _models[key] = WhisperModel(self.model_name, device="cpu", compute_type=LOCAL_COMPUTE_TYPE,
+                                            cpu_threads=self.threads)
+            return _models[key]
+
+    def transcribe(self, audio_file):
+        segments, info = self._model().transcribe(str(audio_file), beam_size=5)
+        segments = [_segment_dict(segment) for segment in segments]
+        return {
+            'text': ''.join(segment['text'] for segment in segments).strip(),
+            'segments': segments,
+            'duration': info.duration
+        }
+
+def get_transcriber(name=None):
+    """Return the transcriber selected by name or TRANSCRIBER (default: openai), or None if unavailable."""
+    name = (name or os.getenv('TRANSCRIBER', 'openai')).lower()
+    if name == 'local':
+        if WhisperModel is None:
+            print("  ✗ TRANSCRIBER=local but faster-whisper is not installed (pip install faster-whisper)")
+            return None
+        return LocalTranscriber()
+    if name != 'openai':
+        print(f"  ⚠ Unknown TRANSCRIBER '{name}', using OpenAI")
+    if OpenAI is None:
+        print("  ✗ The openai package is not installed")
+        return None
+    if not os.getenv('OPENAI_API_KEY'):
+        print("✗ OPENAI_API_KEY environment variable not set")
+        return None
+    return OpenAITranscriber()